@@ -13,6 +13,7 @@ call pyinstaller ^
       --distpath ../dist/python ^
       --workpath ../dist/python/pyinstaller ^
       --specpath ../dist/python/pyinstaller ^
+      --add-data solve_time_fit.json;. ^
       ./solver_main.py
 
 REM Go to root directory
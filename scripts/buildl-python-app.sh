@@ -16,6 +16,7 @@ pyinstaller \
       --distpath ../dist/python \
       --workpath ../dist/python/pyinstaller \
       --specpath ../dist/python/pyinstaller \
+      --add-data solve_time_fit.json:. \
       ./solver_main.py
 
 cd ../
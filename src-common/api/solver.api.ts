@@ -3,6 +3,10 @@ export interface SolverAPI {
     data: SolveVehicleGroupsRequest,
   ) => Promise<BuildGroupsResponse>;
   solveFlightLeg: (data: SolveFlightLegRequest) => Promise<SolveLegResponse>;
+  // checks a payload without starting a solve
+  validate: (data: ValidateRequest) => Promise<ValidateResponse>;
+  // predicts model size and solve time without building the model
+  estimate: (data: SolveFlightLegRequest) => Promise<EstimateResponse>;
 }
 
 export type ID = string;
@@ -28,10 +32,57 @@ export interface SolveVehicleGroupsRequest {
     languages?: string[];
     nationality?: string;
   }[];
+  // returned as is if still valid and leaving no more unused seats
+  previous?: { vehicleGroups: Record<ID, ID[]>; unusedSeats?: number };
+  options?: { reuseTolerance?: number; deterministicTime?: number };
 }
 
 export interface BuildGroupsResponse {
   vehicleGroups: Record<ID, ID[]>;
+  unusedSeats?: number;
+  engine?: 'search' | 'cp-sat' | 'reused';
+  reused?: boolean;
+  reuseRejected?: string[]; // why `previous` was not reused
+  deterministicTime?: DeterministicTime; // with options.deterministicTime only
+}
+
+export type ValidateRequest =
+  | ({ target: 'solve_groups' } & SolveVehicleGroupsRequest)
+  | ({ target?: 'solve_leg' } & SolveFlightLegRequest);
+
+export interface ValidateResponse {
+  valid: boolean;
+  errors: string[]; // the messages the solver would fail with
+  facts: {
+    people: number;
+    counselors: number;
+    balloonSeats: number;
+    carSeats: number;
+    seatsShort: number; // people minus all seats, if positive
+    realBalloons: number; // maxCapacity > 0
+    trailerCars: number;
+    eligibleOperators: Record<ID, ID[]>; // key: vehicleId
+    groupPassengerSeats: Record<ID, number>; // key: balloonId
+  };
+}
+
+export interface ModelSize {
+  variables: number;
+  constraints: number;
+  nonzeros: number;
+  objectiveTerms: number;
+}
+
+export interface EstimateResponse {
+  sections: Record<string, ModelSize>; // key: model section, e.g. '2.8', '3.5b'
+  total: ModelSize;
+  secondLeg: boolean; // fixedGroups given
+  // wall seconds to a solution within 1% of a long run's best; null without a fit
+  expectedSeconds: number | null;
+  preset: {
+    timeLimit: number; // what timeLimit: 'auto' uses
+    engine: 'flat' | 'hierarchical'; // what engine: 'auto' picks
+  };
 }
 
 export interface SolveFlightLegRequest {
@@ -73,6 +124,10 @@ export interface SolveFlightLegRequest {
     firstTime?: boolean;
   }[];
 
+  // an earlier answer for this leg; returned as is if it still satisfies every
+  // hard rule and scores at most `options.reuseTolerance` worse
+  previous?: Pick<SolveLegResponse, 'assignments' | 'objective'>;
+
   options?: SolveFlightLegOptions;
 }
 
@@ -83,7 +138,21 @@ export interface SolveFlightLegOptions extends Record<string, unknown> {
   planningHorizonDepth?: number;
   counselorFlightDiscount?: number;
   defaultPersonWeight?: number;
-  timeLimit?: number;
+  // 'auto': from the model-size estimate (see EstimateResponse.preset)
+  timeLimit?: number | 'auto';
+  // reproducible mode: budget in CP-SAT deterministic seconds, replaces timeLimit
+  deterministicTime?: number;
+  // 'hierarchical': groups first, then each group's seats (first legs only);
+  // 'auto' picks it for large first legs; 'local': simulated annealing for
+  // legs too large for CP-SAT; 'staged': core solve, then refinement
+  engine?: 'flat' | 'hierarchical' | 'local' | 'staged' | 'auto';
+  stageOneShare?: number; // staged: share of timeLimit for the core stage
+  stageFixBalloons?: boolean; // staged: keep the core plan's balloon crews
+  // one integer seat count per vehicle for interchangeable participants
+  aggregateClasses?: boolean;
+  reuseTolerance?: number; // relative, default 0.05
+  // with --race: relative gap between the best plan and bound that ends it
+  raceGap?: number;
 }
 
 export interface SolveFlightLegWeights extends Record<
@@ -118,4 +187,78 @@ export interface SolveLegResponse {
       passengerIds: ID[];
     }
   >;
+  // 'cancelled': search was stopped early; assignments are the best found
+  status?: 'optimal' | 'feasible' | 'cancelled';
+  objective?: SolveLegObjective;
+  engine?: 'flat' | 'hierarchical' | 'local' | 'staged' | 'reused';
+  reused?: boolean;
+  reuseRejected?: string[]; // why `previous` was not reused
+  timings?: Record<string, number>; // seconds per level (top, groups, repair)
+  repairedGroups?: ID[];
+  iterations?: number; // local engine only
+  stages?: {
+    name: 'core' | 'refine';
+    seconds: number;
+    status: 'optimal' | 'feasible' | 'cancelled';
+    objective: number;
+  }[];
+  modelCache?: SolveLegModelCache; // with --model-cache only
+  deterministicTime?: DeterministicTime; // with options.deterministicTime only
+  checkpoint?: SolveLegCheckpoint; // with --checkpoint-dir, flat engine only
+  // with timeLimit or engine 'auto'
+  estimate?: { expectedSeconds: number | null; timeLimit: number };
+  race?: SolveLegRace; // with --race only
+}
+
+export interface SolveLegRace {
+  seed: number; // the seed whose plan is returned
+  gap: number | null; // relative, best plan against the best bound
+  seeds: {
+    seed: number;
+    objective: number | null;
+    status: 'optimal' | 'feasible' | 'cancelled' | null;
+    firstSolutionSeconds: number | null;
+    bestSeconds: number | null; // when the seed found its best plan
+    error: string | null;
+  }[];
+}
+
+export interface SolveLegCheckpoint {
+  path: string;
+  resumed: boolean; // continued from an earlier, interrupted run
+  priorSeconds: number; // search seconds of the earlier runs
+}
+
+export interface DeterministicTime {
+  budget: number;
+  used: number; // summed over workers and searches
+}
+
+export interface SolveLegModelCache {
+  hit: boolean;
+  buildSeconds: number;
+  hits: number;
+  misses: number;
+  hitRate: number;
+  savedSeconds: number;
+  entries: number;
+}
+
+export interface SolveLegObjective {
+  value: number;
+  bound: number | null; // null when combined from independent group solves
+  // key: objective section ('3.1' … '3.8'), only sections with terms
+  terms: Record<
+    string,
+    {
+      weight: keyof SolveFlightLegWeights; // weight scaling this section
+      raw: number; // unweighted section sum
+      value: number; // weight * raw
+    }
+  >;
+  stats: {
+    soloParticipantCars: number;
+    repeatedMeetings: number;
+    lookaheadShortfall: number;
+  };
 }
@@ -1,16 +1,32 @@
-import { ipcMain, type IpcMainInvokeEvent } from 'electron';
-import { spawn } from 'node:child_process';
+import { app, ipcMain, type IpcMainInvokeEvent } from 'electron';
+import { spawn, type ChildProcess } from 'node:child_process';
+import os from 'node:os';
 import path from 'path';
 import log from 'electron-log';
 import type {
   SolveVehicleGroupsRequest,
   SolveFlightLegRequest,
+  SolveLegResponse,
+  ValidateRequest,
 } from '@/../src-common/api/solver.api';
 
 const PROCESS_TIMEOUT_MS = 1_000_000;
+// Time the solver gets to return its best plan after a cancel request
+const CANCEL_GRACE_MS = 10_000;
+// The solver's own deadline, so it answers before we have to cancel it
+const SOLVER_DEADLINE_S = (PROCESS_TIMEOUT_MS - CANCEL_GRACE_MS) / 1000;
 const SCRIPT_BASE = 'solver_main';
+// Leg solves save their best plan here and continue from it when the same
+// request comes again after an interruption (sleep, timeout, app closed) or
+// a speculative solve; a finished solve is solved again with its whole budget
+const CHECKPOINT_DIR = 'solver-checkpoints';
+
+// While the planner reviews a first leg, the second leg is solved at low
+// priority into a checkpoint that the real request then continues from
+let speculation: ChildProcess | null = null;
 
 export default () => {
+  app.on('before-quit', () => speculation?.kill());
   ipcMain.handle(
     'solve:vehicle-groups',
     (_evt: IpcMainInvokeEvent, request: SolveVehicleGroupsRequest) =>
@@ -21,16 +37,101 @@ export default () => {
     (_evt: IpcMainInvokeEvent, request: SolveFlightLegRequest) =>
       runSolver(request),
   );
+  ipcMain.handle(
+    'solve:validate',
+    (_evt: IpcMainInvokeEvent, request: ValidateRequest) =>
+      spawnProcess('validate', request),
+  );
+  ipcMain.handle(
+    'solve:estimate',
+    (_evt: IpcMainInvokeEvent, request: SolveFlightLegRequest) =>
+      spawnProcess('estimate', request),
+  );
 };
 
-function runVehicleGroupSolver(
+async function runVehicleGroupSolver(
   request: SolveVehicleGroupsRequest,
 ): Promise<object> {
+  await stopSpeculation();
   return spawnProcess('solve_groups', request);
 }
 
-function runSolver(request: SolveFlightLegRequest): Promise<object> {
-  return spawnProcess('solve_leg', request);
+async function runSolver(request: SolveFlightLegRequest): Promise<object> {
+  await stopSpeculation();
+  const response = (await spawnProcess('solve_leg', request, [
+    ...checkpointArgs(),
+    // only continues interrupted or speculative solves (solver_checkpoint)
+    '--resume',
+  ])) as SolveLegResponse;
+  startSpeculation(request, response);
+  return response;
+}
+
+function checkpointArgs(): string[] {
+  return [
+    '--checkpoint-dir',
+    path.join(app.getPath('userData'), CHECKPOINT_DIR),
+  ];
+}
+
+function startSpeculation(
+  request: SolveFlightLegRequest,
+  response: SolveLegResponse,
+) {
+  // Only a first leg has a predictable next leg
+  if (Object.keys(request.fixedGroups ?? {}).length > 0) return;
+  if (Object.keys(response.assignments).length === 0) return;
+
+  const [cmd, baseArgs] = spawnArgs();
+  const proc = spawn(
+    cmd,
+    [...baseArgs, '--mode', 'speculate_leg', ...checkpointArgs()],
+    { stdio: ['pipe', 'ignore', 'pipe'] },
+  );
+  speculation = proc;
+  // the process may be exiting when it is cancelled
+  proc.stdin?.on('error', () => undefined);
+  proc.stdin?.write(
+    JSON.stringify({ payload: request, assignments: response.assignments }) +
+      '\n',
+  );
+  if (proc.pid !== undefined) {
+    try {
+      os.setPriority(proc.pid, os.constants.priority.PRIORITY_LOW);
+    } catch (e) {
+      log.warn('Could not lower the speculative solver priority', e);
+    }
+  }
+
+  let stderrData = '';
+  proc.stderr?.setEncoding('utf8');
+  proc.stderr?.on('data', (chunk: string) => {
+    stderrData += chunk;
+  });
+  proc.on('error', (err) => {
+    log.warn('Speculative solver could not start', err);
+  });
+  proc.on('close', (code) => {
+    if (speculation === proc) speculation = null;
+    if (code !== 0 && code !== null) {
+      log.warn('Speculative solver failed', { code, stderr: stderrData });
+    }
+  });
+}
+
+function stopSpeculation(): Promise<void> {
+  const proc = speculation;
+  if (proc === null) return Promise.resolve();
+  speculation = null;
+  return new Promise((resolve) => {
+    // The solver saves its best plan to the checkpoint before exiting
+    const killTimeout = setTimeout(() => proc.kill(), CANCEL_GRACE_MS);
+    proc.on('close', () => {
+      clearTimeout(killTimeout);
+      resolve();
+    });
+    proc.stdin?.write(JSON.stringify({ type: 'cancel' }) + '\n');
+  });
 }
 
 function spawnProcess(
@@ -39,13 +140,19 @@ function spawnProcess(
   params: string[] = [],
 ): Promise<object> {
   const [cmd, baseArgs] = spawnArgs();
-  const args = [...baseArgs, '--mode', mode, ...params];
+  const args = [
+    ...baseArgs,
+    '--mode',
+    mode,
+    '--deadline',
+    SOLVER_DEADLINE_S.toString(),
+    ...params,
+  ];
 
   const proc = spawn(cmd, args, { stdio: ['pipe', 'pipe', 'pipe'] });
 
-  // send input
-  proc.stdin.write(JSON.stringify(payload));
-  proc.stdin.end();
+  // send input as a single line; stdin stays open for control messages
+  proc.stdin.write(JSON.stringify(payload) + '\n');
 
   let stdoutData = '';
   proc.stdout.setEncoding('utf8');
@@ -60,25 +167,32 @@ function spawnProcess(
   });
 
   return new Promise((resolve, reject) => {
+    let killTimeout: NodeJS.Timeout | undefined;
     const timeout = setTimeout(() => {
-      proc.kill();
-      log.error('Solver timeout', {
+      log.error('Solver timeout, requesting cancel', {
         payload,
         timeout: PROCESS_TIMEOUT_MS,
       });
-      reject(
-        new Error('The solver took too long to respond. Please try again.'),
-      );
+      // Ask for the best solution so far; only kill if it does not answer
+      proc.stdin.write(JSON.stringify({ type: 'cancel' }) + '\n');
+      killTimeout = setTimeout(() => {
+        proc.kill();
+        reject(
+          new Error('The solver took too long to respond. Please try again.'),
+        );
+      }, CANCEL_GRACE_MS);
     }, PROCESS_TIMEOUT_MS);
 
     proc.on('error', (err) => {
       clearTimeout(timeout);
+      clearTimeout(killTimeout);
       log.error('Spawn error', err);
       reject(new Error('Could not start the solver process.'));
     });
 
     proc.on('close', (code) => {
       clearTimeout(timeout);
+      clearTimeout(killTimeout);
 
       if (code === null) {
         reject(new Error('The solver process exited unexpectedly.'));
@@ -6,6 +6,10 @@ const api: SolverAPI = {
     ipcRenderer.invoke('solve:flight-leg', ...args),
   solveVehicleGroups: (...args: unknown[]) =>
     ipcRenderer.invoke('solve:vehicle-groups', ...args),
+  validate: (...args: unknown[]) =>
+    ipcRenderer.invoke('solve:validate', ...args),
+  estimate: (...args: unknown[]) =>
+    ipcRenderer.invoke('solve:estimate', ...args),
 };
 
 export default api;
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Compare the leg engines on the synthetic scenarios of `solver_scenarios`.
+
+Every engine gets the same time limit; all manifests are scored with the
+same cost model (`solver_local_search.evaluate_manifest`), so objective values
+are comparable across engines (lower is better).
+
+    python benchmark.py --time-limit 10 --scenarios small large
+
+With `--fit-estimator`, the flat model of every scenario is instead solved in
+a few configurations (see `FIT_VARIANTS`), the time to a good solution is
+measured and the time model of `solver_estimate` is refitted and written to
+`solve_time_fit.json` (commit the new file):
+
+    python benchmark.py --fit-estimator --time-limit 60
+"""
+
+import json
+import os
+import time
+from argparse import ArgumentParser
+
+from ortools.sat.python import cp_model
+from solver_estimate import (
+    FIT_FILE,
+    GOOD_GAP,
+    estimate_leg_model,
+    fit_solve_times,
+)
+from solver_flight_leg import build_flight_leg_model, solve_flight_leg
+from solver_hierarchical import solve_flight_leg_hierarchical
+from solver_local_search import evaluate_manifest, solve_flight_leg_local
+from solver_main import leg_options
+from solver_scenarios import SCENARIOS, make_scenario
+
+ENGINES = {
+    "flat": solve_flight_leg,
+    "hierarchical": solve_flight_leg_hierarchical,
+    "local": solve_flight_leg_local,
+}
+
+
+def run(scenario: str, engine: str, time_limit: float, workers: int, seed: int):
+    payload = make_scenario(**SCENARIOS[scenario])
+    options = leg_options(payload, {"workers": workers, "seed": seed})
+    options["time_limit_s"] = time_limit
+    model_kwargs = dict(
+        group_history=payload.get("groupHistory"),
+        balloon_history=payload.get("balloonHistory"),
+        people_meet_history=payload.get("peopleMeetHistory"),
+        frozen=payload["preAssignments"],
+        fixed_groups=payload["fixedGroups"],
+    )
+    started = time.perf_counter()
+    try:
+        result = ENGINES[engine](
+            balloons=payload["balloons"],
+            cars=[dict(c) for c in payload["cars"]],
+            people=payload["people"],
+            vehicle_groups=payload["vehicleGroups"],
+            **model_kwargs,
+            **options,
+        )
+    except (RuntimeError, ValueError) as e:
+        return {
+            "seconds": time.perf_counter() - started,
+            "status": str(e),
+            "people": len(payload["people"]),
+        }
+    seconds = time.perf_counter() - started
+
+    score = evaluate_manifest(
+        result["assignments"],
+        payload["balloons"],
+        payload["cars"],
+        payload["people"],
+        payload["vehicleGroups"],
+        **model_kwargs,
+        **{k: v for k, v in options.items() if k != "time_limit_s"},
+    )
+    return {
+        "seconds": seconds,
+        "status": result["status"],
+        "objective": score["value"],
+        "violations": score["violations"],
+        "people": len(payload["people"]),
+    }
+
+
+# Configurations the time model is fitted on: all weights on, no lookahead,
+# no meeting history.
+FIT_VARIANTS = {
+    "default": lambda payload: None,
+    "noLookahead": lambda payload: payload["options"].update(planningHorizonDepth=0),
+    "noMeetings": lambda payload: payload.pop("peopleMeetHistory", None),
+}
+
+
+class _Incumbents(cp_model.CpSolverSolutionCallback):
+    def __init__(self):
+        super().__init__()
+        self.found = []  # (wall seconds, objective)
+
+    def on_solution_callback(self) -> None:
+        self.found.append((self.WallTime(), self.ObjectiveValue()))
+
+
+def fit_run(scenario: str, variant: str, time_limit: float, workers: int, seed: int):
+    """Estimated size and measured time to a good solution of one model."""
+    payload = make_scenario(**SCENARIOS[scenario])
+    FIT_VARIANTS[variant](payload)
+    options = leg_options(payload, {"workers": workers, "seed": seed})
+    for key in ("time_limit_s", "num_search_workers", "model_cache"):
+        options.pop(key)
+    leg = dict(
+        group_history=payload.get("groupHistory"),
+        balloon_history=payload.get("balloonHistory"),
+        people_meet_history=payload.get("peopleMeetHistory"),
+        frozen=payload["preAssignments"],
+        fixed_groups=payload["fixedGroups"],
+        **options,
+    )
+    estimate = estimate_leg_model(
+        payload["balloons"],
+        payload["cars"],
+        payload["people"],
+        payload["vehicleGroups"],
+        **leg,
+    )
+    built = build_flight_leg_model(
+        payload["balloons"],
+        [dict(c) for c in payload["cars"]],
+        payload["people"],
+        payload["vehicleGroups"],
+        **leg,
+    )
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = workers
+    solver.parameters.random_seed = seed
+    incumbents = _Incumbents()
+    status = solver.Solve(built.model, incumbents)
+
+    best = min(objective for _, objective in incumbents.found)
+    good = next(
+        seconds
+        for seconds, objective in incumbents.found
+        if objective - best <= GOOD_GAP * max(abs(best), 1.0)
+    )
+    return {
+        "scenario": scenario,
+        "variant": variant,
+        "nonzeros": estimate["total"]["nonzeros"],
+        "secondLeg": estimate["secondLeg"],
+        "goodSeconds": round(good, 3),
+        "bestSeconds": round(incumbents.found[-1][0], 3),
+        "status": solver.StatusName(status),
+    }
+
+
+def fit_estimator(args) -> None:
+    print(
+        f"{'scenario':<12} {'variant':<12} {'nonzeros':>9} {'good s':>8} "
+        f"{'best s':>8} {'status':<10}"
+    )
+    runs = []
+    for scenario in args.scenarios:
+        for variant in FIT_VARIANTS:
+            r = fit_run(scenario, variant, args.time_limit, args.workers, args.seed)
+            runs.append(r)
+            print(
+                f"{scenario:<12} {variant:<12} {r['nonzeros']:>9} "
+                f"{r['goodSeconds']:>8.2f} {r['bestSeconds']:>8.2f} {r['status']:<10}",
+                flush=True,
+            )
+    fit = {
+        "cpus": os.cpu_count(),
+        "workers": args.workers,
+        "timeLimit": args.time_limit,
+        "goodGap": GOOD_GAP,
+        "coefficients": fit_solve_times(runs),
+        "runs": runs,
+    }
+    FIT_FILE.write_text(json.dumps(fit, indent=2) + "\n")
+    print(f"wrote {FIT_FILE.name}: {fit['coefficients']}")
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    parser.add_argument("--time-limit", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--fit-estimator",
+        action="store_true",
+        help="Refit the solve-time model of solver_estimate instead.",
+    )
+    args = parser.parse_args()
+    if args.fit_estimator:
+        fit_estimator(args)
+        return
+
+    print(
+        f"{'scenario':<12} {'people':>6} {'engine':<13} {'seconds':>8} "
+        f"{'status':<10} {'objective':>11} {'violations':>10}"
+    )
+    for scenario in args.scenarios:
+        for engine in args.engines:
+            r = run(scenario, engine, args.time_limit, args.workers, args.seed)
+            objective = f"{r['objective']:.1f}" if "objective" in r else "-"
+            print(
+                f"{scenario:<12} {r.get('people', ''):>6} {engine:<13} "
+                f"{r['seconds']:>8.1f} {r['status']:<10} {objective:>11} "
+                f"{r.get('violations', ''):>10}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Fixtures shared by the solver tests.
+"""
+
+import copy
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from solver_flight_leg import solve_flight_leg
+from solver_main import leg_options
+
+
+@pytest.fixture
+def leg_kwargs():
+    """
+    Keyword arguments of the leg engines for a `solver_scenarios` payload,
+    with its options mapped as by `solver_main`.
+    """
+
+    def make(payload, *, seed=42, workers=8, time_limit_s=10, frozen=None):
+        # reserve_group_car_seats mutates the cars
+        payload = copy.deepcopy(payload)
+        options = leg_options(payload, {"workers": workers, "seed": seed})
+        return dict(
+            balloons=payload["balloons"],
+            cars=payload["cars"],
+            people=payload["people"],
+            vehicle_groups=payload["vehicleGroups"],
+            group_history=payload.get("groupHistory"),
+            balloon_history=payload.get("balloonHistory"),
+            people_meet_history=payload.get("peopleMeetHistory"),
+            frozen=frozen or {},
+            fixed_groups=payload.get("fixedGroups"),
+            **{**options, "time_limit_s": time_limit_s},
+        )
+
+    return make
+
+
+@pytest.fixture
+def solve_leg(leg_kwargs):
+    """
+    Solve a `solver_scenarios` payload with `engine` (default: the flat
+    model); other keyword arguments override the engine's arguments.
+    """
+
+    def solve(
+        payload,
+        engine=solve_flight_leg,
+        *,
+        seed=42,
+        workers=8,
+        time_limit_s=10,
+        frozen=None,
+        **overrides,
+    ):
+        kwargs = leg_kwargs(
+            payload,
+            seed=seed,
+            workers=workers,
+            time_limit_s=time_limit_s,
+            frozen=frozen,
+        )
+        return engine(**{**kwargs, **overrides})
+
+    return solve
+
+
+@pytest.fixture
+def run_main():
+    """
+    Run `solver_main.py --mode <mode> <args>` on `payload` and return its
+    answer, or every line it wrote (progress first) with `stream=True`.
+    """
+
+    def run(mode, payload, *args, stream=False):
+        done = subprocess.run(
+            [sys.executable, "solver_main.py", "--mode", mode, *map(str, args)],
+            input=json.dumps(payload),
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        lines = [json.loads(line) for line in done.stdout.splitlines()]
+        return lines if stream else lines[-1]
+
+    return run
@@ -0,0 +1,136 @@
+"""
+Record solver runs for later replay (`--capture-dir`).
+
+A `Recorder` is attached to the process' `SolveControl` like the tracer. Every
+CP-SAT search reports its model and parameters to it; at the end of the run it
+writes one capture directory:
+
+  payload.json         the input, with person / vehicle ids and names replaced
+  run.json             mode, CLI params, wall seconds, error and the
+                       (anonymized) answer
+  search-N.pb          the N-th searched `CpModelProto`, variable and
+                       constraint names removed
+  search-N.params.txt  its `SatParameters` in text format
+  searches.json        status, objective, bound and effort of every search
+
+With `min_seconds`, only runs at least that slow are written. Captures are
+re-run with `solver_replay.py`. The history store (`--history-db`) is not
+captured, so payloads with a `history` reference cannot be replayed.
+
+This module must not import OR-Tools (see `solver_checks`).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# CLI params stored with a capture; paths on the recording machine are not.
+REPLAY_ARGS = ("mode", "seed", "workers", "engine", "deadline")
+
+
+def id_map(payload: Dict[str, Any]) -> Dict[str, str]:
+    """Real id -> anonymous id for every person and vehicle of a payload."""
+    ids: Dict[str, str] = {}
+    for key, prefix in (("people", "person"), ("balloons", "balloon"), ("cars", "car")):
+        for i, item in enumerate(payload.get(key, [])):
+            ids.setdefault(item["id"], f"{prefix}{i}")
+    return ids
+
+
+def anonymize(value: Any, ids: Dict[str, str]) -> Any:
+    """`value` with every id (as key or string) replaced, names set to ids."""
+    if isinstance(value, dict):
+        out = {ids.get(k, k): anonymize(v, ids) for k, v in value.items()}
+        if "name" in out and value.get("id") in ids:
+            out["name"] = ids[value["id"]]
+        return out
+    if isinstance(value, list):
+        return [anonymize(v, ids) for v in value]
+    if isinstance(value, str):
+        return ids.get(value, value)
+    return value
+
+
+class Recorder:
+    def __init__(self, directory: Optional[str] = None, *, min_seconds: float = 0.0):
+        self.directory = directory
+        self.min_seconds = min_seconds
+        self._started = time.monotonic()
+        self._searches: List[Dict[str, Any]] = []
+        # the hierarchical engine searches group models in parallel threads
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def search(self, model, solver) -> None:
+        """Keep the model, parameters and outcome of a finished search."""
+        if not self.enabled:
+            return
+        proto = type(model.Proto())()
+        proto.CopyFrom(model.Proto())
+        for item in [*proto.variables, *proto.constraints]:
+            item.ClearField("name")
+        response = solver.response_proto
+        with self._lock:
+            self._searches.append(
+                {
+                    "model": proto.SerializeToString(),
+                    "params": str(solver.parameters),
+                    "stats": {
+                        "status": solver.StatusName(),
+                        "objective": response.objective_value,
+                        "bound": response.best_objective_bound,
+                        "wallSeconds": response.wall_time,
+                        "deterministicTime": response.deterministic_time,
+                        "conflicts": response.num_conflicts,
+                        "branches": response.num_branches,
+                        "variables": len(proto.variables),
+                        "constraints": len(proto.constraints),
+                    },
+                }
+            )
+
+    def write(
+        self,
+        args: Dict[str, Any],
+        payload: Dict[str, Any],
+        out: Any,
+        error: Optional[str] = None,
+    ) -> Optional[str]:
+        """Write the capture of this run; its directory, or None if skipped."""
+        seconds = time.monotonic() - self._started
+        if not self.enabled or seconds < self.min_seconds:
+            return None
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{stamp}-{args['mode']}-{os.getpid()}")
+        os.makedirs(path, exist_ok=True)
+        ids = id_map(payload)
+
+        def dump(name: str, value: Any) -> None:
+            with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+                json.dump(value, f, indent=1)
+
+        dump("payload.json", anonymize(payload, ids))
+        dump(
+            "run.json",
+            {
+                "args": {k: args.get(k) for k in REPLAY_ARGS},
+                "seconds": seconds,
+                "error": error,
+                "result": anonymize(out, ids),
+            },
+        )
+        with self._lock:
+            searches = list(self._searches)
+        for n, search in enumerate(searches):
+            with open(os.path.join(path, f"search-{n}.pb"), "wb") as f:
+                f.write(search["model"])
+            with open(os.path.join(path, f"search-{n}.params.txt"), "w") as f:
+                f.write(search["params"])
+        dump("searches.json", [s["stats"] for s in searches])
+        return path
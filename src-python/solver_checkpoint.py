@@ -0,0 +1,174 @@
+"""
+Checkpoints of long leg solves (`--checkpoint-dir`, `--resume`).
+
+While the flat leg engine searches, every improving solution is written (at
+most every `CHECKPOINT_INTERVAL_S`) to `<dir>/<key>.json`, where the key is a
+hash of the mode and payload, time budget excluded. A checkpoint holds the
+manifest, its objective and bound, the search seconds spent so far over all
+runs, the status ("running" until the search returns) and whether it was
+written by a speculative solve (`solver_speculate`).
+
+With `--resume`, a checkpoint with the same key seeds the search as a hint and
+only the rest of the time budget is searched, so work lost to a sleeping
+laptop, a timeout or a closed app is continued instead of repeated. Only such
+interrupted searches and speculative ones are continued: a finished solve of
+the same payload is solved again with its whole budget.
+
+The first write of a run prunes the directory (`prune`): checkpoints older
+than `CHECKPOINT_MAX_AGE_S` go, and of the rest only the `CHECKPOINT_MAX_FILES`
+most recently written are kept, since every payload solved or speculated on
+leaves its own file.
+
+This module must not import OR-Tools (see `solver_checks`).
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from typing import Any, Dict, Optional
+
+# Least seconds between two checkpoint writes during a search.
+CHECKPOINT_INTERVAL_S = 5.0
+
+# Search budget of a resumed solve whose budget is already spent; enough to
+# re-check the hinted manifest.
+RESUME_MIN_S = 1.0
+
+# Checkpoints kept in a directory, most recently written first.
+CHECKPOINT_MAX_FILES = 64
+
+# Checkpoints not written for this long are deleted (a week).
+CHECKPOINT_MAX_AGE_S = 7 * 24 * 3600.0
+
+# Options that only set the budget: a longer `timeLimit` resumes the same solve.
+BUDGET_OPTIONS = ("timeLimit", "deterministicTime")
+
+
+def payload_key(mode: str, payload: Dict[str, Any]) -> str:
+    """Hash of everything a solve depends on, except its time budget."""
+    options = {
+        k: v for k, v in payload.get("options", {}).items() if k not in BUDGET_OPTIONS
+    }
+    text = json.dumps(
+        [mode, {**payload, "options": options}], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def prune(
+    directory: str,
+    *,
+    keep: Optional[str] = None,
+    max_files: int = CHECKPOINT_MAX_FILES,
+    max_age_s: float = CHECKPOINT_MAX_AGE_S,
+) -> int:
+    """
+    Delete the checkpoints of `directory` older than `max_age_s`, then all but
+    the `max_files` newest; never `keep`. Temporary files left by a killed
+    write only go by age, as a running write may own them. Returns the number
+    of files deleted.
+    """
+    checkpoints, stale = [], []
+    oldest = time.time() - max_age_s
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if path == keep or not name.endswith((".json", ".tmp")):
+            continue
+        try:
+            written = os.path.getmtime(path)
+        except OSError:
+            continue  # deleted by another run meanwhile
+        if written < oldest:
+            stale.append(path)
+        elif name.endswith(".json"):
+            checkpoints.append((written, path))
+    checkpoints.sort(reverse=True)
+    stale += [path for _, path in checkpoints[max(max_files - (keep is not None), 0) :]]
+    deleted = 0
+    for path in stale:
+        try:
+            os.remove(path)
+            deleted += 1
+        except OSError:
+            pass
+    return deleted
+
+
+class Checkpoint:
+    def __init__(
+        self,
+        directory: str,
+        key: str,
+        *,
+        interval_s: float = CHECKPOINT_INTERVAL_S,
+        speculative: bool = False,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{key}.json")
+        self.key = key
+        self.interval_s = interval_s
+        self.speculative = speculative
+        # search seconds of the runs before this one (set by `load`)
+        self.spent_before = 0.0
+        self._written = -math.inf
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """The saved state for this key, or None (missing, other key, broken)."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or state.get("key") != self.key:
+            return None
+        self.spent_before = float(state.get("seconds", 0.0))
+        return state
+
+    def resume(self) -> Optional[Dict[str, Any]]:
+        """
+        The saved state to continue from: a speculative solve's or one whose
+        search did not return; otherwise None.
+        """
+        state = self.load()
+        if state is None:
+            return None
+        if not state.get("speculative") and state.get("status") != "running":
+            self.spent_before = 0.0
+            return None
+        return state
+
+    def due(self) -> bool:
+        """Whether the interval since the last write has passed."""
+        return time.monotonic() - self._written >= self.interval_s
+
+    def save(
+        self,
+        assignments: Dict[str, Any],
+        *,
+        objective: float,
+        bound: float,
+        seconds: float,
+        status: str,
+    ) -> None:
+        """
+        Atomically replace the checkpoint; `seconds` are this run's. The first
+        write of a run prunes the directory.
+        """
+        if self._written == -math.inf:
+            prune(os.path.dirname(self.path), keep=self.path)
+        state = {
+            "key": self.key,
+            "status": status,
+            "speculative": self.speculative,
+            "objective": objective,
+            "bound": bound,
+            "seconds": self.spent_before + seconds,
+            "assignments": assignments,
+        }
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+        self._written = time.monotonic()
@@ -0,0 +1,264 @@
+"""
+Input checks shared by the solvers and `--mode validate`.
+
+Everything here is plain Python and must not import OR-Tools, so a payload
+can be checked in milliseconds without loading the solver. The checks return
+one message per problem; the solvers raise a `ValueError` with the first one,
+`--mode validate` reports them all together with `input_facts`.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from solver_types import Balloon, Car, Person, VehicleAssignment
+
+
+def reserve_group_car_seats(
+    balloons: List[Balloon],
+    cars: List[Car],
+    groups: Dict[str, list[str]],
+):
+    """
+    Reserve seats for each balloon's passengers inside *its own groups cars*.
+    Mutates `cars[*]['capacity']` only (does NOT touch groups or the group).
+    Safe to call for any leg. Uses the order given by `group[balloon_id]`.
+    """
+    car_by_id = {c["id"]: c for c in cars}
+    for bal in balloons:
+        bid = bal["id"]
+        need = int(bal["maxCapacity"])
+        for cid in groups.get(bid, []):
+            if need <= 0:
+                break
+            car = car_by_id.get(cid)
+            if car is None:
+                raise ValueError(f"Car {cid} from group not found in current input.")
+            pax_cap_excl_driver = max(int(car["maxCapacity"]) - 1, 0)
+            take = min(need, pax_cap_excl_driver)
+            car["maxCapacity"] = int(car["maxCapacity"]) - take
+            need -= take
+        if need > 0:
+            raise RuntimeError(
+                f"Seat reservation failed for {bid}: short {need} passenger seats "
+                f"in cars {groups.get(bid, [])}."
+            )
+
+
+# ---------------------------------------------------------------------------
+# Vehicle groups (`solve_vehicle_groups`)
+# ---------------------------------------------------------------------------
+def group_compatibility(
+    balloons: List[Balloon], cars: List[Car], people: List[Person]
+) -> Dict[Tuple[str, str], bool]:
+    """
+    (car_id, balloon_id) -> whether some balloon operator candidate and some
+    car operator candidate share a language. Placeholder balloons
+    (maxCapacity 0) are compatible with every car.
+    """
+    # person -> languages (None or [] means "speaks all")
+    langs = {p["id"]: p.get("languages") for p in people}
+    compat_cb: Dict[Tuple[str, str], bool] = {}
+
+    for b in balloons:
+        bid = b["id"]
+        # For placeholder groups (no balloon), we do NOT enforce language
+        # compatibility between a balloon operator and car operator.
+        if int(b["maxCapacity"]) == 0:
+            for c in cars:
+                compat_cb[(c["id"], bid)] = True
+            continue
+
+        # Real balloon: apply original language-compatibility logic
+        b_ops = set(b.get("allowedOperatorIds", []))
+        for c in cars:
+            c_ops = set(c.get("allowedOperatorIds", []))
+            ok = False
+            if b_ops and c_ops:
+                for p in b_ops:
+                    lp = langs.get(p)
+                    p_all = (lp is None) or (len(lp) == 0)
+                    p_set = set(lp or [])
+                    # early exit if p speaks all
+                    if p_all:
+                        ok = True
+                        break
+                    for q in c_ops:
+                        lq = langs.get(q)
+                        q_all = (lq is None) or (len(lq) == 0)
+                        if q_all or p_set.intersection(lq or []):
+                            ok = True
+                            break
+                    if ok:
+                        break
+            # If either side has no candidates, leave ok False (cannot ensure a match)
+            compat_cb[(c["id"], bid)] = ok
+    return compat_cb
+
+
+def vehicle_group_problems(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    frozen: Dict[str, List[str]],
+    compat_cb: Dict[Tuple[str, str], bool],
+) -> List[str]:
+    """Pre-errors of `solve_vehicle_groups`, in the order it reports them."""
+    problems: List[str] = []
+    balloon_names = {b["id"]: b["name"] for b in balloons}
+    car_names = {c["id"]: c["name"] for c in cars}
+    cap = {c["id"]: int(c["maxCapacity"]) for c in cars}
+    bal_need = {b["id"]: int(b["maxCapacity"]) for b in balloons}
+
+    # only "real" balloons require trailer-equipped cars
+    trailers = sum(1 for c in cars if c.get("hasTrailerClutch", False))
+    if trailers < sum(1 for need in bal_need.values() if need > 0):
+        problems.append("not enough trailer-equipped cars for balloons")
+
+    # across all groups, *car* seats must cover everyone not seated in balloons
+    car_seats_needed = max(len(people) - sum(bal_need.values()), 0)
+    if sum(cap.values()) < car_seats_needed:
+        problems.append("fleet lacks passenger seats for ground crew")
+
+    for bid, fixed_cars in frozen.items():
+        if bid not in bal_need:
+            problems.append(f"balloon {bid} not found")
+        for cid in fixed_cars:
+            if cid not in cap:
+                problems.append(f"car {cid} not found")
+
+    # Helpful pre-errors: no operator candidates for real balloons only
+    for b in balloons:
+        if not b.get("allowedOperatorIds") and bal_need[b["id"]] > 0:
+            problems.append(f"Balloon {b['name']} has no eligible operators")
+    for c in cars:
+        if not c.get("allowedOperatorIds") and cap[c["id"]] > 0:
+            problems.append(f"Car {c['name']} has no eligible operators")
+
+    # Helpful pre-errors: frozen pair contradicts language feasibility
+    for bid, fixed_cars in frozen.items():
+        for cid in fixed_cars:
+            if compat_cb.get((cid, bid), True):
+                continue
+            problems.append(
+                f"Vehicle group {balloon_names[bid]} <- {car_names[cid]} is impossible: "
+                f"No language-compatible operator pair exists"
+            )
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Flight legs (`solve_flight_leg`)
+# ---------------------------------------------------------------------------
+def leg_option_problems(
+    *,
+    default_person_weight: int,
+    planning_horizon_legs: int,
+    w_passenger_fairness: int,
+    w_tiebreak_fairness: int,
+    **_: Any,
+) -> List[str]:
+    """Section 0 of the leg model: option values that make no sense."""
+    problems: List[str] = []
+    if default_person_weight < 0:
+        problems.append("Default person weight must be non-negative")
+    if planning_horizon_legs < 0:
+        problems.append("Planning horizon must be non-negative")
+    if w_passenger_fairness * w_tiebreak_fairness < 0:
+        problems.append(
+            "Passenger fairness weight and tiebreak fairness must have the same sign"
+        )
+    return problems
+
+
+def leg_seat_problems(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    frozen: Optional[Dict[str, VehicleAssignment]],
+) -> List[str]:
+    """
+    Section 0.c of the leg model: obvious infeasibility, given the car seats
+    left after `reserve_group_car_seats`.
+    """
+    problems: List[str] = []
+    vehicles = {v["id"]: v for v in [*balloons, *cars]}
+    capacity = {vid: int(v["maxCapacity"]) for vid, v in vehicles.items()}
+    people_by_id = {p["id"]: p for p in people}
+
+    total_capacity = sum(capacity.values())
+    if len(people_by_id) > total_capacity:
+        problems.append(
+            f"Not enough seats for everyone: {len(people_by_id)} people but only "
+            f"{total_capacity} seats across all vehicles."
+        )
+
+    vehicle_names = {vid: v.get("name", vid) for vid, v in vehicles.items()}
+    for vid, assignment in (frozen or {}).items():
+        if vid not in capacity:
+            continue
+        seat_count = len(
+            {assignment["operatorId"]} - {None} | set(assignment["passengerIds"])
+        )
+        if seat_count > capacity[vid]:
+            problems.append(
+                f"Fixed assignment for {vehicle_names.get(vid, vid)} needs "
+                f"{seat_count} seats but it only has {capacity[vid]}."
+            )
+        unknown = [
+            pid
+            for pid in [assignment["operatorId"], *assignment["passengerIds"]]
+            if pid is not None and pid not in people_by_id
+        ]
+        if unknown:
+            problems.append(
+                f"Fixed assignment for {vehicle_names.get(vid, vid)} names "
+                f"unknown people: {', '.join(unknown)}."
+            )
+        op_id = assignment["operatorId"]
+        if op_id is not None and op_id not in vehicles[vid].get(
+            "allowedOperatorIds", []
+        ):
+            op_name = people_by_id.get(op_id, {}).get("name", op_id)
+            problems.append(
+                f"{op_name} is fixed as the operator of "
+                f"{vehicle_names.get(vid, vid)} but is not an eligible operator "
+                f"for it."
+            )
+    return problems
+
+
+def input_facts(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+) -> Dict[str, Any]:
+    """Cheap derived numbers about a payload, for the UI."""
+    person_ids = {p["id"] for p in people}
+    balloon_seats = sum(int(b["maxCapacity"]) for b in balloons)
+    car_seats = sum(int(c["maxCapacity"]) for c in cars)
+    car_by_id = {c["id"]: c for c in cars}
+    return {
+        "people": len(people),
+        "counselors": sum(1 for p in people if p.get("role") == "counselor"),
+        "balloonSeats": balloon_seats,
+        "carSeats": car_seats,
+        "seatsShort": max(len(people) - balloon_seats - car_seats, 0),
+        "realBalloons": sum(1 for b in balloons if int(b["maxCapacity"]) > 0),
+        "trailerCars": sum(1 for c in cars if c.get("hasTrailerClutch", False)),
+        "eligibleOperators": {
+            v["id"]: [
+                p
+                for p in dict.fromkeys(v.get("allowedOperatorIds", []))
+                if p in person_ids
+            ]
+            for v in [*balloons, *cars]
+        },
+        "groupPassengerSeats": {
+            bid: sum(
+                max(int(car_by_id[cid]["maxCapacity"]) - 1, 0)
+                for cid in car_ids
+                if cid in car_by_id
+            )
+            for bid, car_ids in vehicle_groups.items()
+        },
+    }
@@ -0,0 +1,138 @@
+"""
+Cancellation and wall-clock deadline for one solver process.
+
+A single `SolveControl` is created when the process starts and handed to every
+solve. It owns
+
+  – the global deadline (parsing + model build + search all count against it)
+  – the cancel flag, set by SIGTERM/SIGINT or an in-band `{"type": "cancel"}`
+    message; running searches are stopped via `CpSolver.StopSearch` and keep
+    the best solution found so far
+  – the kind of search budget: wall-clock seconds, or with `deterministic`
+    CP-SAT deterministic seconds and an interleaved parallel search, so the
+    same payload and seed give the same plan on any machine and load
+  – the recorder, which keeps every searched model for `--capture-dir`
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from solver_capture import Recorder
+from solver_trace import Tracer
+
+# Seconds kept free at the end of the deadline to build and write the result.
+RESULT_RESERVE_S = 0.5
+
+
+class SolveCancelled(RuntimeError):
+    """Raised when a solve is cancelled before any solution exists."""
+
+
+class SolveControl:
+    def __init__(
+        self,
+        deadline_s: Optional[float] = None,
+        tracer: Optional[Tracer] = None,
+        *,
+        deterministic: bool = False,
+        recorder: Optional[Recorder] = None,
+    ):
+        self._started = time.monotonic()
+        self._deadline = (
+            self._started + float(deadline_s) if deadline_s is not None else None
+        )
+        self._cancelled = threading.Event()
+        # phase spans and search logs of every solve (no-op without a file)
+        self.tracer = tracer or Tracer()
+        # searched models for a capture (no-op without a directory)
+        self.recorder = recorder or Recorder()
+        self.deterministic = deterministic
+        # deterministic seconds spent by all searches so far
+        self.deterministic_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def cancel(self) -> None:
+        """Request cancellation; safe to call from signal handlers and threads."""
+        self._cancelled.set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the global deadline, or None without one."""
+        if self._deadline is None:
+            return None
+        return self._deadline - time.monotonic()
+
+    def time_limit(self, requested_s: float) -> float:
+        """Clamp a per-solve time limit so the result is ready before the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return float(requested_s)
+        return max(min(float(requested_s), remaining - RESULT_RESERVE_S), 0.0)
+
+    def limit(self, solver, time_limit_s: float) -> None:
+        """
+        Set the search budget of `solver`. With `deterministic`, `time_limit_s`
+        counts deterministic seconds and the workers are interleaved; only the
+        deadline is enforced on the wall clock.
+        """
+        if not self.deterministic:
+            solver.parameters.max_time_in_seconds = self.time_limit(time_limit_s)
+            return
+        solver.parameters.max_deterministic_time = float(time_limit_s)
+        solver.parameters.interleave_search = True
+        remaining = self.remaining()
+        if remaining is not None:
+            solver.parameters.max_time_in_seconds = max(
+                remaining - RESULT_RESERVE_S, 0.0
+            )
+
+    def spend_deterministic(self, seconds: float) -> None:
+        """Add to `deterministic_seconds` (thread-safe)."""
+        with self._lock:
+            self.deterministic_seconds += seconds
+
+    def check(self) -> None:
+        """Abort between phases (parse, build) when cancelled or out of time."""
+        if self.cancelled:
+            raise SolveCancelled("Solve was cancelled before a solution was found")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= RESULT_RESERVE_S:
+            raise SolveCancelled("Deadline reached before the search could start")
+
+    @contextmanager
+    def running(self, solver, model=None) -> Iterator[None]:
+        """
+        Stop `solver` as soon as cancellation is requested while it searches.
+
+        `StopSearch` is a no-op until `Solve` has actually started, so a watcher
+        thread keeps calling it (every 50 ms) until the search returns.
+        The search is traced as one span, with its log routed to the tracer;
+        when `model` is given, it is handed to the recorder afterwards.
+        """
+        self.tracer.attach(solver)
+        done = threading.Event()
+
+        def watch() -> None:
+            while not done.wait(0.05):
+                if self.cancelled:
+                    solver.StopSearch()
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            with self.tracer.span("search"):
+                yield
+            self.spend_deterministic(solver.response_proto.deterministic_time)
+            if model is not None:
+                self.recorder.search(model, solver)
+        finally:
+            done.set()
@@ -0,0 +1,521 @@
+"""
+Model-size and solve-time estimate of a leg (`--mode estimate`).
+
+`estimate_leg_model` walks the sections of `build_flight_leg_model` on the
+payload alone and counts, per section, the variables, constraints, non-zeros
+and objective terms the flat model would get, the frozen elimination of 0.e
+included. With `aggregateClasses` the counts are an upper bound: classes are
+not formed here.
+
+`expected_seconds` turns the non-zeros into an expected time-to-good-solution
+(the wall seconds until the incumbent is within `GOOD_GAP` of the best
+solution of a long run), using a power law fitted by
+`benchmark.py --fit-estimator` and stored in `solve_time_fit.json`.
+`suggest_time_limit` and `auto_engine` turn it into the time limit and engine
+of `timeLimit: "auto"` and `engine: "auto"`.
+
+This module must not import OR-Tools (see `solver_checks`).
+"""
+
+import json
+import math
+from collections import Counter, defaultdict
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from solver_checks import reserve_group_car_seats
+from solver_types import Balloon, Car, Person, VehicleAssignment
+
+FIT_FILE = Path(__file__).with_name("solve_time_fit.json")
+
+# An incumbent within this share of the run's best objective counts as good.
+GOOD_GAP = 0.01
+
+# Range of suggested time limits, in seconds.
+MIN_TIME_LIMIT_S = 5
+MAX_TIME_LIMIT_S = 600
+
+# People from which `engine: "auto"` always solves first legs hierarchically.
+HIERARCHICAL_MIN_PEOPLE = 300
+
+# Contacts per person considered by 3.5b (`max_contacts_per_person`).
+MEETING_CONTACTS = 8
+
+COUNTS = ("variables", "constraints", "nonzeros", "objectiveTerms")
+
+# Stands for a model variable where the model may also hold a constant 0 / 1.
+FREE = "free"
+
+
+def estimate_leg_model(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    group_history: Optional[Dict[str, Dict[str, int]]],
+    balloon_history: Optional[Dict[str, Dict[str, int]]],
+    people_meet_history: Optional[Dict[str, Dict[str, int]]],
+    frozen: Optional[Dict[str, VehicleAssignment]],
+    fixed_groups: Optional[Dict[str, str]],
+    planning_horizon_legs: int,
+    c_common_language_passengers: bool,
+    c_common_language_operators: bool,
+    w_pilot_fairness: int,
+    w_passenger_fairness: int,
+    w_tiebreak_fairness: int,
+    w_no_solo_participant: int,
+    w_divers_nationalities: int,
+    w_new_meetings: int,
+    w_group_passenger_balance: int,
+    w_group_rotation: int,
+    w_balloon_rotation: int,
+    w_low_flights_lookahead: int,
+    **_options: Any,
+) -> Dict[str, Any]:
+    """
+    Counts per model section ("1" for the seat variables, then the numbering
+    of `build_flight_leg_model`) and in total; arguments are those of
+    `build_flight_leg_model`. Objective terms are counted per section, and
+    once per variable in the total, as CP-SAT merges repeated terms.
+    """
+    vehicle_groups = vehicle_groups or {}
+    cars = [dict(c) for c in cars]
+    reserve_group_car_seats(balloons, cars, vehicle_groups)
+
+    person_ids = list(dict.fromkeys(p["id"] for p in people))
+    people_by_id = {p["id"]: p for p in people}
+    balloon_ids = [b["id"] for b in balloons]
+    car_ids = [c["id"] for c in cars]
+    vehicle_ids = balloon_ids + car_ids
+    vehicles_by_id = {v["id"]: v for v in [*balloons, *cars]}
+    capacity = {v: int(vehicles_by_id[v]["maxCapacity"]) for v in vehicle_ids}
+    allowed_op = {
+        v: set(vehicles_by_id[v].get("allowedOperatorIds", [])) for v in vehicle_ids
+    }
+    langs = {p: people_by_id[p].get("languages") for p in person_ids}
+    is_participant = {
+        p: people_by_id[p].get("role", "participant") == "participant"
+        for p in person_ids
+    }
+    nationalities = {
+        people_by_id[p].get("nationality") or "unknown" for p in person_ids
+    }
+
+    # 0.e frozen elimination, as in `frozen_handles`
+    seats: Dict[str, set] = defaultdict(set)
+    operates: Dict[str, str] = {}
+    for vid, assignment in (frozen or {}).items():
+        if assignment["operatorId"] is not None:
+            seats[assignment["operatorId"]].add(vid)
+            operates[assignment["operatorId"]] = vid
+        for pid in assignment["passengerIds"]:
+            seats[pid].add(vid)
+    seat_of = {
+        p: next(iter(vids))
+        for p, vids in seats.items()
+        if p in people_by_id and len(vids) == 1 and vids <= set(vehicle_ids)
+    }
+    seated = Counter(seat_of.values())
+    operated = {operates[p] for p in seat_of if p in operates}
+    full = {v for v in vehicle_ids if seated[v] >= capacity[v]}
+
+    def pax_free(p: str, v: str) -> bool:
+        return p not in seat_of and v not in full
+
+    def op_free(p: str, v: str) -> bool:
+        return pax_free(p, v) and v not in operated
+
+    def seated_in(p: str, v: str) -> bool:
+        return seat_of.get(p) == v
+
+    sizes: Dict[str, Counter] = defaultdict(Counter)
+    objective = set()
+
+    def variables(section: str, n: int = 1) -> None:
+        sizes[section]["variables"] += n
+
+    def constraint(section: str, refs: int) -> None:
+        sizes[section]["constraints"] += 1
+        sizes[section]["nonzeros"] += refs
+
+    def term(section: str, key: tuple) -> None:
+        sizes[section]["objectiveTerms"] += 1
+        objective.add(key)
+
+    # 1. seat variables
+    for p, v in product(person_ids, vehicle_ids):
+        variables("1", pax_free(p, v) + op_free(p, v))
+
+    # 2.1 - 2.5
+    for p in person_ids:
+        if p in seat_of:
+            continue
+        constraint("2.1", sum(pax_free(p, v) for v in vehicle_ids))
+        constraint("2.1", sum(op_free(p, v) for v in vehicle_ids))
+        for v in vehicle_ids:
+            if op_free(p, v):
+                constraint("2.2", 2)
+                if p not in allowed_op[v]:
+                    constraint("2.2", 1)
+    free_people = [p for p in person_ids if p not in seat_of]
+    occ: Dict[str, bool] = {}  # whether v gets an occupancy variable
+    for v in vehicle_ids:
+        free_seats = 0 if v in full else len(free_people)
+        if free_seats:
+            constraint("2.3", free_seats)
+            if vehicles_by_id[v].get("maxWeight") is not None:
+                if int(vehicles_by_id[v]["maxWeight"]) > 0:
+                    constraint("2.4", free_seats)
+        operators = sum(op_free(p, v) for p in person_ids)
+        if v in operated:
+            occ[v] = False
+            continue
+        constraint("2.5", operators)
+        if seated[v]:
+            occ[v] = False
+            constraint("2.5", operators)
+            continue
+        occ[v] = True
+        variables("2.5")
+        for _ in range(free_seats):
+            constraint("2.5", 2)
+        constraint("2.5", operators + 1)
+
+    # 2.7 stay in group
+    frozen_people = {
+        p
+        for a in (frozen or {}).values()
+        for p in ([a["operatorId"]] + a["passengerIds"])
+        if p
+    }
+    for pid, bid in (fixed_groups or {}).items():
+        if pid in frozen_people or pid not in people_by_id:
+            continue
+        allowed = {bid, *vehicle_groups.get(bid, [])}
+        for v in vehicle_ids:
+            if v not in allowed and pax_free(pid, v):
+                constraint("2.7", 1)
+
+    # 2.8 / 2.9 language rules
+    def speaks_all(p: str) -> bool:
+        return not langs.get(p)
+
+    speaks: Dict[tuple, Any] = {}
+
+    def operator_speaks(section: str, v: str, lang: str) -> Any:
+        """FREE, or whether the frozen operator of v speaks lang."""
+        if (v, lang) not in speaks:
+            speakers = [
+                q
+                for q in sorted(allowed_op[v])
+                if q in people_by_id and (speaks_all(q) or lang in langs[q])
+            ]
+            free = sum(op_free(q, v) for q in speakers)
+            if free:
+                variables(section)
+                constraint(section, free + 1)
+                speaks[v, lang] = FREE
+            else:
+                speaks[v, lang] = int(any(operates.get(q) == v for q in speakers))
+        return speaks[v, lang]
+
+    def shared_languages(section: str, v: str, p: str) -> Optional[int]:
+        shared = [operator_speaks(section, v, lang) for lang in sorted(set(langs[p]))]
+        if 1 in shared:
+            return None
+        return shared.count(FREE)
+
+    if c_common_language_passengers:
+        for v in balloon_ids:
+            for p in person_ids:
+                if speaks_all(p) or not (pax_free(p, v) or seated_in(p, v)):
+                    continue
+                shared = shared_languages("2.8", v, p)
+                if shared is not None:
+                    constraint("2.8", shared + pax_free(p, v) if shared else 1)
+
+    if c_common_language_operators:
+        for bid in balloon_ids:
+            for cid in vehicle_groups.get(bid, []):
+                if cid not in occ or not allowed_op.get(cid):
+                    continue
+                for p in sorted(allowed_op.get(bid, set())):
+                    if p not in people_by_id or speaks_all(p):
+                        continue
+                    if not (op_free(p, bid) or operates.get(p) == bid):
+                        continue
+                    shared = shared_languages("2.9", cid, p)
+                    if shared is not None:
+                        refs = shared + op_free(p, bid) + occ[cid]
+                        if refs:
+                            constraint("2.9", refs)
+
+    # 3.1 pilot fairness
+    if w_pilot_fairness != 0:
+        for p, v in product(person_ids, vehicle_ids):
+            if p in allowed_op[v] and op_free(p, v):
+                term("3.1", ("op", p, v))
+
+    # 3.2 low-flight pax in balloons; 3.8 tiebreak
+    for section, weight in (
+        ("3.2", w_passenger_fairness),
+        ("3.8", w_tiebreak_fairness),
+    ):
+        if weight != 0:
+            for p, v in product(person_ids, balloon_ids):
+                if pax_free(p, v):
+                    term(section, ("pax", p, v))
+
+    # 3.3 no participants alone in a car
+    participants = [p for p in person_ids if is_participant[p]]
+    if w_no_solo_participant != 0:
+        for v in car_ids:
+            free = sum(pax_free(p, v) for p in participants)
+            if free:
+                variables("3.3")
+                constraint("3.3", free + 1)
+                constraint("3.3", free + 1)
+                term("3.3", ("solo", v))
+
+    # 3.4 group passenger deviation
+    if w_group_passenger_balance != 0 and not fixed_groups:
+        for bid, group_cars in vehicle_groups.items():
+            free = sum(pax_free(p, v) for v in group_cars for p in person_ids)
+            variables("3.4", 2)
+            constraint("3.4", free + 2)
+            term("3.4", ("devP", bid))
+            term("3.4", ("devN", bid))
+
+    # 3.5a diversity
+    if w_divers_nationalities != 0 and len(nationalities) > 1:
+        for v in vehicle_ids:
+            if v in full:
+                continue
+            free = Counter(
+                people_by_id[p].get("nationality") or "unknown"
+                for p in person_ids
+                if pax_free(p, v)
+            )
+            variables("3.5a", len(nationalities) + 3)
+            for nat in nationalities:
+                constraint("3.5a", free[nat] + 1)
+            constraint("3.5a", len(nationalities) + 1)
+            constraint("3.5a", sum(free.values()) + 1)
+            constraint("3.5a", 3)
+            term("3.5a", ("minority", v))
+
+    # 3.5b repeated meetings
+    if w_new_meetings != 0 and not fixed_groups and people_meet_history is not None:
+        in_group = {}
+        for p, bid in product(participants, balloon_ids):
+            group_vehicles = [bid, *vehicle_groups.get(bid, [])]
+            if any(seated_in(p, v) for v in group_vehicles):
+                in_group[p, bid] = 1
+                continue
+            free = sum(pax_free(p, v) for v in group_vehicles)
+            if not free:
+                in_group[p, bid] = 0
+                continue
+            variables("3.5b")
+            constraint("3.5b", free + 1)
+            for _ in range(free):
+                constraint("3.5b", 2)
+            in_group[p, bid] = FREE
+
+        for p in participants:
+            contacts = [
+                q
+                for q in people_meet_history.get(p, {})
+                if q != p and is_participant.get(q, False)
+            ][-MEETING_CONTACTS:]
+            if not contacts:
+                continue
+            for bid in balloon_ids:
+                if in_group[p, bid] == 0:
+                    continue
+                groups = [in_group[q, bid] for q in contacts if (q, bid) in in_group]
+                if 1 in groups:
+                    any_contact = 1
+                else:
+                    free = groups.count(FREE)
+                    if not free:
+                        continue
+                    variables("3.5b")
+                    constraint("3.5b", free + 1)
+                    for _ in range(free):
+                        constraint("3.5b", 2)
+                    any_contact = FREE
+                if in_group[p, bid] == any_contact == FREE:
+                    variables("3.5b")
+                    constraint("3.5b", 3)
+                    constraint("3.5b", 3)
+                    term("3.5b", ("repeat", p, bid))
+                elif in_group[p, bid] == FREE:
+                    term("3.5b", ("inGroup", p, bid))
+                elif any_contact == FREE:
+                    term("3.5b", ("anyContact", p, bid))
+
+    # 3.6 fresh group, 3.6b balloon rotation
+    rotations = []
+    if w_group_rotation != 0 and not fixed_groups and group_history:
+        rotations.append(("3.6", vehicle_ids))
+    if w_balloon_rotation != 0 and balloon_history:
+        rotations.append(("3.6b", balloon_ids))
+    for section, rotated in rotations:
+        for p, v in product(person_ids, rotated):
+            if pax_free(p, v):
+                term(section, ("pax", p, v))
+            if op_free(p, v):
+                term(section, ("op", p, v))
+
+    # 3.6c balloon rotation lookahead
+    if (
+        w_balloon_rotation != 0
+        and balloon_history
+        and not fixed_groups
+        and planning_horizon_legs >= 1
+    ):
+        for p, bid in product(person_ids, balloon_ids):
+            for cid in vehicle_groups.get(bid, []):
+                if pax_free(p, cid):
+                    term("3.6c", ("pax", p, cid))
+
+    # 3.7 language-aware lookahead
+    if w_low_flights_lookahead != 0 and planning_horizon_legs >= 1:
+        for bid in balloon_ids:
+            if capacity[bid] <= 0:
+                continue
+            speakers = [langs.get(q) for q in allowed_op.get(bid, set())]
+            eligible = [
+                p
+                for p in person_ids
+                if speaks_all(p)
+                or any(not lq or set(langs[p]) & set(lq) for lq in speakers)
+            ]
+            if not eligible:
+                continue
+            flights = sorted(
+                int(people_by_id[p].get("flightsSoFar", 0)) for p in eligible
+            )
+            cutoff = flights[
+                min(planning_horizon_legs * capacity[bid], len(flights)) - 1
+            ]
+            free = sum(
+                pax_free(p, cid)
+                for cid in vehicle_groups.get(bid, [])
+                for p in eligible
+                if int(people_by_id[p].get("flightsSoFar", 0)) <= cutoff
+            )
+            variables("3.7")
+            constraint("3.7", free + 1)
+            term("3.7", ("short", bid))
+
+    sections = {
+        key: {name: counts[name] for name in COUNTS}
+        for key, counts in sorted(sizes.items(), key=lambda kv: _section_order(kv[0]))
+    }
+    total = {name: sum(s[name] for s in sections.values()) for name in COUNTS}
+    total["objectiveTerms"] = len(objective)
+    return {"sections": sections, "total": total, "secondLeg": bool(fixed_groups)}
+
+
+def _section_order(key: str) -> tuple:
+    number, _, letter = key.partition(".")
+    minor = "".join(c for c in letter if c.isdigit())
+    return (int(number), int(minor or 0), letter)
+
+
+def load_fit(path: Path = FIT_FILE) -> Optional[Dict[str, Any]]:
+    """The stored time fit, or None if there is none."""
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _features(nonzeros: int, second_leg: bool) -> List[float]:
+    return [1.0, math.log(max(nonzeros, 1)), float(second_leg)]
+
+
+def _least_squares(rows: List[List[float]], ys: List[float]) -> List[float]:
+    """Solve the normal equations of rows · x ≈ ys (Gauss-Jordan)."""
+    n = len(rows[0])
+    a = [
+        [sum(r[i] * r[j] for r in rows) for j in range(n)]
+        + [sum(r[i] * y for r, y in zip(rows, ys))]
+        for i in range(n)
+    ]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-12:
+            raise ValueError("Runs do not determine the solve-time fit")
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(n):
+            if r != col:
+                factor = a[r][col] / a[col][col]
+                a[r] = [x - factor * y for x, y in zip(a[r], a[col])]
+    return [a[i][n] / a[i][i] for i in range(n)]
+
+
+def fit_solve_times(runs: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Least-squares fit of the benchmark runs ({"nonzeros", "secondLeg",
+    "goodSeconds"}) to
+
+        seconds = scale · nonzeros ^ exponent · secondLegFactor ^ secondLeg
+
+    Second legs need their own factor: with fixed groups the model falls
+    apart into small groups and solves far faster than its size suggests.
+    `spread` is the largest ratio of a measured to a predicted time.
+    """
+    rows = [_features(r["nonzeros"], r["secondLeg"]) for r in runs]
+    ys = [math.log(max(r["goodSeconds"], 1e-3)) for r in runs]
+    log_scale, exponent, second_leg = _least_squares(rows, ys)
+    spread = max(
+        math.exp(y - log_scale - exponent * row[1] - second_leg * row[2])
+        for row, y in zip(rows, ys)
+    )
+    return {
+        "scale": math.exp(log_scale),
+        "exponent": exponent,
+        "secondLegFactor": math.exp(second_leg),
+        "spread": max(spread, 1.0),
+    }
+
+
+def expected_seconds(estimate: Dict[str, Any], fit: Dict[str, Any]) -> float:
+    """Expected seconds to a good solution of an `estimate_leg_model` result."""
+    c = fit["coefficients"]
+    seconds = c["scale"] * max(estimate["total"]["nonzeros"], 1) ** c["exponent"]
+    return seconds * (c["secondLegFactor"] if estimate["secondLeg"] else 1.0)
+
+
+def suggest_time_limit(expected: Optional[float], fit: Optional[Dict[str, Any]]) -> int:
+    """
+    Time limit for `timeLimit: "auto"`: the expected time times the fit's
+    spread, within [`MIN_TIME_LIMIT_S`, `MAX_TIME_LIMIT_S`]; the maximum
+    without a fit.
+    """
+    if expected is None or fit is None:
+        return MAX_TIME_LIMIT_S
+    time_limit = math.ceil(expected * fit["coefficients"]["spread"])
+    return min(max(time_limit, MIN_TIME_LIMIT_S), MAX_TIME_LIMIT_S)
+
+
+def auto_engine(
+    people: int,
+    vehicle_groups: Dict[str, List[str]],
+    fixed_groups: Optional[Dict[str, str]],
+    expected: Optional[float] = None,
+) -> str:
+    """
+    What `engine: "auto"` resolves to: hierarchical for large camps, or when
+    the flat model is not expected to get good within `MAX_TIME_LIMIT_S`,
+    where the decomposition applies (a first leg with several groups).
+    """
+    if fixed_groups or len(vehicle_groups) < 2:
+        return "flat"
+    slow = expected is not None and expected > MAX_TIME_LIMIT_S
+    return "hierarchical" if slow or people >= HIERARCHICAL_MIN_PEOPLE else "flat"
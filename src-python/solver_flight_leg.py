@@ -27,11 +27,21 @@ All weights are user-tunable kwargs.
 """
 
 import random
+import time
+from dataclasses import dataclass, field
 from itertools import product
-from collections import defaultdict
-from typing import List, Dict, Optional, TypedDict, Literal
+from collections import Counter, defaultdict
+from typing import Any, Callable, List, Dict, Optional, TypedDict, Literal
 
 from ortools.sat.python import cp_model
+from solver_checkpoint import Checkpoint
+from solver_checks import (
+    leg_option_problems,
+    leg_seat_problems,
+    reserve_group_car_seats,
+)
+from solver_control import SolveControl, SolveCancelled
+from solver_model_cache import ModelCache, structure_key
 from solver_types import Balloon, Car, Vehicle, Person, VehicleAssignment
 
 
@@ -45,12 +55,305 @@ class CarV(Car):
 
 class Manifest(TypedDict):
     assignments: Dict[str, VehicleAssignment]
+    status: Literal["optimal", "feasible", "cancelled"]
+    objective: Dict[str, Any]
+
+
+# Objective section (numbering below) -> the `options.weights` key scaling it
+SECTION_WEIGHTS: Dict[str, str] = {
+    "3.1": "pilotFairness",
+    "3.2": "passengerFairness",
+    "3.3": "noSoloParticipant",
+    "3.4": "groupPassengerBalance",
+    "3.5a": "diverseNationalities",
+    "3.5b": "meetingNewPeople",
+    "3.6": "groupRotation",
+    "3.6b": "balloonRotation",
+    "3.6c": "balloonRotation",
+    "3.7": "lowFlightsLookahead",
+    "3.8": "tiebreakFairness",
+}
+
+
+# `options.weights` key -> `build_flight_leg_model` keyword argument
+WEIGHT_KWARGS: Dict[str, str] = {
+    "pilotFairness": "w_pilot_fairness",
+    "passengerFairness": "w_passenger_fairness",
+    "noSoloParticipant": "w_no_solo_participant",
+    "groupPassengerBalance": "w_group_passenger_balance",
+    "diverseNationalities": "w_divers_nationalities",
+    "meetingNewPeople": "w_new_meetings",
+    "groupRotation": "w_group_rotation",
+    "balloonRotation": "w_balloon_rotation",
+    "lowFlightsLookahead": "w_low_flights_lookahead",
+    "tiebreakFairness": "w_tiebreak_fairness",
+}
+
+
+def _fixed(handle: Any) -> bool:
+    """Whether a model handle is a constant (0 / 1) left by frozen seats."""
+    return isinstance(handle, int)
+
+
+def _add(model: cp_model.CpModel, constraint: Any) -> None:
+    """`model.Add`, except for constraints frozen seats already satisfy."""
+    if constraint is not True:
+        model.Add(constraint)
+
+
+@dataclass
+class ObjectiveSection:
+    """Unweighted linear terms (coef · var) of one objective section."""
+
+    weight_name: str
+    vars: List[Any] = field(default_factory=list)
+    coefs: List[float] = field(default_factory=list)
+    # terms on constant handles (frozen seats), summed up front
+    constant: float = 0.0
+    folded: int = 0
+
+    def add(self, coef: float, var: Any) -> None:
+        if _fixed(var):
+            self.constant += coef * var
+            self.folded += 1
+            return
+        self.vars.append(var)
+        self.coefs.append(coef)
+
+    def value(self, value_of: Callable[[Any], int]) -> float:
+        return self.constant + float(
+            sum(c * value_of(v) for c, v in zip(self.coefs, self.vars))
+        )
+
+
+@dataclass
+class FlightLegModel:
+    """A built, not yet solved, leg model and the handles to read it back."""
+
+    model: cp_model.CpModel
+    # (person, vehicle) -> variable, or 0 / 1 where frozen seats decide it
+    op: Dict[tuple, Any]
+    pax: Dict[tuple, Any]
+    person_ids: List[str]
+    vehicle_ids: List[str]
+    sections: Dict[str, ObjectiveSection] = field(default_factory=dict)
+    weights: Dict[str, float] = field(default_factory=dict)
+    # aggregated classes: class id (in `person_ids`) -> members, best priority
+    # first; pax[class, v] is then an integer seat count
+    classes: Dict[str, List[str]] = field(default_factory=dict)
+    balloon_ids: List[str] = field(default_factory=list)
+    # with a model cache: whether the structure came from it
+    cache_hit: Optional[bool] = None
 
 
 # ---------------------------------------------------------------------------
 # Main one-leg solver (sequential-leg workflow)
 # ---------------------------------------------------------------------------
 def solve_flight_leg(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    time_limit_s: int,
+    num_search_workers: int = 15,
+    hint: Optional[Dict[str, VehicleAssignment]] = None,
+    control: Optional[SolveControl] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **model_kwargs: Any,
+) -> Manifest:
+    """Solve a *single* leg; call once per flight.
+
+    `model_kwargs` are passed to `build_flight_leg_model` (histories, frozen
+    seats, weights, seed, ...).
+
+    `hint` is an optional earlier manifest (e.g. the same leg of the previous
+    day) used to warm-start the search. It is never enforced; people or
+    vehicles that no longer exist are ignored.
+
+    `control` carries the process-wide deadline and cancel flag. On cancel the
+    search stops and the best solution so far is returned (status "cancelled").
+
+    With `checkpoint`, improving solutions are saved to it during the search
+    (see `solver_checkpoint`). `on_progress` is called with
+    `{"type": "incumbent", "objective", "bound", "seconds"}` for every
+    improving solution and `{"type": "bound", "bound", "seconds"}` for every
+    better objective bound.
+    """
+    control = control or SolveControl()
+    if time_limit_s <= 0:
+        raise ValueError("Time limit must be positive")
+
+    control.check()
+    started = time.perf_counter()
+    with control.tracer.span("build", profile=True, people=len(people)):
+        built = build_flight_leg_model(
+            balloons, cars, people, vehicle_groups, control=control, **model_kwargs
+        )
+    build_seconds = time.perf_counter() - started
+
+    # warm start
+    if hint:
+        add_manifest_hint(
+            built.model,
+            built.op,
+            built.pax,
+            hint,
+            built.person_ids,
+            built.vehicle_ids,
+            classes=built.classes,
+        )
+
+    result = solve_built_leg(
+        built,
+        time_limit_s=time_limit_s,
+        num_search_workers=num_search_workers,
+        random_seed=model_kwargs.get("random_seed"),
+        control=control,
+        checkpoint=checkpoint,
+        on_progress=on_progress,
+    )
+    if built.cache_hit is not None:
+        result["modelCache"] = {"hit": built.cache_hit, "buildSeconds": build_seconds}
+    return result
+
+
+def score_flight_leg(
+    manifest: Dict[str, VehicleAssignment],
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    time_limit_s: float,
+    num_search_workers: int = 15,
+    control: Optional[SolveControl] = None,
+    **model_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Objective breakdown of a given, valid `manifest` under the current data
+    and weights: the leg model with every seat frozen, so only the auxiliary
+    variables of the objective are left to the solver.
+    """
+    control = control or SolveControl()
+    built = build_flight_leg_model(
+        balloons,
+        [dict(c) for c in cars],
+        people,
+        vehicle_groups,
+        control=control,
+        **{**model_kwargs, "frozen": manifest, "aggregate_classes": False},
+    )
+    return solve_built_leg(
+        built,
+        time_limit_s=time_limit_s,
+        num_search_workers=num_search_workers,
+        random_seed=model_kwargs.get("random_seed"),
+        control=control,
+    )["objective"]
+
+
+def solve_built_leg(
+    built: "FlightLegModel",
+    *,
+    time_limit_s: float,
+    num_search_workers: int,
+    random_seed: Optional[int],
+    control: SolveControl,
+    checkpoint: Optional[Checkpoint] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Manifest:
+    """Solve an already built leg model with its current objective and hints."""
+    # ------------------------------------------------------------------
+    # 4. Solve
+    # ------------------------------------------------------------------
+    control.check()
+    solver = cp_model.CpSolver()
+    control.limit(solver, time_limit_s)
+    solver.parameters.num_search_workers = int(max(1, num_search_workers))
+    if random_seed is not None:
+        solver.parameters.random_seed = int(random_seed)
+
+    callback = None
+    if checkpoint is not None or on_progress is not None:
+        callback = _SolutionCallback(built, checkpoint, on_progress)
+    if on_progress is not None:
+        started = time.perf_counter()
+        solver.best_bound_callback = lambda bound: on_progress(
+            {
+                "type": "bound",
+                "bound": bound,
+                "seconds": time.perf_counter() - started,
+            }
+        )
+    with control.running(solver, built.model):
+        status = solver.Solve(built.model, callback)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        if status == cp_model.INFEASIBLE:
+            raise RuntimeError("No feasible assignment")
+        elif control.cancelled:
+            raise SolveCancelled("Solve was cancelled before a solution was found")
+        else:
+            raise RuntimeError("Solver failed")
+
+    # ------------------------------------------------------------------
+    # 5. Manifest
+    # ------------------------------------------------------------------
+    result: Manifest = {
+        "assignments": read_manifest(built, solver.Value),
+        "status": solve_status(status, control),
+        "objective": objective_breakdown(built, solver),
+    }
+    if checkpoint is not None:
+        checkpoint.save(
+            result["assignments"],
+            objective=solver.ObjectiveValue(),
+            bound=solver.BestObjectiveBound(),
+            seconds=solver.WallTime(),
+            status=result["status"],
+        )
+    return result
+
+
+class _SolutionCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Saves improving solutions to a checkpoint, at most once per interval, and
+    reports them to `on_progress`.
+    """
+
+    def __init__(
+        self,
+        built: "FlightLegModel",
+        checkpoint: Optional[Checkpoint],
+        on_progress: Optional[Callable[[Dict[str, Any]], None]],
+    ):
+        super().__init__()
+        self.built = built
+        self.checkpoint = checkpoint
+        self.on_progress = on_progress
+
+    def on_solution_callback(self) -> None:
+        if self.on_progress is not None:
+            self.on_progress(
+                {
+                    "type": "incumbent",
+                    "objective": self.ObjectiveValue(),
+                    "bound": self.BestObjectiveBound(),
+                    "seconds": self.WallTime(),
+                }
+            )
+        if self.checkpoint is not None and self.checkpoint.due():
+            self.checkpoint.save(
+                read_manifest(self.built, self.Value),
+                objective=self.ObjectiveValue(),
+                bound=self.BestObjectiveBound(),
+                seconds=self.WallTime(),
+                status="running",
+            )
+
+
+def build_flight_leg_model(
     balloons: List[Balloon],
     cars: List[Car],
     people: List[Person],
@@ -79,25 +382,42 @@ def solve_flight_leg(
     counselor_flight_discount: float,
     # misc
     default_person_weight: int,
-    time_limit_s: int,
-    num_search_workers: int = 15,
     random_seed: Optional[int] = None,
-) -> Manifest:
-    """Solve a *single* leg; call once per flight."""
+    tiebreak_seed: Optional[int] = None,
+    aggregate_classes: bool = False,
+    model_cache: Optional[ModelCache] = None,
+    control: Optional[SolveControl] = None,
+) -> FlightLegModel:
+    """Build the CP-SAT model of a single leg without solving it.
+
+    `random_seed` shuffles the inputs, and with them the variable order. The
+    tiebreak priorities (3.8) follow the people order of `tiebreak_seed`
+    instead when it is given, so models built with different `random_seed`s
+    share one objective.
+
+    With `aggregate_classes`, interchangeable people (see
+    `equivalence_classes`) share one integer seat count per vehicle instead
+    of one Boolean each; names are given to seats in `read_manifest`.
+
+    With `model_cache`, variables and hard constraints are reused from an
+    earlier build of the same structure (see `solver_model_cache`).
+
+    With `control`, the build stops between sections with `SolveCancelled`
+    once it is cancelled or its deadline has passed.
+    """
+    control = control or SolveControl()
 
     # ------------------------------------------------------------------
     # 0. Input validation
     # ------------------------------------------------------------------
-    if default_person_weight < 0:
-        raise ValueError("Default person weight must be non-negative")
-    if time_limit_s <= 0:
-        raise ValueError("Time limit must be positive")
-    if planning_horizon_legs < 0:
-        raise ValueError("Planning horizon must be non-negative")
-    if w_passenger_fairness * w_tiebreak_fairness < 0:
-        raise ValueError(
-            "Passenger fairness weight and tiebreak fairness must have the same sign"
-        )
+    problems = leg_option_problems(
+        default_person_weight=default_person_weight,
+        planning_horizon_legs=planning_horizon_legs,
+        w_passenger_fairness=w_passenger_fairness,
+        w_tiebreak_fairness=w_tiebreak_fairness,
+    )
+    if problems:
+        raise ValueError(problems[0])
 
     # ------------------------------------------------------------------
     # 0.a Input preparation
@@ -106,6 +426,13 @@ def solve_flight_leg(
     balloons = balloons[:]
     cars = cars[:]
     people = people[:]
+    # people in the order of `tiebreak_seed`'s shuffles (see below)
+    tiebreak_people = people
+    if tiebreak_seed is not None and tiebreak_seed != random_seed:
+        rng = random.Random(tiebreak_seed)
+        tiebreak_people = people[:]
+        for items in (balloons[:], cars[:], tiebreak_people):
+            rng.shuffle(items)
     # Deterministic shuffles
     random.seed(random_seed)
     random.shuffle(balloons)
@@ -139,7 +466,7 @@ def solve_flight_leg(
     nationality = {
         p: (people_by_id[p].get("nationality") or "unknown") for p in person_ids
     }
-    nationalities = set(nationality.values())
+    nationalities = sorted(set(nationality.values()))
     is_participant = {
         p: (people_by_id[p].get("role", "participant") == "participant")
         for p in person_ids
@@ -173,182 +500,327 @@ def solve_flight_leg(
     # instead of letting the solver grind toward a bare "No feasible
     # assignment" once nothing fits.
     # ------------------------------------------------------------------
-    total_capacity = sum(capacity.values())
-    if len(person_ids) > total_capacity:
-        raise ValueError(
-            f"Not enough seats for everyone: {len(person_ids)} people but only "
-            f"{total_capacity} seats across all vehicles."
-        )
-
-    vehicle_names = {v: vehicles_by_id[v].get("name", v) for v in vehicle_ids}
-    for vid, assignment in (frozen or {}).items():
-        if vid not in capacity:
-            continue
-        seat_count = len(
-            {assignment["operatorId"]} - {None} | set(assignment["passengerIds"])
-        )
-        if seat_count > capacity[vid]:
-            raise ValueError(
-                f"Fixed assignment for {vehicle_names.get(vid, vid)} needs "
-                f"{seat_count} seats but it only has {capacity[vid]}."
-            )
-        op_id = assignment["operatorId"]
-        if op_id is not None and op_id not in allowed_op.get(vid, set()):
-            op_name = people_by_id.get(op_id, {}).get("name", op_id)
-            raise ValueError(
-                f"{op_name} is fixed as the operator of "
-                f"{vehicle_names.get(vid, vid)} but is not an eligible operator "
-                f"for it."
-            )
+    problems = leg_seat_problems(balloons, cars, people, frozen)
+    if problems:
+        raise ValueError(problems[0])
 
+    tiebreak_ids = dict.fromkeys(p["id"] for p in tiebreak_people)
     priorities = {
         p: i
         for i, p in enumerate(
-            sorted(person_ids, key=lambda p: flights_so_far[p] - int(first_time[p]))
+            sorted(tiebreak_ids, key=lambda p: flights_so_far[p] - int(first_time[p]))
         )
     }
 
     # ------------------------------------------------------------------
-    # 1. CP-SAT model
+    # 0.d Equivalence classes: from here on `person_ids` lists "units" — single
+    # people or whole classes, with `size` members each. Every per-person
+    # attribute is shared by a class, except the weight (the heaviest member
+    # is used, so limits hold for any naming) and the tiebreak priority (the
+    # members' mean; the best-priority members get the balloon seats).
     # ------------------------------------------------------------------
-    model = cp_model.CpModel()
-
-    op = {  # operator‑selection vars
-        (p, v): model.NewBoolVar(f"op_{p}_{v}")
-        for p, v in product(person_ids, vehicle_ids)
-    }
-    pax = {  # passenger‑seat vars (operator counts as passenger)
-        (p, v): model.NewBoolVar(f"pax_{p}_{v}")
-        for p, v in product(person_ids, vehicle_ids)
-    }
+    classes: Dict[str, List[str]] = {}
+    if aggregate_classes:
+        classes = equivalence_classes(
+            people,
+            vehicles,
+            frozen_people=frozen_people,
+            fixed_groups=fixed_groups,
+            histories=[group_history, balloon_history, people_meet_history],
+            default_person_weight=default_person_weight,
+        )
+    size = {p: 1 for p in person_ids}
+    class_of = {}
+    for cid, members in classes.items():
+        members.sort(key=priorities.get)
+        for p in members:
+            class_of[p] = cid
+        first = members[0]
+        size[cid] = len(members)
+        weight[cid] = max(weight[p] for p in members)
+        priorities[cid] = sum(priorities[p] for p in members) / len(members)
+        for attr in (flights_so_far, first_time, nationality, is_participant, langs):
+            attr[cid] = attr[first]
+    n_people = len(person_ids)
+    person_ids = [p for p in person_ids if p not in class_of] + list(classes)
+
+    # 2.7 input: take group from previous leg (last entry)
+    allowed = defaultdict(set)
+    for pid, bid in (fixed_groups or {}).items():
+        if pid in frozen_people:
+            continue  # pre-assignments override stickiness
+
+        allowed[pid].add(bid)
+        allowed[pid].update(vehicle_groups.get(bid, []))
 
     # ------------------------------------------------------------------
-    # 2. Hard constraints
+    # 0.e Frozen elimination: see `frozen_handles`. Constraints and objective
+    # terms below resolve constant handles up front (`_fixed`), so the model
+    # grows with the free part only. The model cache keeps one structure for
+    # any frozen seats, so with a cache they stay constraints (2.6).
     # ------------------------------------------------------------------
-    # 2.1 each person exactly one seat / one operator role
-    for p in person_ids:
-        model.Add(sum(pax[p, v] for v in vehicle_ids) == 1)  # seat exactly once
-        model.Add(sum(op[p, v] for v in vehicle_ids) <= 1)  # ≤1 operator role
-
-    # 2.2 operator ⇒ passenger + operator eligibility
-    for p, v in product(person_ids, vehicle_ids):
-        model.AddImplication(op[p, v], pax[p, v])
-        if p not in allowed_op[v]:
-            model.Add(op[p, v] == 0)
-
-    # 2.3 capacity limit
-    for v in vehicle_ids:
-        model.Add(sum(pax[p, v] for p in person_ids) <= capacity[v])
-
-    # 2.4 weight limit
-    for v in vehicle_ids:
-        if max_weight[v] > 0:
-            model.Add(sum(weight[p] * pax[p, v] for p in person_ids) <= max_weight[v])
-
-    # 2.5 occupancy flag & exactly‑one operator if occupied
-    for v in vehicle_ids:
-        occ = model.NewBoolVar(f"occ_{v}")
-        seats = sum(pax[p, v] for p in person_ids)
-        model.Add(seats >= 1).OnlyEnforceIf(occ)
-        model.Add(seats == 0).OnlyEnforceIf(occ.Not())
-        model.Add(sum(op[p, v] for p in person_ids) == 1).OnlyEnforceIf(occ)
-        model.Add(sum(op[p, v] for p in person_ids) == 0).OnlyEnforceIf(occ.Not())
-
-    # 2.6 frozen seats
-    if frozen is not None:
-        for vid, assignment in frozen.items():
-            if assignment["operatorId"] is not None:
-                pid = assignment["operatorId"]
-                model.Add(op[pid, vid] == 1)
-                model.Add(pax[pid, vid] == 1)
+    fixed_pax: Dict[tuple, int] = {}
+    fixed_op: Dict[tuple, int] = {}
+    seat_of: Dict[str, str] = {}
+    if model_cache is None:
+        fixed_pax, fixed_op, seat_of = frozen_handles(
+            frozen, person_ids, vehicle_ids, capacity, classes
+        )
 
-            for pid in assignment["passengerIds"]:
-                model.Add(pax[pid, vid] == 1)
-                model.Add(op[pid, vid] == 0)
+    control.check()
+    # ------------------------------------------------------------------
+    # 1. CP-SAT model — variables and the hard constraints except frozen
+    # seats only depend on this structure, so they may come from the cache
+    # ------------------------------------------------------------------
+    # units are named by their id (classes by their members) and handles are
+    # stored sorted; the seed is part of the key, as the shuffled order is the
+    # variable order of the stored model
+    canonical = {p: p for p in person_ids}
+    canonical.update({cid: f"class:{sorted(m)}" for cid, m in classes.items()})
+    handle_order = sorted(
+        product(person_ids, vehicle_ids), key=lambda k: (canonical[k[0]], k[1])
+    )
+    cache_key = None
+    cached = None
+    if model_cache is not None:
+        cache_key = structure_key(
+            {
+                "people": sorted(
+                    [canonical[p], size[p], weight[p], sorted(langs[p] or [])]
+                    for p in person_ids
+                ),
+                "vehicles": sorted(
+                    [v, kind[v], capacity[v], max_weight[v], sorted(allowed_op[v])]
+                    for v in vehicle_ids
+                ),
+                "groups": vehicle_groups,
+                "allowed": allowed,
+                "languageRules": [
+                    c_common_language_passengers,
+                    c_common_language_operators,
+                ],
+                "seed": random_seed,
+            }
+        )
+        cached = model_cache.load(cache_key)
+
+    if cached is not None:
+        model, op_index, pax_index = cached
+        op_keys = [k for k in handle_order if k[0] not in classes]
+        op = {k: model.GetBoolVarFromProtoIndex(i) for k, i in zip(op_keys, op_index)}
+        pax = {
+            k: model.GetIntVarFromProtoIndex(i) for k, i in zip(handle_order, pax_index)
+        }
+    else:
+        structure_started = time.perf_counter()
+        model = cp_model.CpModel()
+
+        op = {  # operator‑selection vars (classes never operate)
+            (p, v): (
+                fixed_op[p, v]
+                if (p, v) in fixed_op
+                else model.NewBoolVar(f"op_{p}_{v}")
+            )
+            for p, v in product(person_ids, vehicle_ids)
+            if p not in classes
+        }
+        pax = {  # passenger‑seat vars (operator counts as passenger)
+            (p, v): (
+                fixed_pax[p, v]
+                if (p, v) in fixed_pax
+                else (
+                    model.NewIntVar(0, min(size[p], capacity[v]), f"pax_{p}_{v}")
+                    if p in classes
+                    else model.NewBoolVar(f"pax_{p}_{v}")
+                )
+            )
+            for p, v in product(person_ids, vehicle_ids)
+        }
 
-    # 2.7 stay-in-group when this is NOT the first leg
-    # NOTE: the app sends an *empty dict* (not None) on the first leg, so all
-    # first-leg gates below must use truthiness, never `is None`.
-    if fixed_groups:
-        # take group from previous leg (last entry)
-        allowed = defaultdict(set)
+        # ------------------------------------------------------------------
+        # 2. Hard constraints
+        # ------------------------------------------------------------------
+        # 2.1 each person exactly one seat / one operator role
+        for p in person_ids:
+            if p in classes:
+                model.Add(sum(pax[p, v] for v in vehicle_ids) == size[p])
+                continue
+            if p in seat_of:
+                continue  # seated by 0.e
+            seats = [pax[p, v] for v in vehicle_ids if not _fixed(pax[p, v])]
+            model.AddExactlyOne(seats)  # seat exactly once
+            model.AddAtMostOne(  # ≤1 operator role
+                op[p, v] for v in vehicle_ids if not _fixed(op[p, v])
+            )
 
-        for pid, bid in fixed_groups.items():
-            if pid in frozen_people:
-                continue  # pre-assignments override stickiness
+        # 2.2 operator ⇒ passenger + operator eligibility
+        for p, v in product(person_ids, vehicle_ids):
+            if p in classes or _fixed(op[p, v]):
+                continue
+            model.AddImplication(op[p, v], pax[p, v])
+            if p not in allowed_op[v]:
+                model.Add(op[p, v] == 0)
 
-            allowed[pid].add(bid)
-            allowed[pid].update(vehicle_groups.get(bid, []))
+        # 2.3 capacity limit
+        for v in vehicle_ids:
+            _add(model, sum(pax[p, v] for p in person_ids) <= capacity[v])
 
-        for p in allowed:
-            for v in vehicle_ids:
-                if v not in allowed[p]:
-                    model.Add(pax[p, v] == 0)
+        # 2.4 weight limit
+        for v in vehicle_ids:
+            if max_weight[v] > 0:
+                _add(
+                    model,
+                    sum(weight[p] * pax[p, v] for p in person_ids) <= max_weight[v],
+                )
 
-    # 2.8 language compatibility (balloons only):
-    if c_common_language_passengers:
+        # 2.5 occupancy flag & exactly‑one operator if occupied, as clauses:
+        #   seat ⇒ occ,  occ ⇒ some operator,  ≤1 operator
+        # An operator is seated (2.2), so an occupied vehicle has a seat taken
+        # and an empty one has no operator.
+        # A frozen seat makes the vehicle occupied, a frozen operator also
+        # settles its operator role.
+        occ = {}
         for v in vehicle_ids:
-            if kind[v] != "balloon":
+            operators = [op[p, v] for p in person_ids if p not in classes]
+            if any(_fixed(h) and h for h in operators):
+                occ[v] = 1
                 continue
-
+            operators = [h for h in operators if not _fixed(h)]
+            model.AddAtMostOne(operators)
+            if any(_fixed(pax[p, v]) and pax[p, v] for p in person_ids):
+                occ[v] = 1
+                model.AddBoolOr(operators)
+                continue
+            occ[v] = model.NewBoolVar(f"occ_{v}")
             for p in person_ids:
-                lp = langs[p]
-                # Passenger speaks all languages -> always compatible
-                if lp is None or len(lp) == 0:
+                if _fixed(pax[p, v]):
                     continue
-
-                lp_set = set(lp)
-                compatible_ops = [
-                    q
-                    for q in person_ids
-                    if q != p
-                    and (
-                        langs[q] is None
-                        or len(langs[q]) == 0  # operator speaks all
-                        or lp_set.intersection(langs[q])  # or shares a language
-                    )
-                ]
-
-                # Allow "self" to satisfy the language requirement when p is the operator.
-                # This makes the constraint:  (some compatible op) OR (p is the operator)
-                if compatible_ops:
-                    model.Add(
-                        sum(op[q, v] for q in compatible_ops) + op[p, v] >= pax[p, v]
-                    )
+                if p in classes:
+                    model.Add(pax[p, v] == 0).OnlyEnforceIf(occ[v].Not())
                 else:
-                    # No other compatible operator exists → only valid if p is the operator
-                    model.Add(op[p, v] >= pax[p, v])
-
-    # 2.9 operator language compatibility across groups (balloon op vs each car op)
-    if c_common_language_operators:
-        for bid in balloon_ids:
-            car_ids = vehicle_groups.get(bid, [])
-            cand_b = [p for p in allowed_op.get(bid, set())]
-
-            for cid in car_ids:
-                cand_c = [q for q in allowed_op.get(cid, set())]
+                    model.AddImplication(pax[p, v], occ[v])
+            model.AddBoolOr(operators).OnlyEnforceIf(occ[v])
+
+        # 2.7 stay-in-group when this is NOT the first leg
+        # NOTE: the app sends an *empty dict* (not None) on the first leg, so all
+        # first-leg gates below must use truthiness, never `is None`.
+        if allowed:
+            for p in allowed:
+                if p in class_of:
+                    continue  # a class shares its members' fixed group
+                for v in vehicle_ids:
+                    if v not in allowed[p]:
+                        _add(model, pax[p, v] == 0)
+            for cid, members in classes.items():
+                if members[0] in allowed:
+                    for v in vehicle_ids:
+                        if v not in allowed[members[0]]:
+                            _add(model, pax[cid, v] == 0)
+
+        # 2.8 / 2.9 language rules, stated on one Boolean per (vehicle, language):
+        #   speaks[v, L] == 1  ⇔  the operator of v speaks L (or speaks all)
+        # Compatibility is then a short sum over the other side's languages instead
+        # of pairwise over people, so both rules grow with vehicles × languages ×
+        # people rather than quadratically in people.
+        def speaks_all(p: str) -> bool:
+            lp = langs.get(p)
+            return lp is None or len(lp) == 0
 
-                if not cand_b or not cand_c:
-                    continue  # if no operator candidates, feasibility is handled elsewhere
+        speaks = {}
 
-                for p in cand_b:
-                    lp = langs.get(p)
-                    p_all = (lp is None) or (len(lp) == 0)
-                    lp_set = set(lp or [])
+        def operator_speaks(v: str, lang: str):
+            """speaks[v, lang], or 0 / 1 when the candidates of v settle it."""
+            if (v, lang) not in speaks:
+                speakers = [
+                    op[q, v]
+                    for q in sorted(allowed_op[v])
+                    if q in people_by_id and (speaks_all(q) or lang in langs[q])
+                ]
+                free = [h for h in speakers if not _fixed(h)]
+                if free:
+                    var = model.NewBoolVar(f"speaks_{v}_{lang}")
+                    # at most one operator per vehicle, so the sum is 0/1
+                    model.Add(var == sum(free))
+                    speaks[v, lang] = var
+                else:
+                    speaks[v, lang] = int(any(speakers))
+            return speaks[v, lang]
+
+        def shared_languages(v: str, p: str):
+            """speaks[v, L] for p's languages L, or None if a frozen one matches."""
+            shared = [operator_speaks(v, lang) for lang in sorted(set(langs[p]))]
+            if any(_fixed(s) and s for s in shared):
+                return None
+            return [s for s in shared if not _fixed(s)]
+
+        # 2.8 language compatibility (balloons only): every passenger shares a
+        # language with the operator. When p operates v themselves, speaks[v, L]
+        # is 1 for p's own languages, so the rule holds without a special case.
+        if c_common_language_passengers:
+            for v in balloon_ids:
+                for p in person_ids:
+                    # Passenger speaks all languages -> always compatible
+                    if speaks_all(p) or (_fixed(pax[p, v]) and not pax[p, v]):
+                        continue
+
+                    shared = shared_languages(v, p)
+                    if shared is None:
+                        continue
+                    if shared:
+                        model.Add(size[p] * sum(shared) >= pax[p, v])
+                    else:
+                        # No operator candidate speaks any of p's languages
+                        model.Add(pax[p, v] == 0)
+
+        # 2.9 operator language compatibility across groups (balloon op vs each car op):
+        # if candidate p operates the balloon and the car has an operator, that
+        # operator must speak one of p's languages.
+        if c_common_language_operators:
+            for bid in balloon_ids:
+                for cid in vehicle_groups.get(bid, []):
+                    if cid not in occ or not allowed_op.get(cid):
+                        continue  # if no operator candidates, feasibility is handled elsewhere
+
+                    for p in sorted(allowed_op.get(bid, set())):
+                        if p not in people_by_id or speaks_all(p):
+                            continue
+                        if _fixed(op[p, bid]) and not op[p, bid]:
+                            continue
+                        shared = shared_languages(cid, p)
+                        if shared is None:
+                            continue
+                        _add(model, op[p, bid] + occ[cid] - sum(shared) <= 1)
+
+        if model_cache is not None:
+            model_cache.store(
+                cache_key,
+                model,
+                [op[k].Index() for k in handle_order if k in op],
+                [pax[k].Index() for k in handle_order],
+                time.perf_counter() - structure_started,
+            )
 
-                    for q in cand_c:
-                        lq = langs.get(q)
-                        q_all = (lq is None) or (len(lq) == 0)
-                        lq_set = set(lq or [])
+    control.check()
+    # 2.6 frozen seats (those not eliminated in 0.e)
+    if frozen is not None:
+        for vid, assignment in frozen.items():
+            if assignment["operatorId"] not in (None, *seat_of):
+                pid = assignment["operatorId"]
+                model.Add(op[pid, vid] == 1)
+                model.Add(pax[pid, vid] == 1)
 
-                        # check compatibility directly
-                        if not (p_all or q_all or lp_set.intersection(lq_set)):
-                            model.Add(op[p, bid] + op[q, cid] <= 1)
+            for pid in assignment["passengerIds"]:
+                if pid in seat_of:
+                    continue
+                model.Add(pax[pid, vid] == 1)
+                model.Add(op[pid, vid] == 0)
 
     # ------------------------------------------------------------------
     # 3. Objective
     # ------------------------------------------------------------------
-    objective_terms = []
+    # Unweighted terms per section; weights are applied in `set_objective`
+    # so the breakdown can report each section and weights can be swapped.
+    sections = {key: ObjectiveSection(name) for key, name in SECTION_WEIGHTS.items()}
     max_flights = max(flights_so_far.values()) + 1 if flights_so_far else 1
 
     # 3.1 pilot fairness
@@ -356,7 +828,7 @@ def solve_flight_leg(
         for p, v in product(person_ids, vehicle_ids):
             if p in allowed_op[v]:
                 bonus = max_flights - flights_so_far[p]
-                objective_terms.append(-w_pilot_fairness * bonus * op[p, v])
+                sections["3.1"].add(-bonus, op[p, v])
 
     # 3.2 low-flight pax in balloons (participants > counselors)
     if w_passenger_fairness != 0:
@@ -367,22 +839,25 @@ def solve_flight_leg(
                     bonus += 1
                 if not is_participant[p]:
                     bonus = max(bonus - counselor_flight_discount, 0)
-                objective_terms.append(-w_passenger_fairness * bonus * pax[p, v])
+                sections["3.2"].add(-bonus, pax[p, v])
 
     # 3.3 no participants alone in a car
     if w_no_solo_participant != 0:
         for v in vehicle_ids:
             if kind[v] != "car":
                 continue
-            part_sat = sum(int(is_participant[p]) * pax[p, v] for p in person_ids)
+            seats = [pax[p, v] for p in person_ids if is_participant[p]]
+            if all(_fixed(h) for h in seats):
+                sections["3.3"].add(1, int(sum(seats) == 1))
+                continue
+            part_sat = sum(seats)
             solo_part = model.NewBoolVar(f"solo_part_{v}")
             model.Add(part_sat == 1).OnlyEnforceIf(solo_part)
             model.Add(part_sat != 1).OnlyEnforceIf(solo_part.Not())
-            objective_terms.append(+w_no_solo_participant * solo_part)
+            sections["3.3"].add(1, solo_part)
 
     # 3.4 group passenger deviation
     if w_group_passenger_balance != 0 and not fixed_groups:
-        n_people = len(person_ids)
         seats_in_air = sum(capacity[bid] for bid in balloon_ids)
         # integer target; fair rounding happens via deviation vars
         avg_ground = (n_people - seats_in_air) // max(len(vehicle_groups), 1)
@@ -393,11 +868,17 @@ def solve_flight_leg(
             dev_pos = model.NewIntVar(0, n_people, f"devP_{bid}")
             dev_neg = model.NewIntVar(0, n_people, f"devN_{bid}")
             model.Add(crew_cars - avg_ground == dev_pos - dev_neg)
-            objective_terms.append(w_group_passenger_balance * (dev_pos + dev_neg))
+            sections["3.4"].add(1, dev_pos)
+            sections["3.4"].add(1, dev_neg)
 
     # 3.5a diversity
     if w_divers_nationalities != 0 and len(nationalities) > 1:
         for v in vehicle_ids:
+            if all(_fixed(pax[p, v]) for p in person_ids):
+                count = Counter(nationality[p] for p in person_ids if pax[p, v])
+                minority = sum(count.values()) - max(count.values(), default=0)
+                sections["3.5a"].add(-1, int(minority))
+                continue
             cnt_nat = {}
             for nat in nationalities:
                 cnt = model.NewIntVar(0, capacity[v], f"cnt_{v}_{nat}")
@@ -415,8 +896,9 @@ def solve_flight_leg(
             minority = model.NewIntVar(0, capacity[v], f"minor_{v}")
             model.Add(minority == total - maj)
 
-            objective_terms.append(-w_divers_nationalities * minority)
+            sections["3.5a"].add(-1, minority)
 
+    control.check()
     # 3.5b avoid repeated meetings inside a vehicle group (existence penalty, fast) — only if groups are not fixed
     if w_new_meetings != 0 and not fixed_groups and people_meet_history is not None:
         # Keep the model lean: consider at most K past contacts per person
@@ -425,20 +907,31 @@ def solve_flight_leg(
         in_group = {}
         # Only create missing keys to avoid duplicating constraints if another section already built them
         for p in person_ids:
-            if not is_participant[p]:
+            # classes have no meeting history (see `equivalence_classes`)
+            if not is_participant[p] or p in classes:
                 continue
             for bid in balloon_ids:
                 if (p, bid) in in_group:
                     continue
                 group_vehicles = [bid] + vehicle_groups.get(bid, [])
+                seats = [pax[p, v] for v in group_vehicles]
+                if any(_fixed(s) and s for s in seats):
+                    in_group[p, bid] = 1
+                    continue
+                seats = [s for s in seats if not _fixed(s)]
+                if not seats:
+                    in_group[p, bid] = 0
+                    continue
                 ig = model.NewBoolVar(f"inGroup_{p}_{bid}")
-                # ig = OR_v pax[p, v] over the group's vehicles (MaxEquality works for Bool OR here)
-                model.AddMaxEquality(ig, [pax[p, v] for v in group_vehicles])
+                # ig = OR_v pax[p, v] over the group's vehicles
+                model.AddBoolOr(seats).OnlyEnforceIf(ig)
+                for seat in seats:
+                    model.AddImplication(seat, ig)
                 in_group[p, bid] = ig
 
         # For each participant and group, add a tiny penalty if they share the group with ANY prior contact
         for p in person_ids:
-            if not is_participant[p]:
+            if not is_participant[p] or p in classes:
                 continue
 
             # Prior participant contacts of p (trimmed)
@@ -453,25 +946,40 @@ def solve_flight_leg(
                 continue
 
             for bid in balloon_ids:
+                # contacts not in this leg can never be met
+                contact_groups = [
+                    in_group[q, bid] for q in contacts if (q, bid) in in_group
+                ]
+                if _fixed(in_group[p, bid]) and not in_group[p, bid]:
+                    continue  # p cannot be in this group
+
                 # any_contact_in_b == OR_q in_group[q, bid] over q in contacts
-                any_contact_in_b = model.NewBoolVar(f"anyContactInGroup_{p}_{bid}")
-                # Build the OR via MaxEquality on existing in_group[q,bid]; all q are participants so keys exist
-                or_aux = model.NewIntVar(0, 1, f"orContacts_{p}_{bid}")
-                model.AddMaxEquality(
-                    or_aux,
-                    [in_group.get((q, bid), model.NewConstant(0)) for q in contacts],
-                )
-                model.Add(any_contact_in_b == or_aux)
+                if any(_fixed(ig) and ig for ig in contact_groups):
+                    any_contact_in_b = 1
+                else:
+                    contact_groups = [ig for ig in contact_groups if not _fixed(ig)]
+                    if not contact_groups:
+                        continue
+                    any_contact_in_b = model.NewBoolVar(f"anyContactInGroup_{p}_{bid}")
+                    model.AddBoolOr(contact_groups).OnlyEnforceIf(any_contact_in_b)
+                    for ig in contact_groups:
+                        model.AddImplication(ig, any_contact_in_b)
 
                 # repeat_exists[p,bid] ⇔ in_group[p,bid] AND any_contact_in_b
+                both = [
+                    x for x in (in_group[p, bid], any_contact_in_b) if not _fixed(x)
+                ]
+                if len(both) < 2:
+                    sections["3.5b"].add(1, both[0] if both else 1)
+                    continue
                 repeat_exists = model.NewBoolVar(f"repeatExists_{p}_{bid}")
-                model.Add(repeat_exists <= in_group[p, bid])
-                model.Add(repeat_exists <= any_contact_in_b)
-                model.Add(repeat_exists >= in_group[p, bid] + any_contact_in_b - 1)
+                model.AddBoolAnd(both).OnlyEnforceIf(repeat_exists)
+                model.AddBoolOr([lit.Not() for lit in both] + [repeat_exists])
 
                 # Minimize: small penalty for any repeated meet in the same group
-                objective_terms.append(w_new_meetings * repeat_exists)
+                sections["3.5b"].add(1, repeat_exists)
 
+    control.check()
     # 3.6 fresh group (passengers only)
     if w_group_rotation != 0 and not fixed_groups and group_history:
         # history is keyed by group id (= balloon id); map each vehicle to its group
@@ -486,7 +994,9 @@ def solve_flight_leg(
             gid = group_of.get(v, v)
             nf = 1.0 / (1.0 + float(group_history.get(p, {}).get(gid, 0)))
             # scale the novelty reward for passengers; subtract op to avoid rewarding operators
-            objective_terms.append(-w_group_rotation * nf * (pax[p, v] - op[p, v]))
+            sections["3.6"].add(-nf, pax[p, v])
+            if p not in classes:
+                sections["3.6"].add(nf, op[p, v])
 
     # 3.6b balloon passenger rotation
     # Rewards putting passengers in balloons they have not flown in before.
@@ -496,9 +1006,9 @@ def solve_flight_leg(
                 past = float(balloon_history.get(p, {}).get(v, 0))
                 nf = 1.0 / (1.0 + past)
                 # pax[p,v] - op[p,v] is 1 only for non-operator balloon passengers
-                objective_terms.append(
-                    -w_balloon_rotation * nf * (pax[p, v] - op[p, v])
-                )
+                sections["3.6b"].add(-nf, pax[p, v])
+                if p not in classes:
+                    sections["3.6b"].add(nf, op[p, v])
 
     # 3.6c balloon rotation lookahead: prepare cars for next leg
     # On leg 1 (fixed_groups is None), reward placing high-novelty people in cars
@@ -514,8 +1024,9 @@ def solve_flight_leg(
             for bid in balloon_ids:
                 nf = 1.0 / (1.0 + float(balloon_history.get(p, {}).get(bid, 0)))
                 for cid in vehicle_groups.get(bid, []):
-                    objective_terms.append(-w_balloon_rotation * nf * pax[p, cid])
+                    sections["3.6c"].add(-nf, pax[p, cid])
 
+    control.check()
     # 3.7 language-aware lookahead: prioritise low-flight pax in group cars (no overweight lookahead)
     if w_low_flights_lookahead != 0 and planning_horizon_legs >= 1 and person_ids:
 
@@ -531,7 +1042,7 @@ def solve_flight_leg(
             lp_set = set(lp)
 
             # check any potential operator for this balloon
-            for q in allowed_op.get(bid, set()):
+            for q in sorted(allowed_op.get(bid, set())):
                 lq = langs.get(q)
                 if lq is None or len(lq) == 0:
                     return 1  # operator speaks all
@@ -554,7 +1065,9 @@ def solve_flight_leg(
                 continue
 
             future_seats = planning_horizon_legs * capacity[bid]
-            sorted_f = sorted(flights_so_far[p] for p in eligible)
+            sorted_f = sorted(
+                flights_so_far[p] for p in eligible for _ in range(size[p])
+            )
             if future_seats <= 0:
                 cutoff = -(10**9)  # nobody qualifies
             elif future_seats >= len(sorted_f):
@@ -564,7 +1077,7 @@ def solve_flight_leg(
 
             low = {p: int(flights_so_far[p] <= cutoff) for p in eligible}
 
-            target = int(min(future_seats, sum(low.values())))
+            target = int(min(future_seats, sum(low[p] * size[p] for p in eligible)))
             if target <= 0:
                 continue
 
@@ -572,7 +1085,7 @@ def solve_flight_leg(
 
             short = model.NewIntVar(0, target, f"short_{bid}")
             model.Add(short >= target - low_in_cars)
-            objective_terms.append(w_low_flights_lookahead * short)
+            sections["3.7"].add(1, short)
 
     # 3.8 random fairness tiebreaker
     if w_tiebreak_fairness != 0:
@@ -581,67 +1094,284 @@ def solve_flight_leg(
             for v in vehicle_ids:
                 if kind[v] == "balloon":
                     # positive term because we minimize: lower pr is better
-                    objective_terms.append(w_tiebreak_fairness * pr * pax[p, v])
+                    sections["3.8"].add(pr, pax[p, v])
+
+    built = FlightLegModel(
+        model=model,
+        op=op,
+        pax=pax,
+        person_ids=person_ids,
+        vehicle_ids=vehicle_ids,
+        sections={key: sec for key, sec in sections.items() if sec.vars or sec.folded},
+        classes=classes,
+        balloon_ids=balloon_ids,
+        cache_hit=None if model_cache is None else cached is not None,
+    )
+    set_objective(
+        built,
+        {
+            "pilotFairness": w_pilot_fairness,
+            "passengerFairness": w_passenger_fairness,
+            "noSoloParticipant": w_no_solo_participant,
+            "groupPassengerBalance": w_group_passenger_balance,
+            "diverseNationalities": w_divers_nationalities,
+            "meetingNewPeople": w_new_meetings,
+            "groupRotation": w_group_rotation,
+            "balloonRotation": w_balloon_rotation,
+            "lowFlightsLookahead": w_low_flights_lookahead,
+            "tiebreakFairness": w_tiebreak_fairness,
+        },
+    )
+    return built
+
+
+def set_objective(built: FlightLegModel, weights: Dict[str, float]) -> None:
+    """(Re)place the objective: Σ weight[section] · section terms."""
+    built.weights = dict(weights)
+    variables, coefs, offset = [], [], 0.0
+    for section in built.sections.values():
+        w = weights.get(section.weight_name, 0)
+        if w == 0:
+            continue
+        variables.extend(section.vars)
+        coefs.extend(w * c for c in section.coefs)
+        offset += w * section.constant
+    built.model.Minimize(cp_model.LinearExpr.WeightedSum(variables, coefs) + offset)
 
-    model.Minimize(sum(objective_terms))
 
-    # ------------------------------------------------------------------
-    # 4. Solve
-    # ------------------------------------------------------------------
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = float(time_limit_s)
-    solver.parameters.num_search_workers = int(max(1, num_search_workers))
-    if random_seed is not None:
-        solver.parameters.random_seed = int(random_seed)
+def objective_breakdown(
+    built: FlightLegModel, solver: cp_model.CpSolver
+) -> Dict[str, Any]:
+    """
+    Contribution of every objective section in the solution of `solver`, plus
+    a few plain counts that are easier to read than weighted sums.
+    """
+    terms = {}
+    for key, section in built.sections.items():
+        raw = section.value(solver.Value)
+        weight = built.weights.get(section.weight_name, 0)
+        terms[key] = {
+            "weight": section.weight_name,
+            "raw": raw,
+            "value": weight * raw,
+        }
+
+    def raw(key: str) -> int:
+        return int(round(terms[key]["raw"])) if key in terms else 0
+
+    return {
+        "value": solver.ObjectiveValue(),
+        "bound": solver.BestObjectiveBound(),
+        "terms": terms,
+        "stats": {
+            "soloParticipantCars": raw("3.3"),
+            "repeatedMeetings": raw("3.5b"),
+            "lookaheadShortfall": raw("3.7"),
+        },
+    }
 
-    status = solver.Solve(model)
-    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        if status == cp_model.INFEASIBLE:
-            raise RuntimeError("No feasible assignment")
-        else:
-            raise RuntimeError("Solver failed")
 
-    # ------------------------------------------------------------------
-    # 5. Manifest
-    # ------------------------------------------------------------------
+def read_manifest(
+    built: FlightLegModel, value: Callable[[Any], int]
+) -> Dict[str, VehicleAssignment]:
+    """
+    Turn a (partial) solution into a manifest; `value` reads a variable.
+
+    Class seats are named in priority order, balloons first, so the members
+    the tiebreak favours are the ones who fly.
+    """
     manifest: Dict[str, VehicleAssignment] = {
-        v: {"operatorId": None, "passengerIds": []} for v in vehicle_ids
+        v: {"operatorId": None, "passengerIds": []} for v in built.vehicle_ids
     }
-    for p, v in product(person_ids, vehicle_ids):
-        if solver.BooleanValue(op[p, v]):
+    for p, v in product(built.person_ids, built.vehicle_ids):
+        if p in built.classes:
+            continue
+        if value(built.op[p, v]):
             manifest[v]["operatorId"] = p
-        elif solver.BooleanValue(pax[p, v]):
+        elif value(built.pax[p, v]):
             manifest[v]["passengerIds"].append(p)
 
-    return {"assignments": manifest}
+    balloons_first = sorted(built.vehicle_ids, key=lambda v: v not in built.balloon_ids)
+    for cid, members in built.classes.items():
+        queue = iter(members)
+        for v in balloons_first:
+            for _ in range(value(built.pax[cid, v])):
+                manifest[v]["passengerIds"].append(next(queue))
+    return manifest
+
+
+def model_size(model: cp_model.CpModel) -> Dict[str, int]:
+    """Variables, constraints, non-zeros and objective terms of a model."""
+    proto = model.Proto()
+
+    def count_refs(message) -> int:
+        n = 0
+        for field, value in message.ListFields():
+            if field.name in ("vars", "literals", "enforcement_literal"):
+                n += len(value)
+            elif field.message_type is not None:
+                items = value if field.label == field.LABEL_REPEATED else [value]
+                n += sum(count_refs(item) for item in items)
+        return n
+
+    objective = (
+        proto.floating_point_objective
+        if proto.HasField("floating_point_objective")
+        else proto.objective
+    )
+    return {
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "nonzeros": sum(count_refs(c) for c in proto.constraints),
+        "objectiveTerms": len(objective.vars),
+    }
 
 
-def reserve_group_car_seats(
-    balloons: List[Balloon],
-    cars: List[Car],
-    groups: Dict[str, list[str]],
-):
+def solve_status(
+    status: int, control: SolveControl
+) -> Literal["optimal", "feasible", "cancelled"]:
+    if control.cancelled:
+        return "cancelled"
+    return "optimal" if status == cp_model.OPTIMAL else "feasible"
+
+
+def add_manifest_hint(
+    model: cp_model.CpModel,
+    op: Dict[tuple, cp_model.IntVar],
+    pax: Dict[tuple, cp_model.IntVar],
+    hint: Dict[str, VehicleAssignment],
+    person_ids: List[str],
+    vehicle_ids: List[str],
+    *,
+    classes: Optional[Dict[str, List[str]]] = None,
+) -> None:
     """
-    Reserve seats for each balloon's passengers inside *its own groups cars*.
-    Mutates `cars[*]['capacity']` only (does NOT touch groups or the group).
-    Safe to call for any leg. Uses the order given by `group[balloon_id]`.
+    Hint the seat of every person found in `hint`. Each hinted person gets a
+    complete row (1 for their old vehicle, 0 elsewhere) so CP-SAT can use it as
+    a partial solution. Unknown people / vehicles are skipped. A class is
+    hinted with its members' seat counts if all of them are in `hint`.
     """
-    car_by_id = {c["id"]: c for c in cars}
-    for bal in balloons:
-        bid = bal["id"]
-        need = int(bal["maxCapacity"])
-        for cid in groups.get(bid, []):
-            if need <= 0:
-                break
-            car = car_by_id.get(cid)
-            if car is None:
-                raise ValueError(f"Car {cid} from group not found in current input.")
-            pax_cap_excl_driver = max(int(car["maxCapacity"]) - 1, 0)
-            take = min(need, pax_cap_excl_driver)
-            car["maxCapacity"] = int(car["maxCapacity"]) - take
-            need -= take
-        if need > 0:
-            raise RuntimeError(
-                f"Seat reservation failed for {bid}: short {need} passenger seats "
-                f"in cars {groups.get(bid, [])}."
-            )
+    seat_of: Dict[str, str] = {}
+    operator_of: Dict[str, str] = {}
+    for vid, assignment in hint.items():
+        if vid not in vehicle_ids:
+            continue
+        if assignment.get("operatorId"):
+            seat_of[assignment["operatorId"]] = vid
+            operator_of[assignment["operatorId"]] = vid
+        for pid in assignment.get("passengerIds", []):
+            seat_of[pid] = vid
+
+    for p in person_ids:
+        if classes and p in classes:
+            if all(q in seat_of for q in classes[p]):
+                for v in vehicle_ids:
+                    seated = sum(seat_of[q] == v for q in classes[p])
+                    if not _fixed(pax[p, v]):
+                        model.AddHint(pax[p, v], seated)
+            continue
+        if p not in seat_of:
+            continue
+        for v in vehicle_ids:
+            if not _fixed(pax[p, v]):
+                model.AddHint(pax[p, v], int(seat_of[p] == v))
+            if not _fixed(op[p, v]):
+                model.AddHint(op[p, v], int(operator_of.get(p) == v))
+
+
+def frozen_handles(
+    frozen: Optional[Dict[str, VehicleAssignment]],
+    person_ids: List[str],
+    vehicle_ids: List[str],
+    capacity: Dict[str, int],
+    classes: Dict[str, List[str]],
+) -> tuple:
+    """
+    Constant op / pax handles implied by frozen seats (0.e of the leg model):
+
+      – a person frozen into one vehicle gets 1 for that seat (and operator
+        role, if frozen as operator) and 0 everywhere else
+      – nobody else can operate a vehicle with a frozen operator, nor sit in
+        a vehicle the frozen people fill
+
+    People frozen into several vehicles, and unknown people or vehicles, are
+    left to the frozen-seat constraints (2.6). Returns (pax, op, seat_of),
+    where `seat_of` maps each eliminated person to their vehicle.
+    """
+    seats: Dict[str, set] = defaultdict(set)
+    operates: Dict[str, str] = {}
+    for vid, assignment in (frozen or {}).items():
+        if assignment["operatorId"] is not None:
+            seats[assignment["operatorId"]].add(vid)
+            operates[assignment["operatorId"]] = vid
+        for pid in assignment["passengerIds"]:
+            seats[pid].add(vid)
+
+    known_people, known_vehicles = set(person_ids), set(vehicle_ids)
+    seat_of = {
+        p: next(iter(vids))
+        for p, vids in seats.items()
+        if p in known_people and len(vids) == 1 and vids <= known_vehicles
+    }
+    seated = Counter(seat_of.values())
+    operated = {operates[p] for p in seat_of if p in operates}
+
+    pax: Dict[tuple, int] = {}
+    op: Dict[tuple, int] = {}
+    for p, v in product(person_ids, vehicle_ids):
+        if p in seat_of:
+            pax[p, v] = int(seat_of[p] == v)
+            op[p, v] = int(operates.get(p) == v)
+            continue
+        if seated[v] >= capacity[v]:
+            pax[p, v] = 0
+        if p not in classes and (v in operated or seated[v] >= capacity[v]):
+            op[p, v] = 0
+    return pax, op, seat_of
+
+
+# Weights within this many kg fall into the same class.
+CLASS_WEIGHT_BUCKET_KG = 5
+
+
+def equivalence_classes(
+    people: List[Person],
+    vehicles: List[Vehicle],
+    *,
+    frozen_people: set,
+    fixed_groups: Optional[Dict[str, str]],
+    histories: List[Optional[Dict[str, Dict[str, int]]]],
+    default_person_weight: int,
+) -> Dict[str, List[str]]:
+    """
+    Group interchangeable people: same role, flight count, first-time flag,
+    languages, nationality, weight bucket and fixed group. People with
+    history, a frozen seat or operator eligibility stay individual, as does
+    anyone whose class would have a single member.
+    """
+    operators = {q for v in vehicles for q in v.get("allowedOperatorIds", [])}
+    with_history = set()
+    for history in histories:
+        for p, row in (history or {}).items():
+            if any(row.values()):
+                with_history.add(p)
+                with_history.update(q for q, n in row.items() if n)
+
+    buckets: Dict[tuple, List[str]] = defaultdict(list)
+    for person in people:
+        p = person["id"]
+        if p in frozen_people or p in operators or p in with_history:
+            continue
+        key = (
+            person.get("role", "participant"),
+            int(person.get("flightsSoFar", 0)),
+            bool(person.get("firstTime", False)),
+            tuple(sorted(person.get("languages") or [])),
+            person.get("nationality") or "unknown",
+            int(person.get("weight", default_person_weight)) // CLASS_WEIGHT_BUCKET_KG,
+            (fixed_groups or {}).get(p),
+        )
+        buckets[key].append(p)
+
+    members = [m for m in buckets.values() if len(m) > 1]
+    return {f"class{i}": m for i, m in enumerate(members)}
@@ -0,0 +1,228 @@
+"""
+Exact combinatorial engine for `solve_vehicle_groups`.
+
+Every constraint of the group model is a lower bound (a trailer car and
+enough passenger seats per real balloon, enough car seats overall), so adding
+a compatible car to a feasible grouping keeps it feasible and never adds
+unused seats. The optimum therefore uses every car that is compatible with
+at least one balloon, and solving reduces to finding *any* feasible cover:
+
+  1. frozen pairs are placed first
+  2. a depth-first search gives the real balloon with the fewest free
+     compatible cars a minimal cover (seats and a trailer), then recurses;
+     interchangeable cars are tried once, nodes are pruned by a seat bound
+     and a trailer matching, and dead ends are remembered
+  3. the remaining cars join the compatible group with the least spare seats
+
+Instances beyond `MAX_BALLOONS` / `MAX_CARS`, and searches that run out of
+`MAX_NODES` or `MAX_SECONDS`, are left to CP-SAT (`search_vehicle_groups`
+returns None).
+"""
+
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from solver_control import SolveControl
+
+# Largest instances given to the search; larger ones go to CP-SAT.
+MAX_BALLOONS = 15
+MAX_CARS = 40
+
+# Search budget before falling back to CP-SAT.
+MAX_NODES = 20_000
+MAX_SECONDS = 0.25
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def search_vehicle_groups(
+    balloon_ids: List[str],
+    car_ids: List[str],
+    bal_need: Dict[str, int],
+    pax_cap: Dict[str, int],
+    cap: Dict[str, int],
+    trailer: Dict[str, bool],
+    compat_cb: Dict[Tuple[str, str], bool],
+    frozen: Dict[str, List[str]],
+    car_seats_needed: int,
+    *,
+    control: SolveControl,
+    max_nodes: int = MAX_NODES,
+    max_seconds: float = MAX_SECONDS,
+) -> Optional[Dict[str, List[str]]]:
+    """
+    An optimal balloon -> cars mapping (all balloons, in input order), or None
+    when the instance is too large for the search. Raises RuntimeError when
+    no feasible grouping exists.
+    """
+    if len(balloon_ids) > MAX_BALLOONS or len(car_ids) > MAX_CARS:
+        return None
+    infeasible = RuntimeError("No feasible vehicle groups arrangement found")
+
+    index = {cid: i for i, cid in enumerate(car_ids)}
+    seats_of = [pax_cap[cid] for cid in car_ids]
+    trailers = sum(1 << i for i, cid in enumerate(car_ids) if trailer[cid])
+    compatible = {
+        bid: sum(1 << i for i, cid in enumerate(car_ids) if compat_cb[(cid, bid)])
+        for bid in balloon_ids
+    }
+
+    groups: Dict[str, List[int]] = {bid: [] for bid in balloon_ids}
+    used = 0
+    for bid, fixed_cars in frozen.items():
+        for cid in fixed_cars:
+            i = index[cid]
+            if used >> i & 1:
+                raise infeasible  # frozen into two groups
+            used |= 1 << i
+            groups[bid].append(i)
+
+    # real balloons whose frozen cars do not cover them yet
+    pending = []
+    deficit: List[int] = []
+    towed: List[bool] = []
+    for bid in balloon_ids:
+        seats = sum(seats_of[i] for i in groups[bid])
+        has_trailer = any(trailers >> i & 1 for i in groups[bid])
+        if bal_need[bid] > 0 and (seats < bal_need[bid] or not has_trailer):
+            pending.append(bid)
+            deficit.append(max(bal_need[bid] - seats, 0))
+            towed.append(has_trailer)
+    everyone = (1 << len(pending)) - 1
+
+    def seat_sum(mask: int) -> int:
+        return sum(seats_of[i] for i in _bits(mask))
+
+    def bound(covered: int, used: int) -> bool:
+        """Per-balloon seats and a trailer for every balloon still open."""
+        untowed = []
+        reachable = short = 0
+        for j in _bits(everyone & ~covered):
+            free = compatible[pending[j]] & ~used
+            if seat_sum(free) < deficit[j]:
+                return False
+            reachable |= free
+            short += deficit[j]
+            if not towed[j]:
+                if not free & trailers:
+                    return False
+                untowed.append(free & trailers)
+        if seat_sum(reachable) < short:
+            return False
+        # distinct trailer cars for the untowed balloons (augmenting paths)
+        owner: Dict[int, int] = {}
+
+        def augment(k: int, seen: Set[int]) -> bool:
+            for i in _bits(untowed[k]):
+                if i not in seen:
+                    seen.add(i)
+                    if i not in owner or augment(owner[i], seen):
+                        owner[i] = k
+                        return True
+            return False
+
+        return all(augment(k, set()) for k in range(len(untowed)))
+
+    def covers(j: int, covered: int, used: int) -> Iterator[List[int]]:
+        """Minimal covers of pending[j] from its free cars."""
+        others = [compatible[pending[k]] for k in _bits(everyone & ~covered)]
+
+        def kind(i: int) -> Tuple[int, int, int, Tuple[bool, ...]]:
+            wanted = tuple(bool(m >> i & 1) for m in others)
+            # cars few other balloons can use first, then larger ones
+            return (sum(wanted), -seats_of[i], -(trailers >> i & 1), wanted)
+
+        cars = sorted(_bits(compatible[pending[j]] & ~used), key=kind)
+        kinds = [kind(i) for i in cars]
+        reachable = [0] * (len(cars) + 1)
+        for n in range(len(cars) - 1, -1, -1):
+            reachable[n] = reachable[n + 1] + seats_of[cars[n]]
+
+        def extend(start: int, chosen: List[int], short: int, has_trailer: bool):
+            if short <= 0 and has_trailer:
+                yield chosen
+                return
+            if reachable[start] < short:
+                return
+            for n in range(start, len(cars)):
+                if n > start and kinds[n] == kinds[n - 1]:
+                    continue  # same as the car just tried
+                i = cars[n]
+                is_trailer = bool(trailers >> i & 1)
+                if short <= 0 and not is_trailer:
+                    continue  # only the trailer is missing
+                yield from extend(
+                    n + 1, chosen + [i], short - seats_of[i], has_trailer or is_trailer
+                )
+
+        # tightest covers first
+        found = sorted(
+            extend(0, [], deficit[j], towed[j]),
+            key=lambda chosen: sum(seats_of[i] for i in chosen),
+        )
+        yield from found
+
+    failed: Set[Tuple[int, int]] = set()
+    nodes = 0
+    give_up = time.perf_counter() + max_seconds
+
+    def dfs(covered: int, used: int) -> bool:
+        nonlocal nodes
+        if covered == everyone:
+            return True
+        if (covered, used) in failed:
+            return False
+        nodes += 1
+        if nodes > max_nodes or time.perf_counter() > give_up:
+            raise _OutOfBudget
+        if nodes % 256 == 0:
+            control.check()
+        if bound(covered, used):
+            j = min(
+                _bits(everyone & ~covered),
+                key=lambda k: (bin(compatible[pending[k]] & ~used).count("1"),),
+            )
+            for chosen in covers(j, covered, used):
+                mask = sum(1 << i for i in chosen)
+                if dfs(covered | 1 << j, used | mask):
+                    groups[pending[j]].extend(chosen)
+                    return True
+        failed.add((covered, used))
+        return False
+
+    try:
+        if not dfs(0, used):
+            raise infeasible
+    except _OutOfBudget:
+        return None
+    used = sum(1 << i for cars in groups.values() for i in cars)
+
+    # every other compatible car joins the group with the least spare seats
+    spare = {
+        bid: sum(seats_of[i] for i in groups[bid]) - bal_need[bid]
+        for bid in balloon_ids
+    }
+    for i, cid in enumerate(car_ids):
+        if used >> i & 1:
+            continue
+        options = [bid for bid in balloon_ids if compatible[bid] >> i & 1]
+        if not options:
+            continue
+        bid = min(options, key=lambda b: (bal_need[b] == 0, spare[b]))
+        groups[bid].append(i)
+        spare[bid] += seats_of[i]
+
+    if sum(cap[car_ids[i]] for cars in groups.values() for i in cars) < (
+        car_seats_needed
+    ):
+        raise infeasible
+    return {bid: [car_ids[i] for i in sorted(cars)] for bid, cars in groups.items()}
@@ -0,0 +1,370 @@
+"""
+Two-level (group-first) engine for very large first legs.
+
+The flat leg model decides groups and exact seats for everyone at once; past a
+few hundred people it rarely proves anything within the time limit. This
+engine splits the first leg in three steps:
+
+  1. top    – assign people to balloon groups on an aggregated model: one
+              Boolean per (person, group), group seat capacities, a matching of
+              eligible operators to vehicles, and the group-level objective
+              sections 3.4 (balance), 3.5b (meetings), 3.6 / 3.6c (rotation)
+  2. groups – solve every group's seats with the regular leg model, restricted
+              to that group's vehicles and members; groups run in parallel
+  3. repair – only when a group has no feasible seating (language or weight
+              rules the top level cannot see): one flat solve in which members
+              of the solved groups stay in their group and the others are free
+
+Later legs already have fixed groups and always use the flat engine.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from ortools.sat.python import cp_model
+from solver_checks import leg_seat_problems, reserve_group_car_seats
+from solver_control import SolveCancelled, SolveControl
+from solver_estimate import auto_engine
+from solver_flight_leg import Manifest, solve_flight_leg
+from solver_types import Balloon, Car, Person, VehicleAssignment
+
+# "local" is the local-search engine of `solver_local_search`, "staged" the
+# two-stage solve of `solver_staged`
+Engine = Literal["flat", "hierarchical", "local", "staged", "auto"]
+
+# Share of the time limit given to the top level and to the group solves; the
+# repair pass (if any) gets what is left.
+TOP_TIME_SHARE = 0.3
+GROUPS_TIME_SHARE = 0.5
+
+
+def choose_engine(
+    engine: Engine,
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    fixed_groups: Optional[Dict[str, str]],
+    *,
+    expected_seconds: Optional[float] = None,
+) -> Literal["flat", "hierarchical", "local", "staged"]:
+    """
+    Resolve `auto` (see `solver_estimate.auto_engine`; `expected_seconds` is
+    the flat model's estimated time to a good solution) and fall back to flat
+    where the decomposition does not apply.
+    """
+    if engine not in ("flat", "hierarchical", "local", "staged", "auto"):
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine in ("local", "staged"):
+        return engine
+    if engine == "auto":
+        return auto_engine(len(people), vehicle_groups, fixed_groups, expected_seconds)
+    if engine == "flat" or fixed_groups or len(vehicle_groups) < 2:
+        return "flat"
+    return "hierarchical"
+
+
+def solve_flight_leg_hierarchical(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    time_limit_s: int,
+    num_search_workers: int = 15,
+    control: Optional[SolveControl] = None,
+    **model_kwargs: Any,
+) -> Manifest:
+    """
+    Solve a first leg group-first. Arguments are those of `solve_flight_leg`;
+    the result additionally carries `engine` and per-level `timings`.
+    """
+    control = control or SolveControl()
+    if time_limit_s <= 0:
+        raise ValueError("Time limit must be positive")
+    if model_kwargs.get("fixed_groups"):
+        raise ValueError("The hierarchical engine only applies to first legs")
+
+    grouped_cars = {cid for car_ids in vehicle_groups.values() for cid in car_ids}
+    if {b["id"] for b in balloons} != set(vehicle_groups) or any(
+        c["id"] not in grouped_cars for c in cars
+    ):
+        raise ValueError(
+            "The hierarchical engine needs every balloon and car in a vehicle group"
+        )
+    # the flat model's up-front checks (0.c), on the seats left in the cars
+    reserved = [dict(c) for c in cars]
+    reserve_group_car_seats(balloons, reserved, vehicle_groups)
+    problems = leg_seat_problems(balloons, reserved, people, model_kwargs.get("frozen"))
+    if problems:
+        raise ValueError(problems[0])
+
+    timings: Dict[str, float] = {}
+    control.check()
+
+    # 1. top level ---------------------------------------------------------
+    started = time.perf_counter()
+    with control.tracer.span("top"):
+        group_of_person = assign_groups(
+            balloons,
+            cars,
+            people,
+            vehicle_groups,
+            time_limit_s=time_limit_s * TOP_TIME_SHARE,
+            num_search_workers=num_search_workers,
+            control=control,
+            **model_kwargs,
+        )
+    timings["top"] = time.perf_counter() - started
+
+    # 2. per-group seats, in parallel ---------------------------------------
+    started = time.perf_counter()
+    members: Dict[str, List[Person]] = {gid: [] for gid in vehicle_groups}
+    for p in people:
+        members[group_of_person[p["id"]]].append(p)
+
+    n_parallel = max(1, min(len(vehicle_groups), num_search_workers))
+    workers_each = max(1, num_search_workers // n_parallel)
+    frozen = model_kwargs.get("frozen") or {}
+
+    def solve_group(gid: str) -> Tuple[str, Optional[Manifest]]:
+        group_vehicles = {gid, *vehicle_groups[gid]}
+        try:
+            with control.tracer.span("group", group=gid):
+                result = solve_flight_leg(
+                    balloons=[b for b in balloons if b["id"] == gid],
+                    cars=[dict(c) for c in cars if c["id"] in group_vehicles],
+                    people=members[gid],
+                    vehicle_groups={gid: vehicle_groups[gid]},
+                    time_limit_s=time_limit_s * GROUPS_TIME_SHARE,
+                    num_search_workers=workers_each,
+                    control=control,
+                    **{
+                        **model_kwargs,
+                        "frozen": {
+                            vid: a for vid, a in frozen.items() if vid in group_vehicles
+                        },
+                        "fixed_groups": {p["id"]: gid for p in members[gid]},
+                    },
+                )
+        except SolveCancelled:
+            raise
+        except (RuntimeError, ValueError):
+            return gid, None  # left to the repair pass
+        return gid, result
+
+    with ThreadPoolExecutor(max_workers=n_parallel) as pool:
+        group_results = dict(pool.map(solve_group, vehicle_groups))
+    timings["groups"] = time.perf_counter() - started
+
+    solved = {gid: r for gid, r in group_results.items() if r is not None}
+    assignments: Dict[str, VehicleAssignment] = {}
+    for result in solved.values():
+        assignments.update(result["assignments"])
+
+    # 3. repair ------------------------------------------------------------
+    if len(solved) < len(vehicle_groups):
+        started = time.perf_counter()
+        result = solve_flight_leg(
+            balloons=balloons,
+            cars=[dict(c) for c in cars],
+            people=people,
+            vehicle_groups=vehicle_groups,
+            time_limit_s=max(
+                time_limit_s * (1 - TOP_TIME_SHARE - GROUPS_TIME_SHARE), 1
+            ),
+            num_search_workers=num_search_workers,
+            hint=assignments,
+            control=control,
+            **{
+                **model_kwargs,
+                "fixed_groups": {p["id"]: gid for gid in solved for p in members[gid]},
+            },
+        )
+        timings["repair"] = time.perf_counter() - started
+        return {
+            **result,
+            "status": "cancelled" if control.cancelled else "feasible",
+            "engine": "hierarchical",
+            "timings": timings,
+            "repairedGroups": sorted(set(vehicle_groups) - set(solved)),
+        }
+
+    return {
+        "assignments": assignments,
+        # the top level is a relaxation, so the combination is never proven optimal
+        "status": "cancelled" if control.cancelled else "feasible",
+        "objective": combine_breakdowns([r["objective"] for r in solved.values()]),
+        "engine": "hierarchical",
+        "timings": timings,
+        "repairedGroups": [],
+    }
+
+
+def assign_groups(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    time_limit_s: float,
+    num_search_workers: int,
+    control: SolveControl,
+    group_history: Optional[Dict[str, Dict[str, int]]],
+    balloon_history: Optional[Dict[str, Dict[str, int]]],
+    people_meet_history: Optional[Dict[str, Dict[str, int]]],
+    frozen: Optional[Dict[str, VehicleAssignment]],
+    planning_horizon_legs: int,
+    w_group_passenger_balance: int,
+    w_new_meetings: int,
+    w_group_rotation: int,
+    w_balloon_rotation: int,
+    random_seed: Optional[int] = None,
+    **_: Any,
+) -> Dict[str, str]:
+    """Top level: person id -> group id (balloon id)."""
+    # same seat reservation as the leg model, so group capacities match
+    cars = [dict(c) for c in cars]
+    reserve_group_car_seats(balloons, cars, vehicle_groups)
+    vehicles = {v["id"]: v for v in [*balloons, *cars]}
+
+    group_of = {}
+    for gid, car_ids in vehicle_groups.items():
+        for vid in [gid, *car_ids]:
+            group_of[vid] = gid
+
+    person_ids = [p["id"] for p in people]
+    is_participant = {
+        p["id"]: p.get("role", "participant") == "participant" for p in people
+    }
+    group_ids = list(vehicle_groups)
+
+    model = cp_model.CpModel()
+    x = {(p, g): model.NewBoolVar(f"x_{p}_{g}") for p in person_ids for g in group_ids}
+    for p in person_ids:
+        model.AddExactlyOne(x[p, g] for g in group_ids)
+
+    # operator matching: every used vehicle needs its own eligible operator
+    # from the same group
+    opr = {
+        (q, v): model.NewBoolVar(f"opr_{q}_{v}")
+        for v, vehicle in vehicles.items()
+        for q in vehicle.get("allowedOperatorIds", [])
+        if q in is_participant
+    }
+    for q in person_ids:
+        model.AddAtMostOne(var for (r, _), var in opr.items() if r == q)
+    for (q, v), var in opr.items():
+        model.AddImplication(var, x[q, group_of[v]])
+
+    for g in group_ids:
+        seats = []
+        for v in [g, *vehicle_groups[g]]:
+            ops = [var for (_, w), var in opr.items() if w == v]
+            if ops:
+                model.AddAtMostOne(ops)
+                seats.append(int(vehicles[v]["maxCapacity"]) * sum(ops))
+        model.Add(sum(x[p, g] for p in person_ids) <= sum(seats))
+
+    # frozen seats pin people (and operators) to the vehicle's group
+    for vid, assignment in (frozen or {}).items():
+        if vid not in group_of:
+            continue
+        if assignment["operatorId"] is not None:
+            model.Add(opr[assignment["operatorId"], vid] == 1)
+        for pid in [assignment["operatorId"], *assignment["passengerIds"]]:
+            if pid is not None:
+                model.Add(x[pid, group_of[vid]] == 1)
+
+    variables: List[Any] = []
+    coefs: List[float] = []
+
+    # 3.4 ground crew per group close to the average
+    if w_group_passenger_balance != 0:
+        seats_in_air = sum(int(b["maxCapacity"]) for b in balloons)
+        avg_ground = (len(person_ids) - seats_in_air) // max(len(group_ids), 1)
+        for g in group_ids:
+            crew = sum(x[p, g] for p in person_ids) - int(vehicles[g]["maxCapacity"])
+            dev_pos = model.NewIntVar(0, len(person_ids), f"devP_{g}")
+            dev_neg = model.NewIntVar(0, len(person_ids), f"devN_{g}")
+            model.Add(crew - avg_ground == dev_pos - dev_neg)
+            variables += [dev_pos, dev_neg]
+            coefs += [w_group_passenger_balance] * 2
+
+    # 3.5b participants sharing a group with a past contact
+    if w_new_meetings != 0 and people_meet_history:
+        max_contacts_per_person = 8
+        for p in person_ids:
+            if not is_participant[p]:
+                continue
+            contacts = [
+                q
+                for q in people_meet_history.get(p, {})
+                if q != p and is_participant.get(q, False)
+            ][-max_contacts_per_person:]
+            if not contacts:
+                continue
+            for g in group_ids:
+                repeat = model.NewBoolVar(f"repeat_{p}_{g}")
+                for q in contacts:
+                    # both in g ⇒ repeat
+                    model.AddBoolOr([x[p, g].Not(), x[q, g].Not(), repeat])
+                variables.append(repeat)
+                coefs.append(w_new_meetings)
+
+    # 3.6 / 3.6c rotation: prefer groups (and their balloons) not seen before
+    for p in person_ids:
+        for g in group_ids:
+            coef = 0.0
+            if w_group_rotation != 0 and group_history:
+                coef -= w_group_rotation / (
+                    1.0 + float(group_history.get(p, {}).get(g, 0))
+                )
+            if w_balloon_rotation != 0 and balloon_history and planning_horizon_legs:
+                coef -= w_balloon_rotation / (
+                    1.0 + float(balloon_history.get(p, {}).get(g, 0))
+                )
+            if coef:
+                variables.append(x[p, g])
+                coefs.append(coef)
+
+    model.Minimize(cp_model.LinearExpr.WeightedSum(variables, coefs))
+
+    solver = cp_model.CpSolver()
+    control.limit(solver, time_limit_s)
+    solver.parameters.num_search_workers = int(max(1, num_search_workers))
+    if random_seed is not None:
+        solver.parameters.random_seed = int(random_seed)
+
+    with control.running(solver, model):
+        status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        if status == cp_model.INFEASIBLE:
+            raise RuntimeError("No feasible assignment")
+        elif control.cancelled:
+            raise SolveCancelled("Solve was cancelled before a solution was found")
+        else:
+            raise RuntimeError("Solver failed")
+
+    return {p: g for p in person_ids for g in group_ids if solver.BooleanValue(x[p, g])}
+
+
+def combine_breakdowns(breakdowns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum per-group objective breakdowns into one for the whole leg."""
+    terms: Dict[str, Dict[str, Any]] = {}
+    stats: Dict[str, int] = {}
+    for breakdown in breakdowns:
+        for key, term in breakdown["terms"].items():
+            total = terms.setdefault(
+                key, {"weight": term["weight"], "raw": 0.0, "value": 0.0}
+            )
+            total["raw"] += term["raw"]
+            total["value"] += term["value"]
+        for key, n in breakdown["stats"].items():
+            stats[key] = stats.get(key, 0) + n
+    return {
+        "value": sum(b["value"] for b in breakdowns),
+        # per-group bounds do not bound the whole leg
+        "bound": None,
+        "terms": terms,
+        "stats": stats,
+    }
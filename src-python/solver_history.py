@@ -0,0 +1,126 @@
+"""
+History aggregates used by the leg solver.
+
+Mirrors the bookkeeping done by the app (`src/composables/solver.ts`) so a
+multi-leg run can roll the histories forward without a round-trip:
+
+  – flightsSoFar      : balloon seats (operator or passenger) over all past legs
+  – groupHistory      : person -> group (balloon id) -> count, first leg of each
+                        past day only
+  – balloonHistory    : person -> balloon id -> count, every leg of past days
+  – peopleMeetHistory : person -> person -> count, shared group on the first
+                        leg of past days (symmetric)
+
+Flight counts are updated after every leg; the other aggregates only once a
+day is complete, because the app excludes the current day from them.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Iterable
+
+from solver_types import VehicleAssignment
+
+Counts = Dict[str, Dict[str, int]]
+
+
+def occupants(assignment: VehicleAssignment) -> List[str]:
+    people = [assignment["operatorId"]] if assignment.get("operatorId") else []
+    return people + list(assignment.get("passengerIds", []))
+
+
+def vehicle_to_group(vehicle_groups: Dict[str, List[str]]) -> Dict[str, str]:
+    """Map every balloon and car to its group id (= balloon id)."""
+    group_of = {}
+    for bid, car_ids in vehicle_groups.items():
+        group_of[bid] = bid
+        for cid in car_ids:
+            group_of[cid] = bid
+    return group_of
+
+
+def fixed_groups_from_manifest(
+    manifest: Dict[str, VehicleAssignment],
+    vehicle_groups: Dict[str, List[str]],
+) -> Dict[str, str]:
+    """Group of every person in `manifest`; the `fixedGroups` of the next leg."""
+    group_of = vehicle_to_group(vehicle_groups)
+    fixed = {}
+    for vid, assignment in manifest.items():
+        gid = group_of.get(vid)
+        if gid is None:
+            continue
+        for pid in occupants(assignment):
+            fixed[pid] = gid
+    return fixed
+
+
+def _bump(counts: Counts, a: str, b: str, n: int = 1) -> None:
+    row = counts.setdefault(a, {})
+    row[b] = row.get(b, 0) + n
+
+
+class CampHistory:
+    """In-memory history aggregates, updated incrementally."""
+
+    def __init__(
+        self,
+        flights_so_far: Optional[Dict[str, int]] = None,
+        group_history: Optional[Counts] = None,
+        balloon_history: Optional[Counts] = None,
+        people_meet_history: Optional[Counts] = None,
+    ):
+        self.flights_so_far: Dict[str, int] = defaultdict(int, flights_so_far or {})
+        self.group_history: Counts = _copy_counts(group_history)
+        self.balloon_history: Counts = _copy_counts(balloon_history)
+        self.people_meet_history: Counts = _copy_counts(people_meet_history)
+
+    def record_leg(
+        self, manifest: Dict[str, VehicleAssignment], balloon_ids: Iterable[str]
+    ) -> None:
+        """Count the balloon flights of one finished leg."""
+        balloon_ids = set(balloon_ids)
+        for vid, assignment in manifest.items():
+            if vid not in balloon_ids:
+                continue
+            for pid in occupants(assignment):
+                self.flights_so_far[pid] += 1
+
+    def record_day(
+        self,
+        legs: List[Dict[str, VehicleAssignment]],
+        vehicle_groups: Dict[str, List[str]],
+        balloon_ids: Iterable[str],
+    ) -> None:
+        """Fold a completed day (all its leg manifests) into the histories."""
+        if not legs:
+            return
+        balloon_ids = set(balloon_ids)
+        group_of = vehicle_to_group(vehicle_groups)
+
+        members: Dict[str, List[str]] = defaultdict(list)
+        for vid, assignment in legs[0].items():
+            gid = group_of.get(vid)
+            if gid is None:
+                continue
+            for pid in occupants(assignment):
+                _bump(self.group_history, pid, gid)
+                members[gid].append(pid)
+
+        for group in members.values():
+            for i, a in enumerate(group):
+                for b in group[i + 1 :]:
+                    if a == b:
+                        continue
+                    _bump(self.people_meet_history, a, b)
+                    _bump(self.people_meet_history, b, a)
+
+        for manifest in legs:
+            for vid, assignment in manifest.items():
+                if vid not in balloon_ids:
+                    continue
+                for pid in occupants(assignment):
+                    _bump(self.balloon_history, pid, vid)
+
+
+def _copy_counts(counts: Optional[Counts]) -> Counts:
+    return {k: dict(v) for k, v in (counts or {}).items()}
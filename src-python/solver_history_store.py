@@ -0,0 +1,172 @@
+"""
+Persistent history store (SQLite) owned by the solver.
+
+Instead of shipping the full `groupHistory`, `balloonHistory`,
+`peopleMeetHistory` and `flightsSoFar` with every call, the app ingests each
+finalized leg manifest once (`ingest_leg`) and later payloads refer to the
+camp by id:
+
+    "history": {"campId": "camp-2026", "version": 12, "dayId": "day-4"}
+
+Counts are kept per day, so `load` can leave out the day being planned, as
+the app does (see `solver_history`): flight counts cover every ingested leg,
+the other aggregates only past days. Ingesting only adds the delta of one
+manifest; nothing is rebuilt from the full past.
+"""
+
+import sqlite3
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional
+
+from solver_history import CampHistory, occupants, vehicle_to_group
+from solver_types import VehicleAssignment
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS camps (
+    camp_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS legs (
+    camp_id TEXT NOT NULL,
+    day_id  TEXT NOT NULL,
+    leg_id  TEXT NOT NULL,
+    PRIMARY KEY (camp_id, day_id, leg_id)
+);
+CREATE TABLE IF NOT EXISTS counts (
+    camp_id TEXT NOT NULL,
+    day_id  TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    a       TEXT NOT NULL,
+    b       TEXT NOT NULL,
+    n       INTEGER NOT NULL,
+    PRIMARY KEY (camp_id, day_id, kind, a, b)
+);
+"""
+
+# `kind` values of the counts table; flights use b = ''
+FLIGHTS = "flights"
+GROUP = "group"
+BALLOON = "balloon"
+MEET = "meet"
+
+
+class HistoryVersionError(ValueError):
+    """Raised when a payload refers to a history version the store does not hold."""
+
+
+class HistoryStore:
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def version(self, camp_id: str) -> int:
+        """Number of legs ingested for `camp_id` (0 for an unknown camp)."""
+        row = self._db.execute(
+            "SELECT version FROM camps WHERE camp_id = ?", (camp_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def ingest_leg(
+        self,
+        camp_id: str,
+        day_id: str,
+        leg_id: str,
+        manifest: Dict[str, VehicleAssignment],
+        vehicle_groups: Dict[str, List[str]],
+        balloon_ids: Iterable[str],
+        *,
+        first_leg: bool,
+    ) -> int:
+        """
+        Add one finalized leg and return the new camp version. A leg that was
+        already ingested is ignored, so retries are safe. Group and meet
+        counts only come from the `first_leg` of a day.
+        """
+        balloon_ids = set(balloon_ids)
+        group_of = vehicle_to_group(vehicle_groups)
+        deltas: Dict[tuple, int] = {}
+
+        def bump(kind: str, a: str, b: str = "") -> None:
+            deltas[kind, a, b] = deltas.get((kind, a, b), 0) + 1
+
+        members: Dict[str, List[str]] = {}
+        for vid, assignment in manifest.items():
+            if vid in balloon_ids:
+                for pid in occupants(assignment):
+                    bump(FLIGHTS, pid)
+                    bump(BALLOON, pid, vid)
+            gid = group_of.get(vid)
+            if first_leg and gid is not None:
+                for pid in occupants(assignment):
+                    bump(GROUP, pid, gid)
+                    members.setdefault(gid, []).append(pid)
+
+        for group in members.values():
+            for i, a in enumerate(group):
+                for b in group[i + 1 :]:
+                    if a != b:
+                        bump(MEET, a, b)
+                        bump(MEET, b, a)
+
+        with self._db:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO legs VALUES (?, ?, ?)",
+                (camp_id, day_id, leg_id),
+            ).rowcount
+            if inserted:
+                self._db.executemany(
+                    "INSERT INTO counts VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (camp_id, day_id, kind, a, b) "
+                    "DO UPDATE SET n = n + excluded.n",
+                    [
+                        (camp_id, day_id, kind, a, b, n)
+                        for (kind, a, b), n in deltas.items()
+                    ],
+                )
+                self._db.execute(
+                    "INSERT INTO camps VALUES (?, 1) "
+                    "ON CONFLICT (camp_id) DO UPDATE SET version = version + 1",
+                    (camp_id,),
+                )
+        return self.version(camp_id)
+
+    def load(
+        self,
+        camp_id: str,
+        *,
+        current_day: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> CampHistory:
+        """
+        Aggregates of `camp_id` as a `CampHistory`. Group, balloon and meet
+        counts of `current_day` are left out. With `version`, the store must
+        hold exactly that many legs, so a stale store is never used silently.
+        """
+        if version is not None and self.version(camp_id) != version:
+            raise HistoryVersionError(
+                f"History of camp {camp_id!r} is at version "
+                f"{self.version(camp_id)}, payload expects {version}"
+            )
+
+        history = CampHistory()
+        with closing(self._db.cursor()) as cursor:
+            cursor.execute(
+                "SELECT kind, a, b, SUM(n) FROM counts "
+                "WHERE camp_id = ? AND (kind = ? OR day_id IS NOT ?) "
+                "GROUP BY kind, a, b",
+                (camp_id, FLIGHTS, current_day),
+            )
+            target = {
+                GROUP: history.group_history,
+                BALLOON: history.balloon_history,
+                MEET: history.people_meet_history,
+            }
+            for kind, a, b, n in cursor:
+                if kind == FLIGHTS:
+                    history.flights_so_far[a] = n
+                else:
+                    target[kind].setdefault(a, {})[b] = n
+        return history
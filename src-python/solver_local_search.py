@@ -0,0 +1,847 @@
+"""
+Local-search engine for huge legs (`engine: "local"`).
+
+CP-SAT may not even find a feasible manifest for events with many hundreds of
+people within the time limit. This engine trades optimality proofs for speed:
+simulated annealing over an index-based assignment
+
+  seat[p]      – vehicle index of person p
+  operator[v]  – person index operating vehicle v (-1 if none)
+
+with three move types – move one passenger, swap two passengers, and change
+a vehicle's operator. Hard rules are penalties, so the search may pass
+through infeasible states; only feasible states are kept as best solution.
+Cost is split into per-vehicle and per-group parts, and both are kept as
+counters (seats taken, weight, nationalities, participants, per-member cost
+sums; people on the ground, low flyers in cars, participants who met someone
+in their group) that a move updates in place. Re-costing the (at most two)
+vehicles and groups it touches is then O(1), plus O(degree) for the contacts
+of a person changing groups and the members of a vehicle changing operator.
+`vehicle_terms` / `group_terms` compute the same costs from scratch for
+breakdowns.
+
+The objective uses the same weight families and section numbers as
+`solver_flight_leg` (3.1 … 3.8), so `objective` breakdowns are comparable.
+The search is anytime (best solution at deadline or cancel) and seedable.
+"""
+
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from solver_checks import reserve_group_car_seats
+from solver_control import SolveCancelled, SolveControl
+from solver_flight_leg import SECTION_WEIGHTS, Manifest
+from solver_types import Balloon, Car, Person, VehicleAssignment
+from solver_verify import verify_leg
+
+SECTIONS = list(SECTION_WEIGHTS)
+
+# Cost of one unit of hard-rule violation (seat, operator, language, 10 kg).
+PENALTY = 10_000.0
+
+# Control checks and temperature updates happen every this many moves.
+CHECK_EVERY = 200
+
+# Moves per deterministic second in reproducible mode (about a wall second).
+MOVES_PER_DETERMINISTIC_SECOND = 50_000
+
+
+class LegInstance:
+    """Index-based view of one leg plus the cost of vehicles and groups."""
+
+    def __init__(
+        self,
+        balloons: List[Balloon],
+        cars: List[Car],
+        people: List[Person],
+        vehicle_groups: Dict[str, List[str]],
+        *,
+        group_history: Optional[Dict[str, Dict[str, int]]],
+        balloon_history: Optional[Dict[str, Dict[str, int]]],
+        people_meet_history: Optional[Dict[str, Dict[str, int]]],
+        frozen: Optional[Dict[str, VehicleAssignment]],
+        fixed_groups: Optional[Dict[str, str]],
+        planning_horizon_legs: int,
+        c_common_language_passengers: bool,
+        c_common_language_operators: bool,
+        w_pilot_fairness: int,
+        w_passenger_fairness: int,
+        w_tiebreak_fairness: int,
+        w_no_solo_participant: int,
+        w_divers_nationalities: int,
+        w_new_meetings: int,
+        w_group_passenger_balance: int,
+        w_group_rotation: int,
+        w_balloon_rotation: int,
+        w_low_flights_lookahead: int,
+        counselor_flight_discount: float,
+        default_person_weight: int,
+        **_: Any,
+    ):
+        cars = [dict(c) for c in cars]
+        reserve_group_car_seats(balloons, cars, vehicle_groups)
+        first_leg = not fixed_groups
+
+        self.person_ids = [p["id"] for p in people]
+        self.vehicle_ids = [b["id"] for b in balloons] + [c["id"] for c in cars]
+        self.n_balloons = len(balloons)
+        pidx = {p: i for i, p in enumerate(self.person_ids)}
+        vidx = {v: i for i, v in enumerate(self.vehicle_ids)}
+        P, V = len(self.person_ids), len(self.vehicle_ids)
+
+        vehicles = [*balloons, *cars]
+        self.capacity = np.array([int(v["maxCapacity"]) for v in vehicles])
+        self.max_weight = np.array(
+            [
+                int(v.get("maxWeight") or 0) if i < self.n_balloons else 0
+                for i, v in enumerate(vehicles)
+            ]
+        )
+        self.is_balloon = np.arange(V) < self.n_balloons
+        self.allowed_ops = [
+            [pidx[q] for q in v.get("allowedOperatorIds", []) if q in pidx]
+            for v in vehicles
+        ]
+
+        flights = np.array([int(p.get("flightsSoFar", 0)) for p in people])
+        first_time = np.array([bool(p.get("firstTime", False)) for p in people])
+        self.weight = np.array(
+            [int(p.get("weight", default_person_weight)) for p in people]
+        )
+        self.participant = np.array(
+            [p.get("role", "participant") == "participant" for p in people]
+        )
+        nat_ids: Dict[str, int] = {}
+        self.nationality = np.array(
+            [
+                nat_ids.setdefault(p.get("nationality") or "unknown", len(nat_ids))
+                for p in people
+            ]
+        )
+        self.n_nationalities = len(nat_ids)
+
+        # language bitmasks; "speaks all" has every bit set
+        lang_ids: Dict[str, int] = {}
+        masks = []
+        for p in people:
+            langs = p.get("languages")
+            if not langs:
+                masks.append(-1)
+            else:
+                masks.append(
+                    sum(1 << lang_ids.setdefault(lang, len(lang_ids)) for lang in langs)
+                )
+        self.lang_mask = np.array(masks, dtype=np.int64)
+        self.check_passenger_langs = c_common_language_passengers
+        self.check_operator_langs = c_common_language_operators
+
+        # groups: index of the balloon and its cars
+        self.groups: List[Tuple[int, List[int]]] = [
+            (vidx[bid], [vidx[c] for c in car_ids if c in vidx])
+            for bid, car_ids in vehicle_groups.items()
+            if bid in vidx
+        ]
+        self.group_of = np.full(V, -1)
+        for g, (b, car_idx) in enumerate(self.groups):
+            self.group_of[[b, *car_idx]] = g
+
+        # movable vehicles per person (stay-in-group) and frozen seats
+        self.allowed_vehicles = [np.arange(V) for _ in range(P)]
+        self.frozen_seat = np.full(P, -1)
+        self.frozen_operator = np.full(V, -1)
+        for vid, a in (frozen or {}).items():
+            if vid not in vidx:
+                continue
+            if a.get("operatorId") in pidx:
+                self.frozen_operator[vidx[vid]] = pidx[a["operatorId"]]
+                self.frozen_seat[pidx[a["operatorId"]]] = vidx[vid]
+            for q in a.get("passengerIds", []):
+                if q in pidx:
+                    self.frozen_seat[pidx[q]] = vidx[vid]
+        for q, bid in (fixed_groups or {}).items():
+            if q in pidx and bid in vidx and self.frozen_seat[pidx[q]] < 0:
+                g = self.group_of[vidx[bid]]
+                self.allowed_vehicles[pidx[q]] = np.flatnonzero(self.group_of == g)
+
+        # ---- objective data (mirrors section 3 of solver_flight_leg) ----
+        w = {
+            "3.1": w_pilot_fairness,
+            "3.2": w_passenger_fairness,
+            "3.3": w_no_solo_participant,
+            "3.4": w_group_passenger_balance if first_leg else 0,
+            "3.5a": w_divers_nationalities if self.n_nationalities > 1 else 0,
+            "3.5b": (
+                w_new_meetings if first_leg and people_meet_history is not None else 0
+            ),
+            "3.6": w_group_rotation if first_leg and group_history else 0,
+            "3.6b": w_balloon_rotation if balloon_history else 0,
+            "3.6c": (
+                w_balloon_rotation
+                if balloon_history and first_leg and planning_horizon_legs >= 1
+                else 0
+            ),
+            "3.7": w_low_flights_lookahead if planning_horizon_legs >= 1 else 0,
+            "3.8": w_tiebreak_fairness,
+        }
+        self.weights = np.array([w[s] for s in SECTIONS], dtype=float)
+
+        max_flights = int(flights.max()) + 1 if P else 1
+        self.pilot_bonus = (max_flights - flights).astype(float)
+        bonus = self.pilot_bonus + ((flights == 0) & first_time)
+        self.pax_bonus = np.where(
+            self.participant, bonus, np.maximum(bonus - counselor_flight_discount, 0)
+        )
+        order = np.argsort(flights - first_time, kind="stable")
+        self.priority = np.empty(P)
+        self.priority[order] = np.arange(P)
+
+        def novelty(history, keys) -> np.ndarray:
+            nf = np.ones((P, len(keys)))
+            for q, row in (history or {}).items():
+                if q in pidx:
+                    for k, key in enumerate(keys):
+                        nf[pidx[q], k] = 1.0 / (1.0 + float(row.get(key, 0)))
+            return nf
+
+        group_keys = [self.vehicle_ids[b] for b, _ in self.groups]
+        self.group_novelty = novelty(group_history, group_keys)  # P x G
+        self.balloon_novelty = novelty(
+            balloon_history, self.vehicle_ids[: self.n_balloons]
+        )  # P x B
+
+        n_people = P
+        seats_in_air = int(self.capacity[: self.n_balloons].sum())
+        self.avg_ground = (n_people - seats_in_air) // max(len(vehicle_groups), 1)
+
+        # trimmed participant contacts, as in 3.5b
+        self.contacts = np.zeros((P, P), dtype=bool)
+        for q, row in (people_meet_history or {}).items():
+            if q not in pidx or not self.participant[pidx[q]]:
+                continue
+            met = [
+                pidx[r]
+                for r in row
+                if r != q and r in pidx and self.participant[pidx[r]]
+            ][-8:]
+            self.contacts[pidx[q], met] = True
+
+        # 3.7 low-flight, language-eligible people per group and the target
+        self.low = np.zeros((len(self.groups), P), dtype=bool)
+        self.low_target = np.zeros(len(self.groups))
+        if planning_horizon_legs >= 1:
+            for g, (b, _) in enumerate(self.groups):
+                ops = self.allowed_ops[b]
+                op_mask = np.bitwise_or.reduce(self.lang_mask[ops]) if ops else 0
+                eligible = np.flatnonzero((self.lang_mask & op_mask) != 0)
+                if not len(eligible):
+                    continue
+                future = planning_horizon_legs * int(self.capacity[b])
+                sorted_f = np.sort(flights[eligible])
+                if future >= len(sorted_f):
+                    cutoff = sorted_f[-1]
+                else:
+                    cutoff = sorted_f[future - 1]
+                low = eligible[flights[eligible] <= cutoff]
+                self.low[g, low] = True
+                self.low_target[g] = min(future, len(low))
+
+        # moves: frozen people only operate the vehicle they are frozen as operator
+        # of (2.6), which keeps that operator for good
+        self.allowed_ops = [
+            [q for q in ops if self.frozen_seat[q] < 0] for ops in self.allowed_ops
+        ]
+        self._move_data()
+
+    def _move_data(self) -> None:
+        """
+        Per-(person, vehicle) costs of `vehicle_terms` that are linear in the
+        members, and plain-list views of the data the moves read.
+        """
+        P, V = len(self.person_ids), len(self.vehicle_ids)
+        w = self.weights
+        member = np.zeros((P, V))
+        operating = np.zeros((P, V))
+        for v in range(V):
+            g = self.group_of[v]
+            operating[:, v] -= w[0] * self.pilot_bonus
+            if g >= 0:
+                member[:, v] -= w[6] * self.group_novelty[:, g]
+                operating[:, v] += w[6] * self.group_novelty[:, g]
+            if self.is_balloon[v]:
+                member[:, v] -= w[1] * self.pax_bonus
+                member[:, v] -= w[7] * self.balloon_novelty[:, v]
+                member[:, v] += w[10] * self.priority
+                operating[:, v] += w[7] * self.balloon_novelty[:, v]
+            elif g >= 0:
+                member[:, v] -= w[8] * self.balloon_novelty[:, self.groups[g][0]]
+        self.member_cost = member.tolist()
+        self.operator_cost = operating.tolist()
+        self.allowed_seats = [set(vs.tolist()) for vs in self.allowed_vehicles]
+        # contacts[p, r] as lists: whom p met, and who met p
+        self.met_by = [np.flatnonzero(row).tolist() for row in self.contacts]
+        self.met_of = [np.flatnonzero(col).tolist() for col in self.contacts.T]
+
+    # ------------------------------------------------------------------
+    # Cost of one vehicle / one group: (violations, raw section sums)
+    # ------------------------------------------------------------------
+    def vehicle_terms(self, v: int, members: np.ndarray, op: int):
+        raw = np.zeros(len(SECTIONS))
+        n = len(members)
+        violations = max(n - int(self.capacity[v]), 0)
+        if n == 0:
+            return violations, raw
+        if op < 0:
+            violations += 1
+        if self.max_weight[v] > 0:
+            over = int(self.weight[members].sum()) - int(self.max_weight[v])
+            violations += math.ceil(max(over, 0) / 10)
+
+        g = self.group_of[v]
+        if op >= 0:
+            raw[0] -= self.pilot_bonus[op]
+        if self.n_nationalities > 1:
+            counts = np.bincount(
+                self.nationality[members], minlength=self.n_nationalities
+            )
+            raw[4] -= n - counts.max()
+        if g >= 0:
+            nf = self.group_novelty[members, g].sum()
+            raw[6] -= nf - (self.group_novelty[op, g] if op >= 0 else 0)
+
+        if self.is_balloon[v]:
+            if self.check_passenger_langs and op >= 0:
+                violations += int(
+                    np.count_nonzero(
+                        (self.lang_mask[members] & self.lang_mask[op]) == 0
+                    )
+                )
+            raw[1] -= self.pax_bonus[members].sum()
+            nfb = self.balloon_novelty[members, v].sum()
+            raw[7] -= nfb - (self.balloon_novelty[op, v] if op >= 0 else 0)
+            raw[10] += self.priority[members].sum()
+        else:
+            raw[2] += int(np.count_nonzero(self.participant[members]) == 1)
+            if g >= 0:
+                b = self.groups[g][0]
+                raw[8] -= self.balloon_novelty[members, b].sum()
+        return violations, raw
+
+    def group_terms(self, g: int, seat: np.ndarray, operator: np.ndarray):
+        raw = np.zeros(len(SECTIONS))
+        b, car_idx = self.groups[g]
+        in_cars = np.isin(seat, car_idx)
+        raw[3] = abs(int(np.count_nonzero(in_cars)) - self.avg_ground)
+        if self.weights[5]:
+            members = np.flatnonzero((seat == b) | in_cars)
+            parts = members[self.participant[members]]
+            if len(parts):
+                met = self.contacts[np.ix_(parts, members)].any(axis=1)
+                raw[5] = int(np.count_nonzero(met))
+        if self.low_target[g] > 0:
+            low_in_cars = int(np.count_nonzero(self.low[g] & in_cars))
+            raw[9] = max(self.low_target[g] - low_in_cars, 0)
+
+        violations = 0
+        bop = operator[b]
+        if self.check_operator_langs and bop >= 0:
+            for c in car_idx:
+                cop = operator[c]
+                if cop >= 0 and (self.lang_mask[bop] & self.lang_mask[cop]) == 0:
+                    violations += 1
+        return violations, raw
+
+    def cost(self, violations: int, raw: np.ndarray) -> float:
+        return PENALTY * violations + float(self.weights @ raw)
+
+
+class LocalSearch:
+    """Simulated annealing on a `LegInstance`."""
+
+    def __init__(self, inst: LegInstance, seed: Optional[int]):
+        self.inst = inst
+        self.rng = np.random.default_rng(seed)
+        P, V = len(inst.person_ids), len(inst.vehicle_ids)
+        self.seat = np.full(P, -1)
+        self.operator = np.full(V, -1)
+        self.operates = np.full(P, -1)  # vehicle operated by p, or -1
+        self._initial_solution()
+
+        # the moves work on plain lists: scalar access is much faster
+        self.seat = self.seat.tolist()
+        self.operator = self.operator.tolist()
+        self.operates = self.operates.tolist()
+        self.random = random.Random(seed)
+        self.movable = np.flatnonzero(inst.frozen_seat < 0).tolist()
+        self.options = [vs.tolist() for vs in inst.allowed_vehicles]
+        self.frozen_operator = inst.frozen_operator.tolist()
+        self.frozen_seat = inst.frozen_seat.tolist()
+        self.group_of = inst.group_of.tolist()
+        self.is_balloon = inst.is_balloon.tolist()
+        self.capacity = inst.capacity.tolist()
+        self.max_weight = inst.max_weight.tolist()
+        self.weight = inst.weight.tolist()
+        self.participant = inst.participant.tolist()
+        self.nationality = inst.nationality.tolist()
+        self.lang_mask = inst.lang_mask.tolist()
+        self.low = inst.low.tolist()
+        self.low_target = inst.low_target.tolist()
+        self.w = inst.weights.tolist()
+        self._init_counters()
+
+        vehicles = [self._vehicle_cost(v) for v in range(V)]
+        self.v_cost = [c for c, _ in vehicles]
+        self.v_viol = [viol for _, viol in vehicles]
+        groups = [self._group_cost(g) for g in range(len(inst.groups))]
+        self.g_cost = [c for c, _ in groups]
+        self.g_viol = [viol for _, viol in groups]
+        self.total = float(sum(self.v_cost) + sum(self.g_cost))
+        self.violations = sum(self.v_viol) + sum(self.g_viol)
+
+    # ---- state ---------------------------------------------------------
+    def _initial_solution(self) -> None:
+        inst = self.inst
+        for p in np.flatnonzero(inst.frozen_seat >= 0):
+            self.seat[p] = inst.frozen_seat[p]
+        for v in np.flatnonzero(inst.frozen_operator >= 0):
+            self._set_operator(v, inst.frozen_operator[v])
+        # one operator per vehicle, balloons first
+        for v in range(len(inst.vehicle_ids)):
+            if self.operator[v] >= 0:
+                continue
+            free = [
+                q
+                for q in inst.allowed_ops[v]
+                if self.operates[q] < 0
+                and inst.frozen_seat[q] < 0
+                and v in inst.allowed_vehicles[q]
+            ]
+            if free:
+                q = free[int(self.rng.integers(len(free)))]
+                self.seat[q] = v
+                self._set_operator(v, q)
+        # everyone else into the emptiest allowed operated vehicle
+        load = np.bincount(self.seat[self.seat >= 0], minlength=len(inst.vehicle_ids))
+        for p in self.rng.permutation(np.flatnonzero(self.seat < 0)):
+            options = inst.allowed_vehicles[p]
+            operated = options[self.operator[options] >= 0]
+            if len(operated):
+                options = operated
+            room = inst.capacity[options] - load[options]
+            v = int(options[int(np.argmax(room))])
+            self.seat[p] = v
+            load[v] += 1
+
+    def _set_operator(self, v: int, q: int) -> None:
+        old = self.operator[v]
+        if old >= 0:
+            self.operates[old] = -1
+        self.operator[v] = q
+        if q >= 0:
+            self.operates[q] = v
+
+    def _init_counters(self) -> None:
+        inst = self.inst
+        V, G = len(inst.vehicle_ids), len(inst.groups)
+        # per vehicle
+        self.members: List[set] = [set() for _ in range(V)]
+        self.count = [0] * V
+        self.weight_sum = [0] * V
+        self.participants = [0] * V
+        self.nationalities = [[0] * inst.n_nationalities for _ in range(V)]
+        self.member_sum = [0.0] * V
+        self.language_misses = [0] * V  # members sharing no language with op
+        # per group
+        self.ground = [0] * G
+        self.low_in_cars = [0] * G
+        self.met = [0] * G  # participants who met someone in their group
+        # per person: contacts in the own group
+        self.contacts_here = [0] * len(inst.person_ids)
+        for p, v in enumerate(self.seat):
+            self._seat_counts(p, v, 1)
+        if self.w[5]:
+            for p, v in enumerate(self.seat):
+                g = self.group_of[v]
+                if g >= 0:
+                    here = sum(
+                        1 for r in inst.met_by[p] if self.group_of[self.seat[r]] == g
+                    )
+                    self.contacts_here[p] = here
+                    self.met[g] += here > 0
+
+    def _seat_counts(self, p: int, v: int, sign: int) -> None:
+        """Add (`sign` 1) or remove (-1) p as member of v in the counters."""
+        if sign > 0:
+            self.members[v].add(p)
+        else:
+            self.members[v].discard(p)
+        self.count[v] += sign
+        self.weight_sum[v] += sign * self.weight[p]
+        self.participants[v] += sign * self.participant[p]
+        self.nationalities[v][self.nationality[p]] += sign
+        self.member_sum[v] += sign * self.inst.member_cost[p][v]
+        op = self.operator[v]
+        if self.inst.check_passenger_langs and self.is_balloon[v] and op >= 0:
+            if self.lang_mask[p] & self.lang_mask[op] == 0:
+                self.language_misses[v] += sign
+        g = self.group_of[v]
+        if g >= 0 and not self.is_balloon[v]:
+            self.ground[g] += sign
+            if self.low[g][p]:
+                self.low_in_cars[g] += sign
+
+    def _regroup(self, x: int, old: int, new: int) -> None:
+        """Update the met counters after x moved from group `old` to `new`."""
+        if old >= 0 and self.contacts_here[x] > 0:
+            self.met[old] -= 1
+        here = 0
+        if new >= 0:
+            seat, group_of = self.seat, self.group_of
+            here = sum(1 for r in self.inst.met_by[x] if group_of[seat[r]] == new)
+            if here:
+                self.met[new] += 1
+        self.contacts_here[x] = here
+        for p in self.inst.met_of[x]:
+            g = self.group_of[self.seat[p]]
+            if g == old:
+                self.contacts_here[p] -= 1
+                if self.contacts_here[p] == 0:
+                    self.met[old] -= 1
+            elif g == new:
+                self.contacts_here[p] += 1
+                if self.contacts_here[p] == 1:
+                    self.met[new] += 1
+
+    def _vehicle_cost(self, v: int) -> Tuple[float, int]:
+        """`vehicle_terms` of v from the counters, as (cost, violations)."""
+        n = self.count[v]
+        violations = max(n - self.capacity[v], 0)
+        if n == 0:
+            return PENALTY * violations, violations
+        op = self.operator[v]
+        w = self.w
+        cost = self.member_sum[v]
+        if op < 0:
+            violations += 1
+        else:
+            cost += self.inst.operator_cost[op][v]
+        if self.max_weight[v] > 0:
+            over = self.weight_sum[v] - self.max_weight[v]
+            violations += math.ceil(max(over, 0) / 10)
+        if self.inst.n_nationalities > 1:
+            cost -= w[4] * (n - max(self.nationalities[v]))
+        if self.is_balloon[v]:
+            if self.inst.check_passenger_langs and op >= 0:
+                violations += self.language_misses[v]
+        elif self.participants[v] == 1:
+            cost += w[2]
+        return PENALTY * violations + cost, violations
+
+    def _group_cost(self, g: int) -> Tuple[float, int]:
+        """`group_terms` of g from the counters, as (cost, violations)."""
+        w, inst = self.w, self.inst
+        cost = w[3] * abs(self.ground[g] - inst.avg_ground) + w[5] * self.met[g]
+        if self.low_target[g] > 0:
+            cost += w[9] * max(self.low_target[g] - self.low_in_cars[g], 0)
+        violations = 0
+        b, car_idx = inst.groups[g]
+        bop = self.operator[b]
+        if inst.check_operator_langs and bop >= 0:
+            for c in car_idx:
+                cop = self.operator[c]
+                if cop >= 0 and self.lang_mask[bop] & self.lang_mask[cop] == 0:
+                    violations += 1
+        return PENALTY * violations + cost, violations
+
+    @property
+    def feasible(self) -> bool:
+        return self.violations == 0
+
+    # ---- moves ---------------------------------------------------------
+    def _propose(self) -> Optional[List[Tuple[str, int, int]]]:
+        """A list of (person, new vehicle) seat changes plus operator changes."""
+        inst, rng = self.inst, self.random
+        kind = rng.random()
+        if kind < 0.85 and not self.movable:
+            return None
+        if kind < 0.5:  # move a passenger
+            p = rng.choice(self.movable)
+            if self.operates[p] >= 0:
+                return None
+            v = rng.choice(self.options[p])
+            if v == self.seat[p]:
+                return None
+            return [("seat", p, v)]
+        if kind < 0.85:  # swap two passengers
+            p, q = rng.choice(self.movable), rng.choice(self.movable)
+            vp, vq = self.seat[p], self.seat[q]
+            if vp == vq or self.operates[p] >= 0 or self.operates[q] >= 0:
+                return None
+            if vq not in inst.allowed_seats[p] or vp not in inst.allowed_seats[q]:
+                return None
+            return [("seat", p, vq), ("seat", q, vp)]
+        # change the operator of a vehicle, or drop it so the vehicle can be
+        # emptied; a candidate operating elsewhere leaves that vehicle without
+        # operator for a later move to fix
+        v = rng.randrange(len(self.operator))
+        if self.frozen_operator[v] >= 0:
+            return None
+        candidates = inst.allowed_ops[v]
+        k = rng.randrange(len(candidates) + 1)
+        if k == len(candidates):
+            return None if self.operator[v] < 0 else [("operator", v, -1)]
+        q = candidates[k]
+        w = self.operates[q]
+        if q == self.operator[v] or (w >= 0 and self.frozen_operator[w] >= 0):
+            return None
+        if self.frozen_seat[q] >= 0:
+            return None
+        if self.seat[q] != v and v not in inst.allowed_seats[q]:
+            return None
+        steps = [("operator", v, q)]
+        if self.seat[q] != v:
+            steps.insert(0, ("seat", q, v))
+        if w >= 0:
+            steps.insert(0, ("operator", w, -1))
+        return steps
+
+    def _apply(self, steps) -> List[Tuple[str, int, int]]:
+        """Apply `steps` and update the counters; return the steps that undo them."""
+        undo = []
+        for kind, a, b in steps:
+            if kind == "seat":
+                old = self.seat[a]
+                self._seat_counts(a, old, -1)
+                self.seat[a] = b
+                self._seat_counts(a, b, 1)
+                if self.w[5] and self.group_of[old] != self.group_of[b]:
+                    self._regroup(a, self.group_of[old], self.group_of[b])
+                undo.append(("seat", a, old))
+            else:
+                undo.append(("operator", a, self.operator[a]))
+                self._set_operator(a, b)
+                if self.inst.check_passenger_langs and self.is_balloon[a] and b >= 0:
+                    mask = self.lang_mask[b]
+                    self.language_misses[a] = sum(
+                        1 for m in self.members[a] if self.lang_mask[m] & mask == 0
+                    )
+        return undo[::-1]
+
+    def _touched(self, steps, undo) -> Tuple[set, set]:
+        vehicles = set()
+        for (kind, a, b), (_, _, old) in zip(steps, undo[::-1]):
+            vehicles.update((b, old) if kind == "seat" else (a,))
+        groups = {self.group_of[v] for v in vehicles} - {-1}
+        return vehicles, groups
+
+    def step(self, temperature: float) -> None:
+        steps = self._propose()
+        if steps is None:
+            return
+        undo = self._apply(steps)
+        vehicles, groups = self._touched(steps, undo)
+        new_v = {v: self._vehicle_cost(v) for v in vehicles}
+        new_g = {g: self._group_cost(g) for g in groups}
+        delta = sum(c for c, _ in new_v.values()) - sum(
+            self.v_cost[v] for v in vehicles
+        )
+        delta += sum(c for c, _ in new_g.values()) - sum(self.g_cost[g] for g in groups)
+
+        if delta <= 0 or self.random.random() < math.exp(-delta / temperature):
+            for v, (c, viol) in new_v.items():
+                self.violations += viol - self.v_viol[v]
+                self.v_cost[v], self.v_viol[v] = c, viol
+            for g, (c, viol) in new_g.items():
+                self.violations += viol - self.g_viol[g]
+                self.g_cost[g], self.g_viol[g] = c, viol
+            self.total += delta
+        else:
+            self._apply(undo)
+
+    def snapshot(self) -> Tuple[List[int], List[int]]:
+        """Copy of the seats and operators, for `manifest`."""
+        return list(self.seat), list(self.operator)
+
+    def manifest(
+        self, state: Optional[Tuple[List[int], List[int]]] = None
+    ) -> Dict[str, VehicleAssignment]:
+        """Manifest of the current state, or of a `snapshot`."""
+        inst = self.inst
+        seat, operator = state or (self.seat, self.operator)
+        out: Dict[str, VehicleAssignment] = {
+            v: {"operatorId": None, "passengerIds": []} for v in inst.vehicle_ids
+        }
+        operators = set()
+        for v, vid in enumerate(inst.vehicle_ids):
+            if operator[v] >= 0:
+                out[vid]["operatorId"] = inst.person_ids[operator[v]]
+                operators.add(operator[v])
+        for p, v in enumerate(seat):
+            if p not in operators:
+                out[inst.vehicle_ids[v]]["passengerIds"].append(inst.person_ids[p])
+        return out
+
+    def breakdown(self) -> Dict[str, Any]:
+        return breakdown(self.inst, np.array(self.seat), np.array(self.operator))
+
+
+def breakdown(
+    inst: LegInstance, seat: np.ndarray, operator: np.ndarray
+) -> Dict[str, Any]:
+    """Objective breakdown of a state, shaped like `objective_breakdown`."""
+    raw = np.zeros(len(SECTIONS))
+    for v in range(len(inst.vehicle_ids)):
+        raw += inst.vehicle_terms(v, np.flatnonzero(seat == v), int(operator[v]))[1]
+    for g in range(len(inst.groups)):
+        raw += inst.group_terms(g, seat, operator)[1]
+    terms = {
+        s: {
+            "weight": SECTION_WEIGHTS[s],
+            "raw": float(raw[i]),
+            "value": float(inst.weights[i] * raw[i]),
+        }
+        for i, s in enumerate(SECTIONS)
+        if inst.weights[i] != 0
+    }
+
+    def count(s: str) -> int:
+        return int(round(raw[SECTIONS.index(s)]))
+
+    return {
+        "value": float(inst.weights @ raw),
+        "bound": None,
+        "terms": terms,
+        "stats": {
+            "soloParticipantCars": count("3.3"),
+            "repeatedMeetings": count("3.5b"),
+            "lookaheadShortfall": count("3.7"),
+        },
+    }
+
+
+def solve_flight_leg_local(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    time_limit_s: float,
+    num_search_workers: int = 1,
+    random_seed: Optional[int] = None,
+    control: Optional[SolveControl] = None,
+    **model_kwargs: Any,
+) -> Manifest:
+    """
+    Solve a leg by simulated annealing. Arguments are those of
+    `solve_flight_leg` (`num_search_workers` is ignored: the search is
+    single-threaded). Returns the best feasible manifest found within
+    `time_limit_s`, or until cancelled.
+    """
+    control = control or SolveControl()
+    if time_limit_s <= 0:
+        raise ValueError("Time limit must be positive")
+    control.check()
+
+    started = time.perf_counter()
+    with control.tracer.span("build"):
+        inst = LegInstance(balloons, cars, people, vehicle_groups, **model_kwargs)
+        search = LocalSearch(inst, random_seed)
+    build_seconds = time.perf_counter() - started
+
+    if control.deterministic:
+        # a fixed number of moves; the wall clock only enforces the deadline
+        moves = max(int(time_limit_s * MOVES_PER_DETERMINISTIC_SECOND), CHECK_EVERY)
+        budget = control.time_limit(math.inf)
+    else:
+        moves = None
+        budget = control.time_limit(time_limit_s) - build_seconds
+    deadline = time.perf_counter() + max(budget, 0)
+
+    # start hot enough to accept typical objective moves, cool geometrically
+    scale = float(np.abs(inst.weights).max()) or 1.0
+    t_start, t_end = 2.0 * scale, 0.01 * scale
+    temperature = t_start
+
+    best_cost = search.total if search.feasible else math.inf
+    best = search.snapshot() if search.feasible else None
+    iterations = 0
+    with control.tracer.span("search", engine="local"):
+        while True:
+            search.step(temperature)
+            iterations += 1
+            if search.feasible and search.total < best_cost - 1e-9:
+                best_cost = search.total
+                best = search.snapshot()
+            if iterations % CHECK_EVERY == 0:
+                now = time.perf_counter()
+                if now >= deadline or control.cancelled:
+                    break
+                if moves is not None:
+                    if iterations >= moves:
+                        break
+                    progress = iterations / moves
+                else:
+                    progress = 1 - (deadline - now) / max(budget, 1e-9)
+                temperature = t_start * (t_end / t_start) ** progress
+
+    control.spend_deterministic(iterations / MOVES_PER_DETERMINISTIC_SECOND)
+    if best is None:
+        if control.cancelled:
+            raise SolveCancelled("Solve was cancelled before a solution was found")
+        raise RuntimeError("No feasible assignment found by local search")
+    best = search.manifest(best)
+    # the cost model mirrors the hard rules; the verifier checks them anyway
+    errors = verify_leg(best, balloons, cars, people, vehicle_groups, **model_kwargs)
+    if errors:
+        raise RuntimeError(f"Local search found no valid plan: {errors[0]}")
+
+    return {
+        "assignments": best,
+        "status": "cancelled" if control.cancelled else "feasible",
+        "objective": breakdown(inst, *_indices(inst, best)),
+        "engine": "local",
+        "timings": {"build": build_seconds, "search": time.perf_counter() - started},
+        "iterations": iterations,
+    }
+
+
+def _indices(
+    inst: LegInstance, manifest: Dict[str, VehicleAssignment]
+) -> Tuple[np.ndarray, np.ndarray]:
+    pidx = {p: i for i, p in enumerate(inst.person_ids)}
+    seat = np.full(len(inst.person_ids), -1)
+    operator = np.full(len(inst.vehicle_ids), -1)
+    for v, vid in enumerate(inst.vehicle_ids):
+        a = manifest.get(vid) or {}
+        if a.get("operatorId") is not None:
+            operator[v] = pidx[a["operatorId"]]
+            seat[operator[v]] = v
+        for q in a.get("passengerIds", []):
+            seat[pidx[q]] = v
+    return seat, operator
+
+
+def evaluate_manifest(
+    manifest: Dict[str, VehicleAssignment],
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    **model_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Score any manifest with the local-search cost model: objective breakdown
+    plus the number of hard-rule violations. Used to compare engines.
+    """
+    inst = LegInstance(balloons, cars, people, vehicle_groups, **model_kwargs)
+    seat, operator = _indices(inst, manifest)
+    violations = int(np.count_nonzero(seat < 0))
+    for v in range(len(inst.vehicle_ids)):
+        members = np.flatnonzero(seat == v)
+        violations += inst.vehicle_terms(v, members, int(operator[v]))[0]
+    for g in range(len(inst.groups)):
+        violations += inst.group_terms(g, seat, operator)[0]
+    return {**breakdown(inst, seat, operator), "violations": violations}
@@ -2,19 +2,64 @@
 """
 CLI / stream wrapper for the balloon camp solver.
 
-Input  : one JSON object on stdin (see README).
+Input  : one JSON object on stdin (see README). When it is sent as a single
+         line, stdin may stay open afterwards for control messages;
+         `{"type": "cancel"}` stops the search and returns the best
+         solution found so far (same as SIGTERM / SIGINT).
 Success: manifest JSON on stdout · exit-code 0
+         (`plan_season` streams one JSON line per solved leg before it,
+         `solve_leg --report-incumbents` one per incumbent and bound)
 Failure: error JSON on stderr · exit-code 1 or 2
 """
+
 from __future__ import annotations
 
 from argparse import ArgumentParser, Namespace
+from functools import lru_cache
 import json
+import signal
 import sys
-from typing import List, Any, Dict
+import threading
+import time
+from typing import TYPE_CHECKING, List, Any, Dict, Callable, Optional, Tuple
+
+# Solver modules load OR-Tools, which takes longer than most validations:
+# they are imported in the handlers that need them.
+from solver_capture import Recorder
+from solver_checkpoint import RESUME_MIN_S, Checkpoint, payload_key
+from solver_checks import (
+    group_compatibility,
+    input_facts,
+    leg_option_problems,
+    leg_seat_problems,
+    reserve_group_car_seats,
+    vehicle_group_problems,
+)
+from solver_control import SolveControl
+from solver_estimate import (
+    auto_engine,
+    estimate_leg_model,
+    expected_seconds,
+    load_fit,
+    suggest_time_limit,
+)
+from solver_history import CampHistory
+from solver_history_store import HistoryStore
+from solver_race import RACE_GAP, race_leg, race_seeds
+from solver_speculate import next_leg_payload
+from solver_trace import Tracer
+from solver_verify import (
+    REUSE_SCORE_TIME_LIMIT_S,
+    REUSE_SEARCH_TIME_LIMIT_S,
+    REUSE_TOLERANCE,
+    unused_car_seats,
+    verify_leg,
+    verify_vehicle_groups,
+    within_tolerance,
+)
 
-from solver_flight_leg import solve_flight_leg
-from solver_vehicle_group import solve_vehicle_groups
+if TYPE_CHECKING:
+    from solver_model_cache import ModelCache
 
 
 def _emit_error(msg: str, *, exit_code: int = 1) -> None:
@@ -26,8 +71,17 @@ def _emit_error(msg: str, *, exit_code: int = 1) -> None:
 
 
 def _read_json_stdin() -> Dict[str, Any]:
+    """
+    Read the payload. A single-line payload is returned right away so the rest
+    of stdin stays available for control messages; anything else (e.g. a
+    pretty-printed file) is read up to EOF.
+    """
     try:
-        raw = sys.stdin.read()
+        raw = sys.stdin.readline()
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            raw += sys.stdin.read()
         if not raw.strip():
             _emit_error("Empty stdin; expected a JSON object.", exit_code=2)
         return json.loads(raw)
@@ -36,6 +90,52 @@ def _read_json_stdin() -> Dict[str, Any]:
         raise  # unreachable
 
 
+def _listen_for_control(control: SolveControl) -> None:
+    """Watch the remaining stdin lines for `{"type": "cancel"}` messages."""
+
+    def listen() -> None:
+        for line in sys.stdin:
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(message, dict) and message.get("type") == "cancel":
+                control.cancel()
+
+    threading.Thread(target=listen, daemon=True).start()
+
+
+def _install_signal_handlers(control: SolveControl) -> None:
+    for name in ("SIGTERM", "SIGINT"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), lambda *_: control.cancel())
+
+
+def _run_interruptible(fn: Callable[[], Any]) -> Any:
+    """
+    Run `fn` in a worker thread. Python only runs signal handlers on the main
+    thread between bytecodes, which never happens while it sits inside
+    `CpSolver.Solve`; keeping the main thread in a short join loop lets SIGTERM
+    reach the handler while the search is running.
+    """
+    result: Dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            result["out"] = fn()
+        except BaseException as e:  # re-raised on the main thread
+            result["error"] = e
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    while worker.is_alive():
+        worker.join(0.1)
+
+    if "error" in result:
+        raise result["error"]
+    return result.get("out")
+
+
 def _parse_args(argv: Any = None) -> Namespace | Any:
     parser = ArgumentParser(description="Solve balloon-camp crew assignment")
 
@@ -43,7 +143,17 @@ def _parse_args(argv: Any = None) -> Namespace | Any:
     parser.add_argument(
         "--mode",
         type=str,
-        choices=["solve_groups", "solve_leg"],
+        choices=[
+            "solve_groups",
+            "solve_leg",
+            "plan_season",
+            "sweep_leg",
+            "ingest_leg",
+            "repair_leg",
+            "validate",
+            "estimate",
+            "speculate_leg",
+        ],
         default=None,
         help="Operation mode for the solver",
     )
@@ -67,38 +177,159 @@ def _parse_args(argv: Any = None) -> Namespace | Any:
         default=20,
         help="Maximum solver runtime in seconds for the main solver (default: 20).",
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Hard wall-clock deadline in seconds from process start, covering "
+        "parsing, model build and search. The best solution so far is returned "
+        "before it passes.",
+    )
+
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=["flat", "hierarchical", "local", "staged", "auto"],
+        default=None,
+        help="Leg engine; overrides `options.engine` (default: flat).",
+    )
+    parser.add_argument(
+        "--history-db",
+        type=str,
+        default=None,
+        help="SQLite history store. Payloads with a `history` reference read "
+        "the camp history from it instead of carrying it.",
+    )
+    parser.add_argument(
+        "--model-cache",
+        type=str,
+        default=None,
+        help="SQLite cache of built leg models (variables and hard "
+        "constraints), reused when the problem structure repeats.",
+    )
+
+    parser.add_argument(
+        "--trace-file",
+        type=str,
+        default=None,
+        help="Write phase spans and the CP-SAT search log to this file "
+        "(Chrome trace-event JSON).",
+    )
+    parser.add_argument(
+        "--profile-build",
+        action="store_true",
+        help="With --trace-file, also cProfile model building into "
+        "<trace-file>.prof.",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=None,
+        help="Save the best leg manifest so far (flat engine) to a checkpoint "
+        "file in this directory, keyed by the payload hash.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="With --checkpoint-dir, continue from a matching checkpoint of an "
+        "interrupted or speculative solve: its manifest is the hint and only "
+        "the rest of the time limit is searched.",
+    )
+    parser.add_argument(
+        "--race",
+        type=int,
+        default=None,
+        help="Race this many solve_leg processes with consecutive seeds, each "
+        "with a share of --workers, and return the best plan (flat engine).",
+    )
+    parser.add_argument(
+        "--tiebreak-seed",
+        type=int,
+        default=None,
+        help="Seed of the leg model's tiebreak priorities (default: --seed).",
+    )
+    parser.add_argument(
+        "--report-incumbents",
+        action="store_true",
+        help="Stream a JSON line to stdout for every improving solution and "
+        "objective bound of a solve_leg search (flat engine), before the result.",
+    )
+    parser.add_argument(
+        "--capture-dir",
+        type=str,
+        default=None,
+        help="Record the anonymized payload, CLI params, searched models and "
+        "stats of this run into a new directory below this one, for "
+        "solver_replay.py.",
+    )
+    parser.add_argument(
+        "--capture-min-seconds",
+        type=float,
+        default=0.0,
+        help="With --capture-dir, only record runs that take at least this "
+        "many seconds (default: 0, record every run).",
+    )
 
     return parser.parse_args(argv)
 
 
-def _handle_build_groups(payload: Dict[str, Any]) -> Dict[str, Any]:
-    return solve_vehicle_groups(
-        balloons=payload.get("balloons", []),
-        cars=payload.get("cars", []),
-        people=payload.get("people", []),
-        frozen=payload.get("vehicleGroups", {}),
+def _handle_build_groups(
+    payload: Dict[str, Any], control: SolveControl
+) -> Dict[str, Any]:
+    balloons = payload.get("balloons", [])
+    cars = payload.get("cars", [])
+    people = payload.get("people", [])
+    frozen = payload.get("vehicleGroups", {})
+    previous = payload.get("previous")
+    tolerance = payload.get("options", {}).get("reuseTolerance", REUSE_TOLERANCE)
+    rejected = None
+    if previous is not None:
+        # a previous grouping is no answer to a fleet the solver would refuse
+        compat_cb = group_compatibility(balloons, cars, people)
+        problems = vehicle_group_problems(balloons, cars, people, frozen, compat_cb)
+        if problems:
+            raise ValueError(problems[0])
+        groups = previous["vehicleGroups"]
+        rejected = verify_vehicle_groups(groups, balloons, cars, people, frozen=frozen)
+        if not rejected:
+            unused = unused_car_seats(groups, cars)
+            reference = previous.get("unusedSeats")
+            if within_tolerance(unused, reference, tolerance):
+                return {
+                    "vehicleGroups": groups,
+                    "unusedSeats": unused,
+                    "engine": "reused",
+                    "reused": True,
+                }
+            if reference is None:
+                rejected = ["No recorded unused seats to compare with"]
+            else:
+                rejected = [f"{unused} unused seats, previously {reference}"]
+
+    from solver_vehicle_group import solve_vehicle_groups
+
+    result = solve_vehicle_groups(
+        balloons=balloons, cars=cars, people=people, frozen=frozen, control=control
     )
+    result["unusedSeats"] = unused_car_seats(result["vehicleGroups"], cars)
+    if rejected:
+        result["reuseRejected"] = rejected
+    return result
 
 
-def _handle_solve_leg(payload: Dict[str, Any], args: Namespace | Any = None):
+def leg_options(payload: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    """Map payload `options` and CLI args to `solve_flight_leg` kwargs."""
     options = payload.get("options", {})
     weights = options.get("weights", {})
     constraints = options.get("constraints", {})
 
-    return solve_flight_leg(
-        balloons=payload.get("balloons", []),
-        cars=payload.get("cars", []),
-        people=payload.get("people", []),
-        vehicle_groups=payload.get("vehicleGroups"),
-        group_history=payload.get("groupHistory"),
-        balloon_history=payload.get("balloonHistory"),
-        people_meet_history=payload.get("peopleMeetHistory"),
-        frozen=payload.get("preAssignments"),
-        fixed_groups=payload.get("fixedGroups"),
+    return dict(
         # problem params
         counselor_flight_discount=options.get("counselorFlightDiscount", 0.9),
         planning_horizon_legs=options.get("planningHorizonDepth", 0),
         default_person_weight=options.get("defaultPersonWeight", 80),
+        aggregate_classes=options.get("aggregateClasses", False),
+        model_cache=_model_cache(args.get("model_cache")),
         # solver constraints
         c_common_language_operators=constraints.get("commonLanguageOperators", True),
         c_common_language_passengers=constraints.get("commonLanguagePassengers", True),
@@ -114,30 +345,570 @@ def _handle_solve_leg(payload: Dict[str, Any], args: Namespace | Any = None):
         w_divers_nationalities=weights.get("diverseNationalities", 3),
         w_low_flights_lookahead=weights.get("lowFlightsLookahead", 30),
         # Configuration
-        time_limit_s=options.get("timeLimit", 600),
+        # deterministic seconds in reproducible mode (`options.deterministicTime`)
+        time_limit_s=options.get("deterministicTime", options.get("timeLimit", 600)),
         num_search_workers=args.get("workers", 15),
         random_seed=args.get("seed", None),
+        tiebreak_seed=args.get("tiebreak_seed", None),
+    )
+
+
+@lru_cache(maxsize=None)
+def _model_cache(path: Optional[str]) -> Optional[ModelCache]:
+    """One open cache per path for the whole process."""
+    if not path:
+        return None
+    from solver_model_cache import ModelCache
+
+    return ModelCache(path)
+
+
+def _camp_history(payload: Dict[str, Any], args: Dict[str, Any]) -> CampHistory:
+    """
+    History of the payload: read from the store when the payload carries a
+    `history` reference ({campId, version, dayId}), otherwise taken from the
+    payload fields as sent by the app.
+    """
+    ref = payload.get("history")
+    if ref is None:
+        return CampHistory(
+            flights_so_far={
+                p["id"]: int(p.get("flightsSoFar", 0))
+                for p in payload.get("people", [])
+            },
+            group_history=payload.get("groupHistory"),
+            balloon_history=payload.get("balloonHistory"),
+            people_meet_history=payload.get("peopleMeetHistory"),
+        )
+
+    if not args.get("history_db"):
+        raise ValueError(
+            "Payload refers to a stored history but --history-db is not set"
+        )
+    store = HistoryStore(args["history_db"])
+    try:
+        return store.load(
+            ref["campId"], current_day=ref.get("dayId"), version=ref.get("version")
+        )
+    finally:
+        store.close()
+
+
+def _history_kwargs(payload: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    """`people` and history kwargs shared by the leg handlers."""
+    history = _camp_history(payload, args)
+    return dict(
+        people=[
+            {**p, "flightsSoFar": history.flights_so_far[p["id"]]}
+            for p in payload.get("people", [])
+        ],
+        group_history=history.group_history,
+        balloon_history=history.balloon_history,
+        people_meet_history=history.people_meet_history,
     )
 
 
+def _leg_estimate(
+    payload: Dict[str, Any], history: Dict[str, Any], options: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Model-size estimate of the payload's flat leg model, its expected time to
+    a good solution (None without a fit) and the time limit and engine that
+    `timeLimit: "auto"` and `engine: "auto"` pick from it.
+    """
+    groups = payload.get("vehicleGroups") or {}
+    estimate = estimate_leg_model(
+        balloons=payload.get("balloons", []),
+        cars=payload.get("cars", []),
+        vehicle_groups=groups,
+        **history,
+        frozen=payload.get("preAssignments"),
+        fixed_groups=payload.get("fixedGroups"),
+        **options,
+    )
+    fit = load_fit()
+    expected = expected_seconds(estimate, fit) if fit is not None else None
+    return {
+        **estimate,
+        "expectedSeconds": expected,
+        "preset": {
+            "timeLimit": suggest_time_limit(expected, fit),
+            "engine": auto_engine(
+                len(history["people"]), groups, payload.get("fixedGroups"), expected
+            ),
+        },
+    }
+
+
+def _auto_time_limit(
+    payload: Dict[str, Any], history: Dict[str, Any], options: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Replace `timeLimit: "auto"` by the suggested limit; the estimate behind
+    it, or None if the time limit was given.
+    """
+    if options["time_limit_s"] != "auto":
+        return None
+    estimate = _leg_estimate(payload, history, options)
+    options["time_limit_s"] = estimate["preset"]["timeLimit"]
+    return estimate
+
+
+def _reuse_previous_leg(
+    payload: Dict[str, Any],
+    history: Dict[str, Any],
+    options: Dict[str, Any],
+    control: SolveControl,
+) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    The payload's `previous` plan if it is still valid and, scored with the
+    current data and weights, at most `options.reuseTolerance` worse than a
+    short search of the current model started from it; otherwise None and the
+    reasons it was rejected. (`previous.objective` was scored under the
+    weights of its own solve, so it cannot tell whether the plan still fits
+    changed weights.)
+    """
+    previous = payload.get("previous")
+    tolerance = payload.get("options", {}).get("reuseTolerance", REUSE_TOLERANCE)
+    if previous is None:
+        return None, []
+
+    from solver_flight_leg import score_flight_leg, solve_flight_leg
+
+    leg = dict(
+        balloons=payload.get("balloons", []),
+        cars=payload.get("cars", []),
+        people=history["people"],
+        vehicle_groups=payload.get("vehicleGroups"),
+    )
+    rejected = verify_leg(
+        previous["assignments"],
+        **leg,
+        frozen=payload.get("preAssignments"),
+        fixed_groups=payload.get("fixedGroups"),
+        **options,
+    )
+    if rejected:
+        return None, rejected
+
+    histories = {k: v for k, v in history.items() if k != "people"}
+    try:
+        objective = score_flight_leg(
+            previous["assignments"],
+            **leg,
+            **histories,
+            fixed_groups=payload.get("fixedGroups"),
+            control=control,
+            **{
+                **options,
+                "time_limit_s": min(options["time_limit_s"], REUSE_SCORE_TIME_LIMIT_S),
+            },
+        )
+        search = solve_flight_leg(
+            **leg,
+            **histories,
+            frozen=payload.get("preAssignments"),
+            fixed_groups=payload.get("fixedGroups"),
+            control=control,
+            **{
+                **options,
+                "time_limit_s": min(options["time_limit_s"], REUSE_SEARCH_TIME_LIMIT_S),
+                "hint": previous["assignments"],
+            },
+        )
+    except RuntimeError as e:
+        return None, [f"The previous plan could not be scored: {e}"]
+    reference = search["objective"]["value"]
+    if not within_tolerance(objective["value"], reference, tolerance):
+        return None, [
+            f"Objective {objective['value']:.1f} is more than {tolerance:.0%} "
+            f"worse than {reference:.1f}, found by a short search"
+        ]
+    return {
+        "assignments": previous["assignments"],
+        "status": "feasible",
+        "objective": objective,
+        "engine": "reused",
+        "reused": True,
+    }, []
+
+
+def _handle_solve_leg(
+    payload: Dict[str, Any], args: Namespace | Any, control: SolveControl
+):
+    from solver_flight_leg import solve_flight_leg
+    from solver_hierarchical import choose_engine, solve_flight_leg_hierarchical
+    from solver_local_search import solve_flight_leg_local
+    from solver_staged import STAGE_ONE_SHARE, solve_flight_leg_staged
+
+    history = _history_kwargs(payload, args)
+    options = leg_options(payload, args)
+    requested = args.get("engine") or payload.get("options", {}).get("engine", "flat")
+    estimate = _auto_time_limit(payload, history, options)
+    if estimate is None and requested == "auto":
+        estimate = _leg_estimate(payload, history, options)
+    engine = choose_engine(
+        requested,
+        history["people"],
+        payload.get("vehicleGroups") or {},
+        payload.get("fixedGroups"),
+        expected_seconds=estimate and estimate["expectedSeconds"],
+    )
+    solve = {
+        "flat": solve_flight_leg,
+        "hierarchical": solve_flight_leg_hierarchical,
+        "local": solve_flight_leg_local,
+        "staged": solve_flight_leg_staged,
+    }[engine]
+
+    previous = payload.get("previous")
+    reused, rejected = _reuse_previous_leg(payload, history, options, control)
+    if reused is not None:
+        return reused
+    if previous is not None and engine == "flat":
+        options["hint"] = previous["assignments"]
+
+    if args.get("resume") and not args.get("checkpoint_dir"):
+        raise ValueError("--resume needs --checkpoint-dir")
+    checkpoint = resumed = None
+    if args.get("checkpoint_dir") and engine == "flat":
+        checkpoint = Checkpoint(
+            args["checkpoint_dir"],
+            payload_key("solve_leg", payload),
+            speculative=bool(args.get("speculative")),
+        )
+        resumed = checkpoint.resume() if args.get("resume") else None
+        if resumed is not None:
+            options["hint"] = resumed["assignments"]
+            # deterministic budgets are not wall seconds: keep them whole
+            if not control.deterministic:
+                remaining = options["time_limit_s"] - checkpoint.spent_before
+                if resumed["status"] == "optimal":
+                    remaining = 0  # proven already: only re-check the hint
+                options["time_limit_s"] = max(remaining, RESUME_MIN_S)
+        options["checkpoint"] = checkpoint
+    if args.get("report_incumbents") and engine == "flat":
+        options["on_progress"] = _progress_writer()
+
+    if engine == "staged":
+        staged = payload.get("options", {})
+        options.update(
+            stage_one_share=staged.get("stageOneShare", STAGE_ONE_SHARE),
+            fix_balloons=staged.get("stageFixBalloons", False),
+        )
+
+    started = time.perf_counter()
+    result = solve(
+        balloons=payload.get("balloons", []),
+        cars=payload.get("cars", []),
+        vehicle_groups=payload.get("vehicleGroups"),
+        **history,
+        frozen=payload.get("preAssignments"),
+        fixed_groups=payload.get("fixedGroups"),
+        control=control,
+        **options,
+    )
+    if engine == "flat":
+        result = {
+            **result,
+            "engine": "flat",
+            "timings": {"flat": time.perf_counter() - started},
+        }
+    if rejected:
+        result["reuseRejected"] = rejected
+    if estimate is not None:
+        result["estimate"] = {
+            "expectedSeconds": estimate["expectedSeconds"],
+            "timeLimit": options["time_limit_s"],
+        }
+    if checkpoint is not None:
+        result["checkpoint"] = {
+            "path": checkpoint.path,
+            "resumed": resumed is not None,
+            # search seconds of the earlier runs
+            "priorSeconds": checkpoint.spent_before,
+        }
+    cache = _model_cache(args.get("model_cache"))
+    if cache is not None:
+        result["modelCache"] = {**result.get("modelCache", {}), **cache.stats()}
+    return result
+
+
+def _handle_race_leg(
+    payload: Dict[str, Any], args: Namespace | Any, control: SolveControl
+):
+    """
+    `solve_leg` raced over `--race` seeds in separate processes (see
+    `solver_race`).
+    """
+    engine = args.get("engine") or payload.get("options", {}).get("engine", "flat")
+    if engine != "flat":
+        raise ValueError("--race needs the flat engine")
+    if control.deterministic:
+        raise ValueError("A race is decided on the wall clock; drop deterministicTime")
+    if args.get("checkpoint_dir"):
+        raise ValueError("--race keeps no checkpoints")
+    if args.get("model_cache"):
+        # a cached model keeps the variable order of one seed
+        raise ValueError("--race builds a model per seed; drop --model-cache")
+    child_args = ("--history-db", args["history_db"]) if args.get("history_db") else ()
+    return race_leg(
+        payload,
+        seeds=race_seeds(args.get("seed", 42), args["race"]),
+        workers=args.get("workers", 15),
+        control=control,
+        args=child_args,
+        gap=payload.get("options", {}).get("raceGap", RACE_GAP),
+    )
+
+
+def _handle_speculate_leg(
+    payload: Dict[str, Any], args: Namespace | Any, control: SolveControl
+):
+    """
+    Solve the likely next leg of `{"payload": <solve_leg payload>,
+    "assignments": <its manifest>}` into a checkpoint (see `solver_speculate`).
+    """
+    if not args.get("checkpoint_dir"):
+        raise ValueError("speculate_leg needs --checkpoint-dir")
+    predicted = next_leg_payload(payload["payload"], payload["assignments"])
+    engine = args.get("engine") or predicted.get("options", {}).get("engine", "flat")
+    if engine in ("local", "staged"):
+        raise ValueError(f"The {engine} engine keeps no checkpoints to speculate into")
+    return _handle_solve_leg(
+        predicted, {**args, "resume": True, "speculative": True}, control
+    )
+
+
+def _handle_repair_leg(
+    payload: Dict[str, Any], args: Namespace | Any, control: SolveControl
+):
+    from solver_repair import REPAIR_TIME_LIMIT_S, repair_flight_leg
+
+    options = leg_options(payload, args)
+    repair = payload.get("options", {})
+    options["time_limit_s"] = repair.get(
+        "deterministicTime", repair.get("timeLimit", REPAIR_TIME_LIMIT_S)
+    )
+    if options["time_limit_s"] == "auto":
+        raise ValueError('timeLimit "auto" needs a leg payload (solve_leg, sweep_leg)')
+    return repair_flight_leg(
+        balloons=payload.get("balloons", []),
+        cars=payload.get("cars", []),
+        vehicle_groups=payload.get("vehicleGroups"),
+        **_history_kwargs(payload, args),
+        manifest=payload.get("assignments", {}),
+        changes=payload.get("changes", {}),
+        fixed_groups=payload.get("fixedGroups"),
+        control=control,
+        **options,
+    )
+
+
+def _handle_sweep_leg(
+    payload: Dict[str, Any], args: Namespace | Any, control: SolveControl
+):
+    from solver_flight_leg import WEIGHT_KWARGS
+    from solver_sweep import sweep_flight_leg
+
+    # every weight set is applied on top of `options.weights` (and defaults)
+    options = payload.get("options", {})
+    weight_sets = []
+    for overrides in payload.get("weightSets", []):
+        variant = {
+            **payload,
+            "options": {
+                **options,
+                "weights": {**options.get("weights", {}), **overrides},
+            },
+        }
+        kwargs = leg_options(variant, args)
+        weight_sets.append(
+            {name: kwargs[kwarg] for name, kwarg in WEIGHT_KWARGS.items()}
+        )
+
+    history = _history_kwargs(payload, args)
+    leg = leg_options(payload, args)
+    _auto_time_limit(payload, history, leg)
+    return sweep_flight_leg(
+        balloons=payload.get("balloons", []),
+        cars=payload.get("cars", []),
+        vehicle_groups=payload.get("vehicleGroups"),
+        **history,
+        frozen=payload.get("preAssignments"),
+        fixed_groups=payload.get("fixedGroups"),
+        weight_sets=weight_sets,
+        control=control,
+        **leg,
+    )
+
+
+def _handle_plan_season(
+    payload: Dict[str, Any], args: Namespace | Any, control: SolveControl
+):
+    from solver_season import plan_season
+
+    options = leg_options(payload, args)
+    if options["time_limit_s"] == "auto":
+        raise ValueError('timeLimit "auto" needs a leg payload (solve_leg, sweep_leg)')
+    return plan_season(
+        balloons=payload.get("balloons", []),
+        cars=payload.get("cars", []),
+        people=payload.get("people", []),
+        days=payload.get("days", []),
+        leg_options=options,
+        history=_camp_history(payload, args),
+        # stream every finished leg as its own JSON line
+        on_leg=_write_json,
+        control=control,
+    )
+
+
+def _handle_ingest_leg(payload: Dict[str, Any], args: Dict[str, Any]):
+    if not args.get("history_db"):
+        raise ValueError("ingest_leg needs --history-db")
+    balloon_ids = payload.get("balloonIds")
+    if balloon_ids is None:
+        balloon_ids = [b["id"] for b in payload.get("balloons", [])]
+
+    store = HistoryStore(args["history_db"])
+    try:
+        version = store.ingest_leg(
+            payload["campId"],
+            payload["dayId"],
+            payload["legId"],
+            payload.get("assignments", {}),
+            payload.get("vehicleGroups", {}),
+            balloon_ids,
+            first_leg=payload.get("firstLeg", False),
+        )
+    finally:
+        store.close()
+    return {"campId": payload["campId"], "version": version}
+
+
+def _handle_validate(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Problems the solver would report up front for this payload, checked
+    without loading OR-Tools: the pre-errors of `solve_vehicle_groups` for
+    `"target": "solve_groups"`, sections 0 and 0.c of the leg model for
+    `"target": "solve_leg"` (the default).
+    """
+    balloons = payload.get("balloons", [])
+    cars = payload.get("cars", [])
+    people = payload.get("people", [])
+    groups = payload.get("vehicleGroups") or {}
+    target = payload.get("target", "solve_leg")
+    if target not in ("solve_groups", "solve_leg"):
+        raise ValueError(f"Cannot validate for {target}")
+
+    if target == "solve_groups":
+        compat_cb = group_compatibility(balloons, cars, people)
+        errors = vehicle_group_problems(balloons, cars, people, groups, compat_cb)
+    else:
+        errors = leg_option_problems(**leg_options(payload, {}))
+        reserved = [dict(c) for c in cars]
+        try:
+            reserve_group_car_seats(balloons, reserved, groups)
+        except (RuntimeError, ValueError) as e:
+            errors.append(str(e))
+        else:
+            errors += leg_seat_problems(
+                balloons, reserved, people, payload.get("preAssignments")
+            )
+
+    return {
+        "valid": not errors,
+        "errors": errors,
+        "facts": input_facts(balloons, cars, people, groups),
+    }
+
+
+def _handle_estimate(payload: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `_leg_estimate` of a `solve_leg` payload, without loading OR-Tools or
+    building the model.
+    """
+    return _leg_estimate(
+        payload, _history_kwargs(payload, args), leg_options(payload, {})
+    )
+
+
+def _write_json(obj: Dict[str, Any]) -> None:
+    json.dump(obj, sys.stdout)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def _progress_writer() -> Callable[[Dict[str, Any]], None]:
+    """`_write_json` for search progress, which CP-SAT reports from its threads."""
+    lock = threading.Lock()
+
+    def write(progress: Dict[str, Any]) -> None:
+        with lock:
+            _write_json(progress)
+
+    return write
+
+
 def main(argv: List[str] | None = None) -> None:
     args = _parse_args(argv)
-    payload = _read_json_stdin()
+    tracer = Tracer(args.trace_file, profile_build=args.profile_build)
+    recorder = Recorder(args.capture_dir, min_seconds=args.capture_min_seconds)
+    control = SolveControl(deadline_s=args.deadline, tracer=tracer, recorder=recorder)
+    _install_signal_handlers(control)
+    with tracer.span("read", mode=args.mode):
+        payload = _read_json_stdin()
+    # reproducible mode: search budgets in deterministic seconds
+    budget = payload.get("options", {}).get("deterministicTime")
+    control.deterministic = budget is not None
+    _listen_for_control(control)
 
-    out = None
-    try:
+    def run() -> Any:
         if args.mode == "solve_groups":
-            out = _handle_build_groups(payload)
+            return _handle_build_groups(payload, control)
+        elif args.mode == "solve_leg" and args.race:
+            return _handle_race_leg(payload, vars(args), control)
         elif args.mode == "solve_leg":
-            out = _handle_solve_leg(payload, vars(args))
+            return _handle_solve_leg(payload, vars(args), control)
+        elif args.mode == "plan_season":
+            return _handle_plan_season(payload, vars(args), control)
+        elif args.mode == "sweep_leg":
+            return _handle_sweep_leg(payload, vars(args), control)
+        elif args.mode == "repair_leg":
+            return _handle_repair_leg(payload, vars(args), control)
+        elif args.mode == "speculate_leg":
+            return _handle_speculate_leg(payload, vars(args), control)
+        elif args.mode == "ingest_leg":
+            return _handle_ingest_leg(payload, vars(args))
+        elif args.mode == "validate":
+            return _handle_validate(payload)
+        elif args.mode == "estimate":
+            return _handle_estimate(payload, vars(args))
+        return None
+
+    out = None
+    error = None
+    try:
+        with tracer.span("run", mode=args.mode):
+            out = _run_interruptible(run)
     except Exception as e:
-        _emit_error(str(e))
+        error = str(e)
+    tracer.write()
 
-    if out is None:
-        _emit_error("No output from solver")
+    if error is None and out is None:
+        error = "No output from solver"
 
-    json.dump(out, sys.stdout)
-    sys.stdout.write("\n")
+    if control.deterministic and isinstance(out, dict):
+        out["deterministicTime"] = {
+            "budget": budget,
+            "used": control.deterministic_seconds,
+        }
+
+    recorder.write(vars(args), payload, out, error)
+    if error is not None:
+        _emit_error(error)
+    _write_json(out)
     sys.exit(0)
 
 
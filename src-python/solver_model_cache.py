@@ -0,0 +1,141 @@
+"""
+On-disk cache of built leg models (`--model-cache`).
+
+Most re-solves of a leg only change weights, histories, frozen seats or the
+time limit, yet the variables and hard constraints (sections 1, 2.1–2.5 and
+2.7–2.9 of `solver_flight_leg`) are rebuilt in Python every time. The cache
+stores that structural part as a serialized `CpModelProto`, keyed by a hash
+of everything it depends on (people, vehicles, groups, languages, weight
+limits, the language rules and the seed, whose shuffles set the variable
+order). On a hit the proto is parsed back and only
+frozen seats, hints and the objective are added.
+
+Entries live in one SQLite file together with hit/miss counters, so the hit
+rate and the build time saved can be reported across runs (`stats`).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from ortools import __version__ as ortools_version
+from ortools.sat.python import cp_model
+
+# Bump when the structural part of the leg model changes.
+CACHE_FORMAT = 3
+
+# Least recently used entries beyond this count are dropped.
+MAX_ENTRIES = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    key           TEXT PRIMARY KEY,
+    proto         BLOB NOT NULL,
+    op            BLOB NOT NULL,
+    pax           BLOB NOT NULL,
+    build_seconds REAL NOT NULL,
+    used          REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def structure_key(structure: Dict[str, Any]) -> str:
+    """Hash of the inputs the structural model depends on (JSON-able)."""
+    payload = json.dumps(
+        [CACHE_FORMAT, ortools_version, structure], sort_keys=True, default=sorted
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ModelCache:
+    def __init__(self, path: str, *, max_entries: int = MAX_ENTRIES):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self.max_entries = max_entries
+        # the hierarchical engine builds group models in parallel threads
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _bump(self, name: str, value: float = 1) -> None:
+        self._db.execute(
+            "INSERT INTO stats VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    def load(self, key: str) -> Optional[Tuple[cp_model.CpModel, List[int], List[int]]]:
+        """The cached model and the proto indices of its op / pax variables."""
+        started = time.perf_counter()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT proto, op, pax, build_seconds FROM models WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self._bump("misses")
+                return None
+
+            model = cp_model.CpModel()
+            model.Proto().ParseFromString(row[0])
+            model.rebuild_var_and_constant_map()
+            op, pax = array("i"), array("i")
+            op.frombytes(row[1])
+            pax.frombytes(row[2])
+
+            self._db.execute(
+                "UPDATE models SET used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._bump("hits")
+            self._bump("savedSeconds", row[3] - (time.perf_counter() - started))
+        return model, list(op), list(pax)
+
+    def store(
+        self,
+        key: str,
+        model: cp_model.CpModel,
+        op: List[int],
+        pax: List[int],
+        build_seconds: float,
+    ) -> None:
+        """Store the structural `model` (before frozen seats and objective)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    model.Proto().SerializeToString(),
+                    array("i", op).tobytes(),
+                    array("i", pax).tobytes(),
+                    build_seconds,
+                    time.time(),
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM models WHERE key NOT IN "
+                "(SELECT key FROM models ORDER BY used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """Hits, misses, hit rate and build seconds saved so far."""
+        with self._lock:
+            values = dict(self._db.execute("SELECT name, value FROM stats"))
+            entries = self._db.execute("SELECT COUNT(*) FROM models").fetchone()[0]
+        hits, misses = int(values.get("hits", 0)), int(values.get("misses", 0))
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hitRate": hits / (hits + misses) if hits + misses else 0.0,
+            "savedSeconds": values.get("savedSeconds", 0.0),
+            "entries": entries,
+        }
@@ -0,0 +1,254 @@
+"""
+Multi-seed races of one leg (`solve_leg --race K`).
+
+The flat leg model shuffles balloons, cars and people with its seed, and
+CP-SAT's search depends a lot on that variable order: some seeds find a good
+plan much sooner than others. A race starts K `solve_leg` processes with the
+seeds `--seed`, `--seed + 1`, ..., each with its share of `--workers` and the
+same time limit and deadline. The tiebreak priorities stay those of `--seed`
+(`--tiebreak-seed`), so every seed solves the same objective and their
+objectives and bounds compare. Every process builds its own model: a race
+does not use the model cache, whose models keep the variable order of the
+seed that built them.
+
+The processes stream their incumbents and objective bounds
+(`--report-incumbents`). The race keeps the best incumbent and the best bound
+over all seeds; once they are within `options.raceGap` (relative, default
+`RACE_GAP`), every process is cancelled and returns its best plan, so no seed
+searches on for a plan that could only be marginally better. A cancel of the
+race is passed on the same way. The best plan is returned with the seed that
+found it.
+
+This module must not import OR-Tools (see `solver_checks`).
+"""
+
+import collections
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from solver_control import RESULT_RESERVE_S, SolveControl
+from solver_estimate import GOOD_GAP
+
+# Relative gap between the best incumbent and the best bound that ends a race.
+RACE_GAP = GOOD_GAP
+
+# Last stderr lines of a process kept for its error; the structured error is
+# the last one.
+STDERR_TAIL_LINES = 20
+
+CANCEL = json.dumps({"type": "cancel"}) + "\n"
+
+
+def race_seeds(seed: int, count: int) -> List[int]:
+    """The seeds of a race of `count` processes starting at `seed`."""
+    if count < 1:
+        raise ValueError("A race needs at least one seed")
+    return [seed + i for i in range(count)]
+
+
+def child_command() -> List[str]:
+    """Command line that starts another solver process."""
+    if getattr(sys, "frozen", False):  # bundled executable
+        return [sys.executable]
+    return [sys.executable, str(Path(__file__).with_name("solver_main.py"))]
+
+
+def relative_gap(objective: float, bound: float) -> float:
+    return max(objective - bound, 0.0) / max(abs(objective), 1.0)
+
+
+class _Runner:
+    """One seed of a race: its process and what it reported so far."""
+
+    def __init__(
+        self,
+        seed: int,
+        args: List[str],
+        payload: str,
+        events: "queue.Queue[Tuple[_Runner, Optional[Dict[str, Any]]]]",
+    ):
+        self.seed = seed
+        self.objective: Optional[float] = None
+        self.bound: Optional[float] = None
+        self.first_seconds: Optional[float] = None
+        self.best_seconds: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancelled = False
+        self.stderr: "collections.deque[str]" = collections.deque(
+            maxlen=STDERR_TAIL_LINES
+        )
+        self.proc = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        # a single line, so stdin stays open for the cancel
+        self.send(payload)
+        # drained on its own, so a chatty stderr cannot fill its pipe and
+        # block the process while stdout is read
+        self._drain = threading.Thread(target=self._read_stderr, daemon=True)
+        self._drain.start()
+        threading.Thread(target=self._read, args=(events,), daemon=True).start()
+
+    def _read_stderr(self) -> None:
+        for line in self.proc.stderr:
+            self.stderr.append(line)
+
+    def _read(self, events: "queue.Queue") -> None:
+        for line in self.proc.stdout:
+            try:
+                events.put((self, json.loads(line)))
+            except json.JSONDecodeError:
+                continue
+        self._drain.join()
+        if self.proc.wait() != 0:
+            self.error = _error_message(list(self.stderr))
+        events.put((self, None))
+
+    def send(self, line: str) -> None:
+        try:
+            self.proc.stdin.write(line)
+            self.proc.stdin.flush()
+        except OSError:
+            pass  # the process has exited already
+
+    def cancel(self) -> None:
+        if not self.cancelled:
+            self.cancelled = True
+            self.send(CANCEL)
+
+    def update(self, message: Dict[str, Any]) -> None:
+        kind = message.get("type")
+        if kind == "incumbent":
+            # incumbents only improve
+            self.objective = message["objective"]
+            self.best_seconds = message["seconds"]
+            if self.first_seconds is None:
+                self.first_seconds = message["seconds"]
+        if kind in ("incumbent", "bound"):
+            bound = message["bound"]
+            self.bound = bound if self.bound is None else max(self.bound, bound)
+        if kind is None:
+            self.result = message
+            self.objective = message["objective"]["value"]
+            if message["status"] == "optimal":
+                self.bound = self.objective
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "objective": self.objective,
+            "status": None if self.result is None else self.result["status"],
+            "firstSolutionSeconds": self.first_seconds,
+            "bestSeconds": self.best_seconds,
+            "error": self.error,
+        }
+
+
+def _error_message(stderr: List[str]) -> str:
+    """The message of a solver process's structured error (its last line)."""
+    lines = [line for line in stderr if line.strip()]
+    try:
+        return json.loads(lines[-1])["message"]
+    except (IndexError, json.JSONDecodeError, KeyError, TypeError):
+        return "".join(lines).strip() or "The solver process failed"
+
+
+def race_leg(
+    payload: Dict[str, Any],
+    *,
+    seeds: List[int],
+    workers: int,
+    control: SolveControl,
+    args: Tuple[str, ...] = (),
+    gap: float = RACE_GAP,
+) -> Dict[str, Any]:
+    """
+    Solve the `solve_leg` payload in one process per seed and return the best
+    result, with `race: {seed, gap, seeds}`. `args` are passed on to every
+    process; `workers` is split evenly between them.
+    """
+    if gap < 0:
+        raise ValueError("raceGap must not be negative")
+    command = [
+        *child_command(),
+        "--mode",
+        "solve_leg",
+        "--engine",
+        "flat",
+        "--report-incumbents",
+        "--workers",
+        str(max(1, workers // len(seeds))),
+        "--tiebreak-seed",
+        str(seeds[0]),
+        *args,
+    ]
+    remaining = control.remaining()
+    if remaining is not None:
+        # the children answer before the race has to
+        command += ["--deadline", str(max(remaining - RESULT_RESERVE_S, 0.0))]
+
+    started = time.perf_counter()
+    events: "queue.Queue[Tuple[_Runner, Optional[Dict[str, Any]]]]" = queue.Queue()
+    line = json.dumps(payload) + "\n"
+    runners = [_Runner(s, [*command, "--seed", str(s)], line, events) for s in seeds]
+    decided = False
+    best = bound = None
+    try:
+        running = len(runners)
+        while running:
+            if control.cancelled:
+                for runner in runners:
+                    runner.cancel()
+            try:
+                runner, message = events.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if message is None:
+                running -= 1
+                continue
+            runner.update(message)
+
+            objectives = [r.objective for r in runners if r.objective is not None]
+            bounds = [r.bound for r in runners if r.bound is not None]
+            best = min(objectives, default=None)
+            bound = max(bounds, default=None)
+            if best is None or bound is None or decided:
+                continue
+            if relative_gap(best, bound) <= gap:
+                decided = True
+                for runner in runners:
+                    runner.cancel()
+    finally:
+        for runner in runners:
+            if runner.proc.poll() is None:
+                runner.proc.kill()
+
+    finished = [r for r in runners if r.result is not None]
+    if not finished:
+        raise RuntimeError(runners[0].error or "No solver process returned a plan")
+    # the earlier seed wins a tie
+    winner = min(finished, key=lambda r: r.result["objective"]["value"])
+    result = dict(winner.result)
+    if decided and not control.cancelled and result["status"] == "cancelled":
+        # stopped by the race, not by the caller
+        result["status"] = "optimal" if bound >= best else "feasible"
+    result["timings"] = {
+        **result.get("timings", {}),
+        "race": time.perf_counter() - started,
+    }
+    result["race"] = {
+        "seed": winner.seed,
+        "gap": None if bound is None else relative_gap(best, bound),
+        "seeds": [r.summary() for r in runners],
+    }
+    return result
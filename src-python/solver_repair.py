@@ -0,0 +1,269 @@
+"""
+Minimal-change repair of a planned leg (`repair_leg`).
+
+On a flight morning a pilot falls sick or a car breaks down and the plan needs
+a fix within seconds, without reshuffling everybody. Given the current
+manifest and a change set
+
+  – removedPersonIds      : people no longer available
+  – addedPersonIds        : people (in `people`) without a seat yet
+  – unavailableVehicleIds : balloons / cars that cannot be used
+  – preAssignments        : new fixed seats
+
+only the groups touched by a change are freed; every other vehicle keeps its
+manifest through the regular `frozen` path. The freed part is solved
+lexicographically: first the number of people moved away from their current
+vehicle is minimised, then the normal objective under that minimum. If the
+solve is cancelled after the first stage, or too little time is left for the
+second, the fewest-moves plan is only scored under the normal objective. If
+the freed groups cannot absorb the change, everything is freed (still moving
+as few people as possible).
+"""
+
+from typing import Any, Dict, List, Optional, TypedDict
+
+from solver_control import RESULT_RESERVE_S, SolveControl
+from solver_flight_leg import (
+    FlightLegModel,
+    add_manifest_hint,
+    build_flight_leg_model,
+    set_objective,
+    solve_built_leg,
+)
+from solver_history import occupants, vehicle_to_group
+from solver_types import Balloon, Car, Person, VehicleAssignment
+
+# Share of the time limit spent on minimising moves; the rest goes to the
+# normal objective.
+MOVES_TIME_SHARE = 0.4
+
+# Time limit of a repair when the payload sets none: answers are needed fast.
+REPAIR_TIME_LIMIT_S = 5
+
+# Least seconds worth starting the second stage with; with less left, the
+# fewest-moves plan is scored instead.
+STAGE_TWO_MIN_S = 1.0
+
+# Time limit of scoring a plan whose every seat is fixed.
+SCORE_TIME_LIMIT_S = 1.0
+
+
+class LegChanges(TypedDict, total=False):
+    removedPersonIds: List[str]
+    addedPersonIds: List[str]
+    unavailableVehicleIds: List[str]
+    preAssignments: Dict[str, VehicleAssignment]
+
+
+def repair_flight_leg(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    manifest: Dict[str, VehicleAssignment],
+    changes: LegChanges,
+    time_limit_s: float,
+    num_search_workers: int = 15,
+    control: Optional[SolveControl] = None,
+    **model_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Repair `manifest` after `changes`. `people`, `balloons` and `cars` describe
+    the situation after the change (removed people may be missing);
+    `model_kwargs` are the `build_flight_leg_model` arguments of a normal
+    leg solve, whose `frozen` is replaced by the repair's own.
+    """
+    control = control or SolveControl()
+    if time_limit_s <= 0:
+        raise ValueError("Time limit must be positive")
+
+    removed = set(changes.get("removedPersonIds", []))
+    unavailable = set(changes.get("unavailableVehicleIds", []))
+    # a balloon whose cars are all gone cannot be retrieved
+    unavailable.update(
+        bid
+        for bid, car_ids in vehicle_groups.items()
+        if car_ids and all(cid in unavailable for cid in car_ids)
+    )
+    pre_assignments = changes.get("preAssignments") or {}
+
+    person_ids = {p["id"] for p in people} - removed
+    missing = set(changes.get("addedPersonIds", [])) - person_ids
+    if missing:
+        raise ValueError(f"Added people not found in people: {sorted(missing)}")
+    people = [p for p in people if p["id"] in person_ids]
+    balloons = [b for b in balloons if b["id"] not in unavailable]
+    cars = [dict(c) for c in cars if c["id"] not in unavailable]
+    old_group_of = vehicle_to_group(vehicle_groups)
+    vehicle_groups = {
+        bid: [cid for cid in car_ids if cid not in unavailable]
+        for bid, car_ids in vehicle_groups.items()
+        if bid not in unavailable
+    }
+    # people whose group lost its balloon may join any group
+    fixed_groups = {
+        p: gid
+        for p, gid in (model_kwargs.pop("fixed_groups", None) or {}).items()
+        if gid in vehicle_groups
+    }
+    model_kwargs.pop("frozen", None)
+    model_kwargs["aggregate_classes"] = False  # moves are counted per person
+
+    seat_of = {pid: vid for vid, a in manifest.items() for pid in occupants(a)}
+    pre_assigned = {pid for a in pre_assignments.values() for pid in occupants(a)}
+    current = {
+        vid: {
+            "operatorId": (
+                a.get("operatorId") if a.get("operatorId") not in removed else None
+            ),
+            "passengerIds": [p for p in a.get("passengerIds", []) if p not in removed],
+        }
+        for vid, a in manifest.items()
+        if vid not in unavailable
+    }
+
+    # groups touched by a change (a group of an unavailable balloon includes
+    # its cars, which are then freed as well)
+    affected = unavailable | set(pre_assignments)
+    affected.update(seat_of[p] for p in removed | pre_assigned if p in seat_of)
+    affected_groups = {old_group_of.get(v, v) for v in affected}
+
+    def attempt(free_all: bool) -> Dict[str, Any]:
+        frozen = dict(pre_assignments)
+        freed = []
+        for vid, assignment in current.items():
+            if vid in frozen:
+                continue
+            if free_all or old_group_of.get(vid, vid) in affected_groups:
+                freed.append(vid)
+            else:
+                frozen[vid] = assignment
+
+        built = build_flight_leg_model(
+            balloons,
+            cars,
+            people,
+            vehicle_groups,
+            frozen=frozen,
+            fixed_groups=fixed_groups,
+            control=control,
+            **model_kwargs,
+        )
+        weights = built.weights
+
+        # 1. fewest people moved off their current vehicle
+        stays = [
+            built.pax[p, seat_of[p]]
+            for p in built.person_ids
+            if p in seat_of and (p, seat_of[p]) in built.pax
+        ]
+        moves = len(stays) - sum(stays)
+        built.model.Minimize(moves)
+        add_manifest_hint(
+            built.model,
+            built.op,
+            built.pax,
+            current,
+            built.person_ids,
+            built.vehicle_ids,
+        )
+        result = solve_built_leg(
+            built,
+            time_limit_s=time_limit_s * MOVES_TIME_SHARE,
+            num_search_workers=num_search_workers,
+            random_seed=model_kwargs.get("random_seed"),
+            control=control,
+        )
+
+        # 2. normal objective, keeping the fewest moves found
+        stage_two_s = control.time_limit(time_limit_s * (1 - MOVES_TIME_SHARE))
+        if control.cancelled or stage_two_s < STAGE_TWO_MIN_S:
+            result = _score_fixed(
+                built,
+                result["assignments"],
+                weights,
+                control=control,
+                num_search_workers=num_search_workers,
+                random_seed=model_kwargs.get("random_seed"),
+            )
+            result["status"] = "cancelled" if control.cancelled else "feasible"
+        else:
+            built.model.Add(moves <= int(round(result["objective"]["value"])))
+            set_objective(built, weights)
+            built.model.ClearHints()
+            add_manifest_hint(
+                built.model,
+                built.op,
+                built.pax,
+                result["assignments"],
+                built.person_ids,
+                built.vehicle_ids,
+            )
+            result = solve_built_leg(
+                built,
+                time_limit_s=stage_two_s,
+                num_search_workers=num_search_workers,
+                random_seed=model_kwargs.get("random_seed"),
+                control=control,
+            )
+
+        new_seat = {
+            pid: vid for vid, a in result["assignments"].items() for pid in occupants(a)
+        }
+        return {
+            **result,
+            "moved": sorted(
+                p for p, v in seat_of.items() if p in new_seat and new_seat[p] != v
+            ),
+            "freedVehicles": sorted(freed),
+        }
+
+    try:
+        return attempt(free_all=False)
+    except RuntimeError as e:
+        if str(e) != "No feasible assignment":
+            raise
+        # the freed groups cannot absorb the change: free everything
+        return attempt(free_all=True)
+
+
+def _score_fixed(
+    built: FlightLegModel,
+    assignments: Dict[str, VehicleAssignment],
+    weights: Dict[str, float],
+    *,
+    control: SolveControl,
+    num_search_workers: int,
+    random_seed: Optional[int],
+) -> Dict[str, Any]:
+    """
+    `assignments` scored under the normal objective: every seat of `built` is
+    fixed, so only the objective's auxiliary variables are left. The score
+    runs on its own control, as `control` may be cancelled already.
+    """
+    operator = {vid: a["operatorId"] for vid, a in assignments.items()}
+    seat_of = {pid: vid for vid, a in assignments.items() for pid in occupants(a)}
+    # pax is every seat, the operator's included; frozen seats are constants
+    for (p, v), handle in built.op.items():
+        if not isinstance(handle, int):
+            built.model.Add(handle == int(operator.get(v) == p))
+    for (p, v), handle in built.pax.items():
+        if not isinstance(handle, int):
+            built.model.Add(handle == int(seat_of.get(p) == v))
+    set_objective(built, weights)
+    built.model.ClearHints()
+    remaining = control.remaining()
+    scoring = SolveControl(
+        None if remaining is None else max(remaining, 2 * RESULT_RESERVE_S),
+        control.tracer,
+        deterministic=control.deterministic,
+        recorder=control.recorder,
+    )
+    return solve_built_leg(
+        built,
+        time_limit_s=SCORE_TIME_LIMIT_S,
+        num_search_workers=num_search_workers,
+        random_seed=random_seed,
+        control=scoring,
+    )
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Re-run a capture written by `solver_main.py --capture-dir`.
+
+By default the captured payload is solved again by `solver_main.py`, with the
+recorded CLI params unless overridden, and the recorded and replayed wall
+time, status and objective are printed side by side:
+
+    python solver_replay.py captures/20260101-120000-solve_leg-4242 --workers 16
+    python solver_replay.py CAPTURE --engine local --time-limit 30
+
+With `--models`, the recorded CP-SAT models are solved directly instead, with
+their recorded `SatParameters` plus overrides; this skips parsing and model
+building and gives exactly the searched model, even when the anonymized ids
+would order the rebuilt one differently:
+
+    python solver_replay.py CAPTURE --models --param linearization_level=2
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Any, Dict, List
+
+
+def _load(capture: str, name: str) -> Any:
+    with open(os.path.join(capture, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def replay_run(capture: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Run `solver_main.py` on the capture; its wall seconds, answer and error."""
+    payload = _load(capture, "payload.json")
+    args = {**_load(capture, "run.json")["args"]}
+    options = payload.setdefault("options", {})
+    if overrides.get("time_limit") is not None:
+        options.pop("deterministicTime", None)
+        options["timeLimit"] = overrides["time_limit"]
+    if overrides.get("deterministic_time") is not None:
+        options["deterministicTime"] = overrides["deterministic_time"]
+    for key in ("seed", "workers", "engine", "deadline"):
+        if overrides.get(key) is not None:
+            args[key] = overrides[key]
+
+    command = [
+        sys.executable,
+        os.path.join(os.path.dirname(__file__), "solver_main.py"),
+    ]
+    for key, value in args.items():
+        if value is not None:
+            command += [f"--{key}", str(value)]
+    started = time.perf_counter()
+    done = subprocess.run(
+        command, input=json.dumps(payload), capture_output=True, text=True
+    )
+    seconds = time.perf_counter() - started
+    if done.returncode != 0:
+        error = done.stderr.strip().splitlines()[-1:] or ["exit %d" % done.returncode]
+        try:
+            error = [json.loads(error[0])["message"]]
+        except (ValueError, KeyError):
+            pass
+        return {"seconds": seconds, "result": None, "error": error[0]}
+    return {"seconds": seconds, "result": json.loads(done.stdout), "error": None}
+
+
+def replay_models(capture: str, params: List[str], overrides: Dict[str, Any]):
+    """Solve every recorded model; one stats dict per search."""
+    from google.protobuf import text_format
+    from ortools.sat import cp_model_pb2, sat_parameters_pb2
+    from ortools.sat.python import cp_model
+
+    stats = []
+    for n in range(len(_load(capture, "searches.json"))):
+        model = cp_model.CpModel()
+        with open(os.path.join(capture, f"search-{n}.pb"), "rb") as f:
+            proto = cp_model_pb2.CpModelProto.FromString(f.read())
+        model.Proto().CopyFrom(proto)
+        parameters = sat_parameters_pb2.SatParameters()
+        with open(os.path.join(capture, f"search-{n}.params.txt")) as f:
+            text_format.Parse(f.read(), parameters)
+        if overrides.get("seed") is not None:
+            parameters.random_seed = overrides["seed"]
+        if overrides.get("workers") is not None:
+            parameters.num_search_workers = overrides["workers"]
+        if overrides.get("time_limit") is not None:
+            parameters.ClearField("max_deterministic_time")
+            parameters.max_time_in_seconds = overrides["time_limit"]
+        if overrides.get("deterministic_time") is not None:
+            parameters.max_deterministic_time = overrides["deterministic_time"]
+            parameters.interleave_search = True
+        for param in params:
+            name, _, value = param.partition("=")
+            text_format.Merge(f"{name}: {value}", parameters)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.CopyFrom(parameters)
+        solver.parameters.log_search_progress = False
+        solver.Solve(model)
+        response = solver.response_proto
+        stats.append(
+            {
+                "status": solver.StatusName(),
+                "objective": response.objective_value,
+                "bound": response.best_objective_bound,
+                "wallSeconds": response.wall_time,
+                "deterministicTime": response.deterministic_time,
+                "conflicts": response.num_conflicts,
+                "branches": response.num_branches,
+            }
+        )
+    return stats
+
+
+def _objective(result: Dict[str, Any]) -> Any:
+    objective = result.get("objective", result.get("unusedSeats"))
+    if isinstance(objective, dict):
+        return objective.get("value")
+    return objective
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = ArgumentParser(description="Replay a solver capture")
+    parser.add_argument("capture", help="Capture directory (from --capture-dir)")
+    parser.add_argument("--models", action="store_true", help="Solve the models")
+    parser.add_argument(
+        "--engine",
+        choices=["flat", "hierarchical", "local", "staged", "auto"],
+        default=None,
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--deadline", type=float, default=None)
+    budget = parser.add_mutually_exclusive_group()
+    budget.add_argument("--time-limit", type=float, default=None)
+    budget.add_argument("--deterministic-time", type=float, default=None)
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="With --models, override a SatParameters field (repeatable).",
+    )
+    args = parser.parse_args(argv)
+    overrides = vars(args)
+
+    run = _load(args.capture, "run.json")
+    if args.models:
+        recorded = _load(args.capture, "searches.json")
+        replayed = replay_models(args.capture, args.param, overrides)
+        print(f"{'search':>6}  {'status':>10} {'objective':>12} {'seconds':>8}")
+        for n, (old, new) in enumerate(zip(recorded, replayed)):
+            for label, s in (("rec", old), ("replay", new)):
+                print(
+                    f"{n:>3} {label:<6} {s['status']:>10} "
+                    f"{s['objective']:>12.1f} {s['wallSeconds']:>8.2f}"
+                )
+        return
+
+    replayed = replay_run(args.capture, overrides)
+    print(f"{'':<7} {'seconds':>8} {'status':>10} {'objective':>12}  error")
+    for label, r in (("rec", run), ("replay", replayed)):
+        result = r["result"] if isinstance(r["result"], dict) else {}
+        print(
+            f"{label:<7} {r['seconds']:>8.2f} {str(result.get('status', '')):>10} "
+            f"{str(_objective(result)):>12}  {r['error'] or ''}"
+        )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
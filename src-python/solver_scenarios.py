@@ -0,0 +1,142 @@
+"""
+Synthetic camp scenarios for model-size tests and benchmarks.
+
+`make_scenario` returns a `solve_leg` payload shaped like the one the app
+sends: balloons with a few eligible pilots, one trailer car plus extra cars
+per group, counselors and participants with mixed languages / nationalities,
+and some history. Everything is derived from `seed`, so the same arguments
+always give the same payload.
+"""
+
+import random
+from typing import Any, Dict, List
+
+LANGUAGES = ["de", "en", "fr", "nl"]
+NATIONALITIES = ["de", "fr", "nl", "gb", "pl"]
+
+
+def make_scenario(
+    n_groups: int,
+    *,
+    participants_per_group: int = 8,
+    cars_per_group: int = 2,
+    balloon_capacity: int = 5,
+    second_leg: bool = False,
+    with_history: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+
+    def languages() -> List[str]:
+        # a third speaks "everything" (missing list), the rest 1-2 languages
+        if rng.random() < 0.33:
+            return []
+        return rng.sample(LANGUAGES, rng.randint(1, 2))
+
+    people = []
+
+    def add_person(pid: str, role: str) -> str:
+        person = {
+            "id": pid,
+            "name": pid,
+            "role": role,
+            "flightsSoFar": rng.randint(0, 4),
+            "nationality": rng.choice(NATIONALITIES),
+            "weight": rng.randint(55, 100),
+            "firstTime": rng.random() < 0.2,
+        }
+        langs = languages()
+        if langs:
+            person["languages"] = langs
+        people.append(person)
+        return pid
+
+    pilots = [add_person(f"pilot{g}", "counselor") for g in range(n_groups)]
+    drivers = [
+        add_person(f"driver{g}_{k}", "counselor")
+        for g in range(n_groups)
+        for k in range(cars_per_group)
+    ]
+    for i in range(n_groups * participants_per_group):
+        add_person(f"part{i}", "participant")
+
+    balloons = []
+    cars = []
+    vehicle_groups: Dict[str, List[str]] = {}
+    ground_crew = participants_per_group + cars_per_group + 1 - balloon_capacity
+    car_capacity = max(balloon_capacity + ground_crew, 3) // cars_per_group + 2
+    for g in range(n_groups):
+        bid = f"b{g}"
+        balloons.append(
+            {
+                "id": bid,
+                "name": bid,
+                "maxCapacity": balloon_capacity,
+                "allowedOperatorIds": [pilots[g], pilots[(g + 1) % n_groups]],
+                "maxWeight": balloon_capacity * 85,
+            }
+        )
+        vehicle_groups[bid] = []
+        for k in range(cars_per_group):
+            cid = f"c{g}_{k}"
+            cars.append(
+                {
+                    "id": cid,
+                    "name": cid,
+                    "maxCapacity": car_capacity + (balloon_capacity if k == 0 else 0),
+                    "allowedOperatorIds": [
+                        drivers[g * cars_per_group + k],
+                        rng.choice(drivers),
+                    ],
+                    "hasTrailerClutch": k == 0,
+                }
+            )
+            vehicle_groups[bid].append(cid)
+
+    ids = [p["id"] for p in people]
+    payload: Dict[str, Any] = {
+        "balloons": balloons,
+        "cars": cars,
+        "people": people,
+        "vehicleGroups": vehicle_groups,
+        "preAssignments": {},
+        "fixedGroups": {},
+        "options": {"planningHorizonDepth": 1, "timeLimit": 60},
+    }
+
+    if with_history:
+        payload["groupHistory"] = {
+            p: {rng.choice(balloons)["id"]: rng.randint(1, 2)} for p in ids
+        }
+        payload["balloonHistory"] = {
+            p: {rng.choice(balloons)["id"]: 1} for p in ids if rng.random() < 0.5
+        }
+        meet: Dict[str, Dict[str, int]] = {}
+        for p in ids:
+            for q in rng.sample(ids, min(6, len(ids))):
+                if p != q:
+                    meet.setdefault(p, {})[q] = 1
+                    meet.setdefault(q, {})[p] = 1
+        payload["peopleMeetHistory"] = meet
+
+    if second_leg:
+        # everyone keeps a random group, as if taken from a previous leg
+        group_ids = list(vehicle_groups)
+        payload["fixedGroups"] = {
+            p: group_ids[i % len(group_ids)] for i, p in enumerate(ids)
+        }
+        for g, pid in enumerate(pilots):
+            payload["fixedGroups"][pid] = group_ids[g]
+        for i, pid in enumerate(drivers):
+            payload["fixedGroups"][pid] = group_ids[i // cars_per_group]
+
+    return payload
+
+
+# Fixed scales used by the model-size budgets and the benchmark.
+SCENARIOS = {
+    "small": dict(n_groups=3, seed=1),
+    "medium": dict(n_groups=6, seed=2),
+    "large": dict(n_groups=12, seed=3),
+    "large_leg2": dict(n_groups=12, second_leg=True, seed=3),
+}
@@ -0,0 +1,169 @@
+"""
+Whole-camp planner: solve every leg of several days in one process.
+
+Each day (flight series) first gets its vehicle groups (completing any groups
+given in the day's `vehicleGroups`, as the app does on a first leg), then its
+legs are solved in order. Between legs the histories are rolled forward in
+memory (see `solver_history.CampHistory`) instead of being rebuilt by the app:
+
+  – `flightsSoFar` after every leg
+  – group / balloon / meet histories once a day is complete
+  – `fixedGroups` of leg n+1 come from the manifest of leg n
+
+Every leg is warm-started with the manifest of the same leg on the previous
+day. `on_leg` is called as soon as a leg is solved so callers can stream
+partial results.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+
+from solver_control import SolveCancelled, SolveControl
+from solver_flight_leg import solve_flight_leg
+from solver_history import CampHistory, fixed_groups_from_manifest
+from solver_types import Balloon, Car, Person, VehicleAssignment
+from solver_vehicle_group import solve_vehicle_groups
+
+
+class SeasonLeg(TypedDict, total=False):
+    id: str
+    preAssignments: Dict[str, VehicleAssignment]
+    canceledBalloonIds: List[str]
+    reducedCapacityBalloonIds: List[str]
+
+
+class SeasonDay(TypedDict, total=False):
+    id: str
+    vehicleGroups: Dict[str, List[str]]
+    legs: List[SeasonLeg]
+
+
+def plan_season(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    days: List[SeasonDay],
+    *,
+    leg_options: Dict[str, Any],
+    history: Optional[CampHistory] = None,
+    on_leg: Optional[Callable[[Dict[str, Any]], None]] = None,
+    control: Optional[SolveControl] = None,
+) -> Dict[str, Any]:
+    """
+    Plan `days` sequentially. `leg_options` are the keyword arguments passed to
+    every `solve_flight_leg` call (weights, constraints, time limit, seed, ...).
+
+    On cancellation the leg being solved keeps its best solution and planning
+    stops there; the result then only covers the legs planned so far.
+    """
+    control = control or SolveControl()
+    history = history or CampHistory(
+        flights_so_far={p["id"]: int(p.get("flightsSoFar", 0)) for p in people}
+    )
+    all_balloon_ids = [b["id"] for b in balloons]
+
+    planned_days = []
+    previous_day: List[Dict[str, VehicleAssignment]] = []
+
+    for day_index, day in enumerate(days):
+        if control.cancelled:
+            break
+        try:
+            vehicle_groups = solve_vehicle_groups(
+                balloons=balloons,
+                cars=cars,
+                people=people,
+                frozen=day.get("vehicleGroups") or {},
+                random_seed=leg_options.get("random_seed"),
+                control=control,
+            )["vehicleGroups"]
+        except SolveCancelled:
+            if not planned_days:
+                raise
+            # out of time: keep the days planned so far
+            control.cancel()
+            break
+
+        manifests: List[Dict[str, VehicleAssignment]] = []
+        planned_legs = []
+        for leg_index, leg in enumerate(day.get("legs", [])):
+            if control.cancelled:
+                break
+            canceled = set(leg.get("canceledBalloonIds", []))
+            reduced = set(leg.get("reducedCapacityBalloonIds", []))
+            leg_balloons = [
+                {**b, "maxCapacity": b["maxCapacity"] - 1} if b["id"] in reduced else b
+                for b in balloons
+                if b["id"] not in canceled
+            ]
+            leg_people = [
+                {**p, "flightsSoFar": history.flights_so_far[p["id"]]} for p in people
+            ]
+            pre_assignments = {
+                vid: a
+                for vid, a in (leg.get("preAssignments") or {}).items()
+                if vid not in canceled
+            }
+            fixed_groups = (
+                fixed_groups_from_manifest(manifests[-1], vehicle_groups)
+                if manifests
+                else {}
+            )
+            hint = previous_day[leg_index] if leg_index < len(previous_day) else None
+
+            try:
+                result = solve_flight_leg(
+                    balloons=leg_balloons,
+                    cars=[dict(c) for c in cars],
+                    people=leg_people,
+                    vehicle_groups=vehicle_groups,
+                    group_history=history.group_history,
+                    balloon_history=history.balloon_history,
+                    people_meet_history=history.people_meet_history,
+                    frozen=pre_assignments,
+                    fixed_groups=fixed_groups,
+                    hint=hint,
+                    control=control,
+                    **leg_options,
+                )
+            except SolveCancelled:
+                if not planned_days and not planned_legs:
+                    raise
+                control.cancel()
+                break
+            manifest = result["assignments"]
+            manifests.append(manifest)
+            history.record_leg(manifest, all_balloon_ids)
+
+            planned_leg = {"id": leg.get("id", str(leg_index)), **result}
+            planned_legs.append(planned_leg)
+            if on_leg is not None:
+                on_leg(
+                    {
+                        "type": "leg",
+                        "day": day_index,
+                        "leg": leg_index,
+                        "dayId": day.get("id", str(day_index)),
+                        "vehicleGroups": vehicle_groups,
+                        **planned_leg,
+                    }
+                )
+
+        history.record_day(manifests, vehicle_groups, all_balloon_ids)
+        previous_day = manifests
+        planned_days.append(
+            {
+                "id": day.get("id", str(day_index)),
+                "vehicleGroups": vehicle_groups,
+                "legs": planned_legs,
+            }
+        )
+
+    return {
+        "type": "season",
+        "status": "cancelled" if control.cancelled else "complete",
+        "days": planned_days,
+        "flightsSoFar": dict(history.flights_so_far),
+        "groupHistory": history.group_history,
+        "balloonHistory": history.balloon_history,
+        "peopleMeetHistory": history.people_meet_history,
+    }
@@ -0,0 +1,54 @@
+"""
+Speculative solves of the next leg (`--mode speculate_leg`).
+
+While the planner reviews a solved leg, the next leg can already be solved.
+`next_leg_payload` predicts the `solve_leg` payload the app will send for it,
+built the way `src/composables/solver.ts` builds it:
+
+  – flightsSoFar gains the balloon seats of the solved leg
+  – fixedGroups is the group of every person in the solved manifest
+  – preAssignments is empty (a new leg has no assignments)
+  – balloons, cars, groups, the other histories (which only cover past days)
+    and options are unchanged; a `previous` plan is dropped
+
+`--mode speculate_leg` solves that payload with `--checkpoint-dir`, so its
+checkpoint carries the key of the predicted payload and is marked
+speculative. When the real request for the next leg comes with `--resume` and
+the same payload, it continues from the speculative manifest (or only
+re-checks it if it was proven optimal); its own checkpoint is no longer
+speculative, so solving the leg again gets the whole time limit. If anything differs, for example because the planner edited the
+leg, the keys differ and the request is solved from scratch. The app runs the
+speculative process at low priority and cancels it before the next request.
+
+This module must not import OR-Tools (see `solver_checks`).
+"""
+
+from typing import Any, Dict
+
+from solver_history import CampHistory, fixed_groups_from_manifest
+from solver_types import VehicleAssignment
+
+
+def next_leg_payload(
+    payload: Dict[str, Any], manifest: Dict[str, VehicleAssignment]
+) -> Dict[str, Any]:
+    """The likely `solve_leg` payload of the leg after `payload`, solved as `manifest`."""
+    if payload.get("history") is not None:
+        raise ValueError(
+            "Cannot predict the next leg of a payload with a stored history"
+        )
+    people = payload.get("people", [])
+    history = CampHistory(
+        flights_so_far={p["id"]: int(p.get("flightsSoFar", 0)) for p in people}
+    )
+    history.record_leg(manifest, [b["id"] for b in payload.get("balloons", [])])
+
+    predicted = {k: v for k, v in payload.items() if k != "previous"}
+    predicted.update(
+        people=[{**p, "flightsSoFar": history.flights_so_far[p["id"]]} for p in people],
+        preAssignments={},
+        fixedGroups=fixed_groups_from_manifest(
+            manifest, payload.get("vehicleGroups") or {}
+        ),
+    )
+    return predicted
@@ -0,0 +1,126 @@
+"""
+Two-stage leg solve (`engine: "staged"`).
+
+The sections 3.5a (diversity), 3.5b (meetings) and 3.7 (lookahead) make up
+most of the leg model but only break ties between plans that are equally fair.
+This engine
+
+  1. core   – solves without them (hard rules plus the cheap sections) for
+              `stage_one_share` of the time limit, which gives a good plan fast
+  2. refine – builds the full model, hints it with the core plan and spends
+              the rest of the time on the full objective; with
+              `fix_balloons`, the core plan's balloon crews are kept, so only
+              the ground crews (where the expensive terms act) are refined
+
+Each stage reports its objective and time in `stages`. If the refine stage
+finds nothing in time, or the solve is cancelled in between, the core plan is
+returned.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from solver_control import SolveCancelled, SolveControl
+from solver_flight_leg import Manifest, solve_flight_leg
+from solver_types import Balloon, Car, Person
+
+# Objective weights left out of the core stage.
+EXPENSIVE_WEIGHTS = (
+    "w_divers_nationalities",
+    "w_new_meetings",
+    "w_low_flights_lookahead",
+)
+
+# Share of the time limit given to the core stage.
+STAGE_ONE_SHARE = 0.3
+
+
+def solve_flight_leg_staged(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    time_limit_s: float,
+    num_search_workers: int = 15,
+    stage_one_share: float = STAGE_ONE_SHARE,
+    fix_balloons: bool = False,
+    control: Optional[SolveControl] = None,
+    **model_kwargs: Any,
+) -> Manifest:
+    """
+    Solve a leg in a core and a refine stage. Arguments are those of
+    `solve_flight_leg`; the result additionally carries `engine`, `timings`
+    and `stages`.
+    """
+    control = control or SolveControl()
+    if time_limit_s <= 0:
+        raise ValueError("Time limit must be positive")
+    if not 0 < stage_one_share < 1:
+        raise ValueError("Stage one share must be between 0 and 1")
+
+    def stage(name: str, started: float, result: Manifest) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "seconds": time.perf_counter() - started,
+            "status": result["status"],
+            "objective": result["objective"]["value"],
+        }
+
+    started = time.perf_counter()
+    with control.tracer.span("core"):
+        core = solve_flight_leg(
+            balloons,
+            [dict(c) for c in cars],  # car seats are reserved in place
+            people,
+            vehicle_groups,
+            time_limit_s=time_limit_s * stage_one_share,
+            num_search_workers=num_search_workers,
+            control=control,
+            **{**model_kwargs, **{w: 0 for w in EXPENSIVE_WEIGHTS}},
+        )
+    stages = [stage("core", started, core)]
+    result = core
+
+    if not control.cancelled:
+        frozen = dict(model_kwargs.pop("frozen", None) or {})
+        if fix_balloons:
+            balloon_ids = {b["id"] for b in balloons}
+            for vid, assignment in core["assignments"].items():
+                if vid in balloon_ids:
+                    frozen.setdefault(vid, assignment)
+
+        refine_started = time.perf_counter()
+        try:
+            with control.tracer.span("refine"):
+                result = solve_flight_leg(
+                    balloons,
+                    [dict(c) for c in cars],
+                    people,
+                    vehicle_groups,
+                    time_limit_s=time_limit_s * (1 - stage_one_share),
+                    num_search_workers=num_search_workers,
+                    hint=core["assignments"],
+                    frozen=frozen,
+                    control=control,
+                    **model_kwargs,
+                )
+            stages.append(stage("refine", refine_started, result))
+        except (RuntimeError, SolveCancelled) as e:
+            # no refined plan in time: keep the core plan
+            if str(e) == "No feasible assignment":
+                raise
+            result = core
+
+    return {
+        **result,
+        # the core stage never proves optimality of the full objective
+        "status": (
+            "feasible"
+            if result is core and core["status"] == "optimal"
+            else result["status"]
+        ),
+        "engine": "staged",
+        "timings": {s["name"]: s["seconds"] for s in stages},
+        "stages": stages,
+    }
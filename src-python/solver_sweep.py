@@ -0,0 +1,108 @@
+"""
+What-if weight sweeps on one built leg model.
+
+Only objective coefficients differ between weight settings, so the variables
+and hard constraints are built once (with every section that any weight set
+needs) and each weight set just swaps the objective via `set_objective`.
+Every solve is hinted with the previous solution, so later variants start
+from a good incumbent.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from solver_control import SolveCancelled, SolveControl
+from solver_flight_leg import (
+    WEIGHT_KWARGS,
+    add_manifest_hint,
+    build_flight_leg_model,
+    set_objective,
+    solve_built_leg,
+)
+from solver_types import Balloon, Car, Person
+
+
+def sweep_flight_leg(
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    weight_sets: List[Dict[str, float]],
+    time_limit_s: int,
+    num_search_workers: int = 15,
+    control: Optional[SolveControl] = None,
+    **model_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Solve one leg once per entry of `weight_sets` (complete `options.weights`
+    dicts). `time_limit_s` applies to each variant; `model_kwargs` are the
+    remaining `build_flight_leg_model` arguments, whose own weights are
+    replaced by the sweep's.
+    """
+    if not weight_sets:
+        raise ValueError("Weight sweep needs at least one weight set")
+    for weights in weight_sets:
+        if weights["passengerFairness"] * weights["tiebreakFairness"] < 0:
+            raise ValueError(
+                "Passenger fairness weight and tiebreak fairness must have the same sign"
+            )
+    control = control or SolveControl()
+
+    # A section is built if any variant uses it; the stand-in weight only
+    # switches it on. Stand-ins are positive, so weights of different sets
+    # never meet in the passenger/tiebreak sign check.
+    for name, kwarg in WEIGHT_KWARGS.items():
+        used = any(w[name] != 0 for w in weight_sets)
+        model_kwargs[kwarg] = 1 if used else 0
+
+    control.check()
+    started = time.perf_counter()
+    with control.tracer.span("build", profile=True, people=len(people)):
+        built = build_flight_leg_model(
+            balloons, cars, people, vehicle_groups, control=control, **model_kwargs
+        )
+    build_seconds = time.perf_counter() - started
+
+    results = []
+    previous = None
+    for weights in weight_sets:
+        if control.cancelled:
+            break
+        set_objective(built, weights)
+        if previous is not None:
+            built.model.ClearHints()
+            add_manifest_hint(
+                built.model,
+                built.op,
+                built.pax,
+                previous,
+                built.person_ids,
+                built.vehicle_ids,
+                classes=built.classes,
+            )
+
+        started = time.perf_counter()
+        try:
+            with control.tracer.span("variant", weights=weights):
+                result = solve_built_leg(
+                    built,
+                    time_limit_s=time_limit_s,
+                    num_search_workers=num_search_workers,
+                    random_seed=model_kwargs.get("random_seed"),
+                    control=control,
+                )
+        except SolveCancelled:
+            if not results:
+                raise
+            break
+        previous = result["assignments"]
+        results.append(
+            {
+                "weights": weights,
+                **result,
+                "solveSeconds": time.perf_counter() - started,
+            }
+        )
+
+    return {"results": results, "buildSeconds": build_seconds}
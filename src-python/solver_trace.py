@@ -0,0 +1,114 @@
+"""
+Trace-file export for offline profiling (`--trace-file`).
+
+A `Tracer` collects, for one solver process,
+
+  – Python-side phase spans (parse, build, search, ...) as Chrome trace events
+    ("ph": "X"), so the file opens in chrome://tracing or Perfetto
+  – every CP-SAT search log line, routed through `CpSolver.log_callback`
+    instead of stdout (which carries the JSON result), as instant events
+  – optionally a cProfile dump of model building, written next to the trace
+    as `<trace-file>.prof` (open with `python -m pstats` or snakeviz)
+
+Without a path the tracer records nothing and costs nothing, so it can always
+be passed around (it rides on `SolveControl.tracer`).
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Tracer:
+    def __init__(self, path: Optional[str] = None, *, profile_build: bool = False):
+        self.path = path
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._profile = cProfile.Profile() if path and profile_build else None
+        # cProfile can only be active in one thread at a time
+        self._profiling = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _add(self, event: Dict[str, Any]) -> None:
+        event.setdefault("pid", os.getpid())
+        event.setdefault("tid", threading.get_ident())
+        with self._lock:
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, name: str, *, profile: bool = False, **args: Any) -> Iterator[None]:
+        """Record a phase; with `profile`, also run it under cProfile if enabled."""
+        if not self.enabled:
+            yield
+            return
+
+        profiling = (
+            profile
+            and self._profile is not None
+            and self._profiling.acquire(blocking=False)
+        )
+        started = self._now_us()
+        if profiling:
+            self._profile.enable()
+        try:
+            yield
+        finally:
+            if profiling:
+                self._profile.disable()
+                self._profiling.release()
+            self._add(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": started,
+                    "dur": self._now_us() - started,
+                    "args": args,
+                }
+            )
+
+    def attach(self, solver) -> None:
+        """Send the search log of `solver` into the trace instead of stdout."""
+        if not self.enabled:
+            return
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = self.log
+
+    def log(self, line: str) -> None:
+        if line.strip():
+            self._add(
+                {
+                    "name": "cp-sat",
+                    "ph": "i",
+                    "s": "t",
+                    "ts": self._now_us(),
+                    "args": {"line": line},
+                }
+            )
+
+    def write(self) -> None:
+        """Write the trace file (and the build profile, if any)."""
+        if not self.enabled:
+            return
+        other: Dict[str, Any] = {}
+        if self._profile is not None:
+            other["buildProfile"] = f"{self.path}.prof"
+            self._profile.dump_stats(other["buildProfile"])
+        with self._lock:
+            events = list(self._events)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms", "otherData": other},
+                f,
+            )
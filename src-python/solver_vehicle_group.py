@@ -1,5 +1,8 @@
 from typing import List, Dict, Optional
 from ortools.sat.python import cp_model
+from solver_checks import group_compatibility, vehicle_group_problems
+from solver_control import SolveControl, SolveCancelled
+from solver_group_search import search_vehicle_groups
 from solver_types import Balloon, Car, Person
 
 
@@ -12,6 +15,8 @@ def solve_vehicle_groups(
     time_limit_s: int = 5,
     num_search_workers: Optional[int] = None,
     random_seed: Optional[int] = None,
+    control: Optional[SolveControl] = None,
+    engine: str = "auto",
 ):
     """
     Compute a mapping balloon_id -> [car_id, ...] for the current leg.
@@ -26,17 +31,19 @@ def solve_vehicle_groups(
           * do NOT require a trailer-equipped car
           * do NOT enforce balloon-vs-car language compatibility
           * are omitted from the result if they have no cars assigned
+
+    With engine "auto", instances up to solver_group_search.MAX_BALLOONS /
+    MAX_CARS are solved exactly by a combinatorial search and only larger ones
+    by CP-SAT; "cp-sat" always builds the model. The result names the engine.
     """
     frozen = frozen or {}
+    control = control or SolveControl()
 
     people_count = len(people)
 
     car_ids = [c["id"] for c in cars]
     balloon_ids = [b["id"] for b in balloons]
 
-    car_names = {c["id"]: c["name"] for c in cars}
-    balloon_names = {b["id"]: b["name"] for b in balloons}
-
     cap = {c["id"]: int(c["maxCapacity"]) for c in cars}
     pax_cap = {cid: max(cap[cid] - 1, 0) for cid in car_ids}  # seats for passengers
     trailer = {c["id"]: bool(c.get("hasTrailerClutch", False)) for c in cars}
@@ -45,85 +52,45 @@ def solve_vehicle_groups(
     # Distinguish "real" balloons from placeholder "no-balloon" groups
     real_balloon_ids = [bid for bid in balloon_ids if bal_need[bid] > 0]
 
-    # ---- operator candidate lookup ----
-    allowed_op_balloon = {
-        b["id"]: set(b.get("allowedOperatorIds", [])) for b in balloons
-    }
-    allowed_op_car = {c["id"]: set(c.get("allowedOperatorIds", [])) for c in cars}
-
-    # person -> languages (None or [] means "speaks all")
-    langs = {p["id"]: p.get("languages") for p in people}
-
-    # Precompute language compatibility for every (balloon op cand, car op cand)
-    # and lift it to a car-vs-balloon compatibility matrix:
-    compat_cb: Dict[tuple[str, str], bool] = {}
-
-    for bid in balloon_ids:
-        # For placeholder groups (no balloon), we do NOT enforce language
-        # compatibility between a balloon operator and car operator.
-        if bal_need[bid] == 0:
-            for cid in car_ids:
-                compat_cb[(cid, bid)] = True
-            continue
-
-        # Real balloon: apply original language-compatibility logic
-        b_ops = allowed_op_balloon.get(bid, set())
-        for cid in car_ids:
-            c_ops = allowed_op_car.get(cid, set())
-            ok = False
-            if b_ops and c_ops:
-                for p in b_ops:
-                    lp = langs.get(p)
-                    p_all = (lp is None) or (len(lp) == 0)
-                    p_set = set(lp or [])
-                    # early exit if p speaks all
-                    if p_all:
-                        ok = True
-                        break
-                    for q in c_ops:
-                        lq = langs.get(q)
-                        q_all = (lq is None) or (len(lq) == 0)
-                        if q_all or p_set.intersection(lq or []):
-                            ok = True
-                            break
-                    if ok:
-                        break
-            # If either side has no candidates, leave ok False (cannot ensure a match)
-            compat_cb[(cid, bid)] = ok
+    compat_cb = group_compatibility(balloons, cars, people)
 
     # ---- sanity checks ------------------------------------------------
-    # only "real" balloons require trailer-equipped cars
-    if sum(1 for c in car_ids if trailer[c]) < len(real_balloon_ids):
-        raise ValueError("not enough trailer-equipped cars for balloons")
-
     # across all groups, *car* seats must cover everyone not seated in balloons
     car_seats_needed = max(people_count - sum(bal_need.values()), 0)
-    if sum(cap.values()) < car_seats_needed:
-        raise ValueError("fleet lacks passenger seats for ground crew")
+    problems = vehicle_group_problems(balloons, cars, people, frozen, compat_cb)
+    if problems:
+        raise ValueError(problems[0])
 
-    for bid, fixed_cars in frozen.items():
-        if bid not in balloon_ids:
-            raise ValueError(f"balloon {bid} not found")
-        for cid in fixed_cars:
-            if cid not in car_ids:
-                raise ValueError(f"car {cid} not found")
-
-    # Helpful pre-errors: no operator candidates for real balloons only
-    for bid in balloon_ids:
-        if len(allowed_op_balloon.get(bid)) == 0 and bal_need[bid] > 0:
-            raise ValueError(f"Balloon {balloon_names[bid]} has no eligible operators")
-    for cid in car_ids:
-        if len(allowed_op_car.get(cid)) == 0 and cap[cid] > 0:
-            raise ValueError(f"Car {car_names[cid]} has no eligible operators")
-
-    # Helpful pre-errors: frozen pair contradicts language feasibility
-    for bid, fixed_cars in frozen.items():
-        for cid in fixed_cars:
-            if not compat_cb[(cid, bid)]:
-                raise ValueError(
-                    f"Vehicle group {balloon_names[bid]} <- {car_names[cid]} is impossible: "
-                    f"No language-compatible operator pair exists"
-                )
+    def result(groups: Dict[str, List[str]], used_engine: str):
+        # Skip placeholder balloons with capacity 0 if they have no cars
+        return {
+            "vehicleGroups": {
+                b: cars_for_b
+                for b, cars_for_b in groups.items()
+                if bal_need[b] > 0 or cars_for_b
+            },
+            "engine": used_engine,
+        }
+
+    # ---- combinatorial search -----------------------------------------
+    control.check()
+    if engine == "auto":
+        groups = search_vehicle_groups(
+            balloon_ids,
+            car_ids,
+            bal_need,
+            pax_cap,
+            cap,
+            trailer,
+            compat_cb,
+            frozen,
+            car_seats_needed,
+            control=control,
+        )
+        if groups is not None:
+            return result(groups, "search")
+    elif engine != "cp-sat":
+        raise ValueError(f"Unknown vehicle group engine: {engine}")
 
     # ---- model --------------------------------------------------------
     model = cp_model.CpModel()
@@ -136,7 +103,7 @@ def solve_vehicle_groups(
 
     # each car used ≤ 1 group
     for c in car_ids:
-        model.Add(sum(x[c, b] for b in balloon_ids) <= 1)
+        model.AddAtMostOne(x[c, b] for b in balloon_ids)
 
     # ≥ 1 trailer car in each *real balloon* group
     for b in real_balloon_ids:
@@ -161,27 +128,23 @@ def solve_vehicle_groups(
     model.Minimize(unused)
 
     # ---- solve --------------------------------------------------------
+    control.check()
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = float(time_limit_s)
+    control.limit(solver, time_limit_s)
     if num_search_workers is not None:
         solver.parameters.num_search_workers = int(num_search_workers)
     if random_seed is not None:
         solver.parameters.random_seed = int(random_seed)
 
-    status = solver.Solve(model)
+    with control.running(solver, model):
+        status = solver.Solve(model)
     if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        if control.cancelled:
+            raise SolveCancelled("Solve was cancelled before a solution was found")
         raise RuntimeError("No feasible vehicle groups arrangement found")
 
     # ---- build result -------------------------------------------------
-    vehicle_groups: Dict[str, List[str]] = {}
-
-    for b in balloon_ids:
-        cars_for_b = [c for c in car_ids if solver.Value(x[c, b]) == 1]
-
-        # Skip placeholder balloons with capacity 0 if they have no cars
-        if bal_need[b] == 0 and not cars_for_b:
-            continue
-
-        vehicle_groups[b] = cars_for_b
-
-    return {"vehicleGroups": vehicle_groups}
+    return result(
+        {b: [c for c in car_ids if solver.Value(x[c, b]) == 1] for b in balloon_ids},
+        "cp-sat",
+    )
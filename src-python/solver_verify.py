@@ -0,0 +1,225 @@
+"""
+Independent verification of finished plans.
+
+`verify_leg` and `verify_vehicle_groups` re-check every hard rule of
+`solve_flight_leg` and `solve_vehicle_groups` on a given plan in plain
+Python, without building a model. They return one readable message per
+violation (an empty list means the plan is valid), so `solver_main` can hand a
+still-valid previous plan straight back instead of solving again
+(`previous` + `options.reuseTolerance`).
+"""
+
+from typing import Any, Dict, List, Optional
+
+from solver_checks import reserve_group_car_seats
+from solver_types import Balloon, Car, Person, VehicleAssignment
+
+# Default `options.reuseTolerance`: a previous plan may score 5 % worse.
+REUSE_TOLERANCE = 0.05
+
+# Time limit of scoring a previous plan. Every seat is frozen, so a score
+# takes a fraction of a second; a plan that takes longer is solved anew.
+REUSE_SCORE_TIME_LIMIT_S = 5.0
+
+# Time limit of the short search, started from a previous plan, whose best
+# objective the plan's score is compared with.
+REUSE_SEARCH_TIME_LIMIT_S = 5.0
+
+
+def _speaks_all(languages: Optional[List[str]]) -> bool:
+    return not languages
+
+
+def _share_language(a: Optional[List[str]], b: Optional[List[str]]) -> bool:
+    return _speaks_all(a) or _speaks_all(b) or bool(set(a).intersection(b))
+
+
+def verify_leg(
+    assignments: Dict[str, VehicleAssignment],
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    vehicle_groups: Dict[str, List[str]],
+    *,
+    frozen: Optional[Dict[str, VehicleAssignment]] = None,
+    fixed_groups: Optional[Dict[str, str]] = None,
+    c_common_language_passengers: bool = True,
+    c_common_language_operators: bool = True,
+    default_person_weight: int = 80,
+    **_: Any,
+) -> List[str]:
+    """Hard-rule violations of a leg manifest (section 2 of the leg model)."""
+    errors: List[str] = []
+    cars = [dict(c) for c in cars]
+    try:
+        reserve_group_car_seats(balloons, cars, vehicle_groups)
+    except (RuntimeError, ValueError) as e:
+        return [str(e)]
+
+    vehicles = {v["id"]: v for v in [*balloons, *cars]}
+    balloon_ids = {b["id"] for b in balloons}
+    person = {p["id"]: p for p in people}
+
+    # 2.1 / 2.2 everyone exactly one seat, operators sit in their vehicle
+    seat: Dict[str, str] = {}
+    for vid, a in assignments.items():
+        if vid not in vehicles:
+            errors.append(f"Unknown vehicle {vid}")
+            continue
+        seated = [a.get("operatorId"), *a.get("passengerIds", [])]
+        for pid in seated:
+            if pid is None:
+                continue
+            if pid not in person:
+                errors.append(f"Unknown person {pid} in {vid}")
+            elif pid in seat:
+                errors.append(f"{pid} is seated in both {seat[pid]} and {vid}")
+            else:
+                seat[pid] = vid
+    errors.extend(f"{pid} has no seat" for pid in person if pid not in seat)
+
+    for vid, a in assignments.items():
+        vehicle = vehicles.get(vid)
+        if vehicle is None:
+            continue
+        occupants = [p for p in [a.get("operatorId"), *a.get("passengerIds", [])] if p]
+        op = a.get("operatorId")
+        # 2.3 capacity
+        if len(occupants) > int(vehicle["maxCapacity"]):
+            errors.append(
+                f"{vid} seats {len(occupants)} but has {vehicle['maxCapacity']} seats"
+            )
+        # 2.4 weight
+        max_weight = vehicle.get("maxWeight")
+        if max_weight is not None and int(max_weight) > 0:
+            load = sum(
+                int(person[p].get("weight", default_person_weight))
+                for p in occupants
+                if p in person
+            )
+            if load > int(max_weight):
+                errors.append(f"{vid} carries {load} kg, limit {max_weight} kg")
+        # 2.5 one operator on an occupied vehicle, and an eligible one
+        if occupants and op is None:
+            errors.append(f"{vid} is occupied but has no operator")
+        if op is not None and op not in vehicle.get("allowedOperatorIds", []):
+            errors.append(f"{op} may not operate {vid}")
+        # 2.8 passengers share a language with the balloon operator
+        if c_common_language_passengers and vid in balloon_ids and op in person:
+            for p in occupants:
+                if p in person and not _share_language(
+                    person[p].get("languages"), person[op].get("languages")
+                ):
+                    errors.append(f"{p} shares no language with {op} in {vid}")
+
+    # 2.6 frozen seats
+    for vid, a in (frozen or {}).items():
+        got = assignments.get(vid) or {}
+        if a.get("operatorId") is not None and got.get("operatorId") != a["operatorId"]:
+            errors.append(f"{a['operatorId']} is fixed as operator of {vid}")
+        for pid in a.get("passengerIds", []):
+            if seat.get(pid) != vid or got.get("operatorId") == pid:
+                errors.append(f"{pid} is fixed as passenger of {vid}")
+
+    # 2.7 stay in the group of the previous leg
+    if fixed_groups:
+        frozen_people = {
+            p
+            for a in (frozen or {}).values()
+            for p in [a.get("operatorId"), *a.get("passengerIds", [])]
+            if p
+        }
+        for pid, bid in fixed_groups.items():
+            if pid in frozen_people or pid not in seat:
+                continue
+            if seat[pid] not in [bid, *vehicle_groups.get(bid, [])]:
+                errors.append(f"{pid} must stay in group {bid}")
+
+    # 2.9 balloon operator shares a language with each car operator
+    if c_common_language_operators:
+        for bid, car_ids in vehicle_groups.items():
+            bop = (assignments.get(bid) or {}).get("operatorId")
+            if bop not in person:
+                continue
+            for cid in car_ids:
+                cop = (assignments.get(cid) or {}).get("operatorId")
+                if cop in person and not _share_language(
+                    person[bop].get("languages"), person[cop].get("languages")
+                ):
+                    errors.append(
+                        f"Operators {bop} ({bid}) and {cop} ({cid}) "
+                        f"share no language"
+                    )
+    return errors
+
+
+def unused_car_seats(vehicle_groups: Dict[str, List[str]], cars: List[Car]) -> int:
+    """Objective of `solve_vehicle_groups`: passenger seats of unused cars."""
+    used = {cid for car_ids in vehicle_groups.values() for cid in car_ids}
+    return sum(max(int(c["maxCapacity"]) - 1, 0) for c in cars if c["id"] not in used)
+
+
+def verify_vehicle_groups(
+    vehicle_groups: Dict[str, List[str]],
+    balloons: List[Balloon],
+    cars: List[Car],
+    people: List[Person],
+    frozen: Optional[Dict[str, List[str]]] = None,
+) -> List[str]:
+    """Hard-rule violations of a balloon -> cars grouping."""
+    errors: List[str] = []
+    car = {c["id"]: c for c in cars}
+    balloon = {b["id"]: b for b in balloons}
+    langs = {p["id"]: p.get("languages") for p in people}
+
+    group_of: Dict[str, str] = {}
+    for bid, car_ids in vehicle_groups.items():
+        if bid not in balloon:
+            errors.append(f"Unknown balloon {bid}")
+            continue
+        for cid in car_ids:
+            if cid not in car:
+                errors.append(f"Unknown car {cid}")
+            elif cid in group_of:
+                errors.append(f"{cid} is in both {group_of[cid]} and {bid}")
+            else:
+                group_of[cid] = bid
+
+    for bid, fixed_cars in (frozen or {}).items():
+        for cid in fixed_cars:
+            if group_of.get(cid) != bid:
+                errors.append(f"{cid} is fixed to group {bid}")
+
+    for bid, b in balloon.items():
+        need = int(b["maxCapacity"])
+        car_ids = [c for c in vehicle_groups.get(bid, []) if c in car]
+        if need == 0:
+            continue  # placeholder group
+        if not any(car[c].get("hasTrailerClutch", False) for c in car_ids):
+            errors.append(f"Group {bid} has no car with a trailer clutch")
+        seats = sum(max(int(car[c]["maxCapacity"]) - 1, 0) for c in car_ids)
+        if seats < need:
+            errors.append(f"Group {bid} has {seats} passenger seats, needs {need}")
+        for cid in car_ids:
+            if not any(
+                _share_language(langs.get(p), langs.get(q))
+                for p in b.get("allowedOperatorIds", [])
+                for q in car[cid].get("allowedOperatorIds", [])
+            ):
+                errors.append(f"No language-compatible operators for {bid} and {cid}")
+
+    needed = max(len(people) - sum(int(b["maxCapacity"]) for b in balloons), 0)
+    seats = sum(int(car[c]["maxCapacity"]) for c in group_of)
+    if seats < needed:
+        errors.append(f"Groups have {seats} car seats, ground crew needs {needed}")
+    return errors
+
+
+def within_tolerance(
+    value: float, reference: Optional[float], tolerance: float
+) -> bool:
+    """
+    Whether `value` (minimised) is at most `tolerance` worse than `reference`;
+    never without a reference.
+    """
+    return reference is not None and value <= reference + tolerance * abs(reference)
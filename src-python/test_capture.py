@@ -0,0 +1,69 @@
+"""
+Tests for solve captures (solver_capture) and their replay (solver_replay).
+
+Run with:  pytest test_capture.py -v
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from solver_capture import Recorder, anonymize, id_map
+from solver_replay import replay_models, replay_run
+from solver_scenarios import make_scenario
+
+
+def capture(tmp_path, payload, *args):
+    subprocess.run(
+        [sys.executable, "solver_main.py", "--capture-dir", str(tmp_path), *args],
+        input=json.dumps(payload),
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    [name] = os.listdir(tmp_path)
+    return os.path.join(tmp_path, name)
+
+
+class TestCapture:
+    def test_anonymize_keeps_structure(self):
+        payload = make_scenario(2, seed=3)
+        ids = id_map(payload)
+        text = json.dumps(anonymize(payload, ids))
+        assert not any(f'"{real}"' in text for real in ids)
+        assert not any(p["name"] in text for p in payload["people"])
+        anonymous = json.loads(text)
+        assert set(anonymous["vehicleGroups"]) == {
+            ids[b] for b in payload["vehicleGroups"]
+        }
+
+    def test_fast_runs_are_skipped(self, tmp_path):
+        recorder = Recorder(str(tmp_path), min_seconds=60)
+        assert recorder.write({"mode": "solve_leg"}, {}, {}) is None
+        assert os.listdir(tmp_path) == []
+
+    def test_capture_and_replay_models(self, tmp_path):
+        payload = make_scenario(2, seed=3)
+        payload["options"] = {"timeLimit": 20}
+        path = capture(tmp_path, payload, "--mode", "solve_leg", "--workers", "4")
+        run = json.load(open(os.path.join(path, "run.json")))
+        assert run["args"]["workers"] == 4 and run["error"] is None
+        [recorded] = json.load(open(os.path.join(path, "searches.json")))
+        assert b"part" not in open(os.path.join(path, "search-0.pb"), "rb").read()
+
+        [replayed] = replay_models(path, ["linearization_level=1"], {})
+        assert replayed["status"] == recorded["status"] == "OPTIMAL"
+        assert replayed["objective"] == recorded["objective"]
+
+        again = replay_run(path, {"workers": 2})
+        assert again["error"] is None
+        assert again["result"]["objective"]["value"] == recorded["objective"]
+
+    def test_errors_are_captured(self, tmp_path):
+        payload = make_scenario(2, seed=3)
+        payload["options"] = {"weights": {"tiebreakFairness": -1}}
+        path = capture(tmp_path, payload, "--mode", "solve_leg")
+        run = json.load(open(os.path.join(path, "run.json")))
+        assert run["result"] is None and "same sign" in run["error"]
+        assert replay_run(path, {})["error"] == run["error"]
@@ -0,0 +1,121 @@
+"""
+Tests for checkpoints of long leg solves (solver_checkpoint, `--resume`).
+
+Run with:  pytest test_checkpoint.py -v
+"""
+
+import copy
+import json
+import os
+import time
+
+from solver_checkpoint import CHECKPOINT_MAX_AGE_S, Checkpoint, payload_key, prune
+from solver_scenarios import make_scenario
+
+
+class CountingCheckpoint(Checkpoint):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.saved = []
+
+    def save(self, assignments, **state):
+        self.saved.append(state["status"])
+        super().save(assignments, **state)
+
+
+class TestCheckpoint:
+    def test_key_ignores_the_time_budget(self):
+        payload = make_scenario(2, seed=3)
+        longer = copy.deepcopy(payload)
+        longer["options"]["timeLimit"] = 600
+        assert payload_key("solve_leg", payload) == payload_key("solve_leg", longer)
+        longer["options"]["weights"] = {"pilotFairness": 0}
+        assert payload_key("solve_leg", payload) != payload_key("solve_leg", longer)
+
+    def test_other_key_is_not_loaded(self, tmp_path):
+        Checkpoint(str(tmp_path), "a").save(
+            {}, objective=1, bound=0, seconds=2, status="running"
+        )
+        os.rename(tmp_path / "a.json", tmp_path / "b.json")
+        assert Checkpoint(str(tmp_path), "b").load() is None
+        assert Checkpoint(str(tmp_path), "a").load() is None
+
+    def test_solutions_are_saved_during_the_search(self, tmp_path, solve_leg):
+        payload = make_scenario(2, seed=3)
+        checkpoint = CountingCheckpoint(str(tmp_path), "k", interval_s=0)
+        result = solve_leg(payload, checkpoint=checkpoint)
+        assert checkpoint.saved[0] == "running" and checkpoint.saved[-1] == "optimal"
+        state = Checkpoint(str(tmp_path), "k").load()
+        assert state["assignments"] == result["assignments"]
+        assert state["objective"] == result["objective"]["value"]
+
+    def test_resume_continues_with_the_rest_of_the_budget(self, tmp_path, run_main):
+        payload = make_scenario(2, seed=3)
+        payload["options"]["timeLimit"] = 10
+        first = run_main("solve_leg", payload, "--checkpoint-dir", tmp_path)
+        assert first["checkpoint"] == {
+            "path": first["checkpoint"]["path"],
+            "resumed": False,
+            "priorSeconds": 0.0,
+        }
+        # as if the first run had used up its budget before it was killed
+        state = json.load(open(first["checkpoint"]["path"]))
+        state.update(status="running", seconds=10)
+        json.dump(state, open(first["checkpoint"]["path"], "w"))
+
+        resumed = run_main(
+            "solve_leg", payload, "--checkpoint-dir", tmp_path, "--resume"
+        )
+        assert resumed["checkpoint"]["resumed"] is True
+        assert resumed["checkpoint"]["priorSeconds"] == 10
+        assert resumed["objective"]["value"] == first["objective"]["value"]
+        assert json.load(open(first["checkpoint"]["path"]))["seconds"] > 10
+
+    def test_only_interrupted_and_speculative_solves_resume(self, tmp_path):
+        def save(status, speculative=False):
+            Checkpoint(str(tmp_path), "k", speculative=speculative).save(
+                {}, objective=1, bound=0, seconds=4, status=status
+            )
+            return Checkpoint(str(tmp_path), "k")
+
+        finished = save("feasible")
+        assert finished.resume() is None and finished.spent_before == 0
+        assert save("running").resume() is not None
+        speculative = save("optimal", speculative=True)
+        assert speculative.resume()["speculative"] is True
+        assert speculative.spent_before == 4
+
+    def test_old_and_surplus_checkpoints_are_pruned(self, tmp_path, monkeypatch):
+        now = time.time()
+        for i in range(5):
+            (tmp_path / f"{i}.json").write_text("{}")
+            os.utime(tmp_path / f"{i}.json", (now - i, now - i))
+        stale = now - CHECKPOINT_MAX_AGE_S - 1
+        (tmp_path / "old.json").write_text("{}")
+        os.utime(tmp_path / "old.json", (stale, stale))
+        (tmp_path / "a.json.7.tmp").write_text("")
+        (tmp_path / "notes.txt").write_text("")
+
+        assert prune(str(tmp_path), max_files=4) == 2
+        assert not (tmp_path / "old.json").exists()
+        assert not (tmp_path / "4.json").exists()
+        assert (tmp_path / "a.json.7.tmp").exists()
+        assert (tmp_path / "notes.txt").exists()
+
+        # the first write of a run keeps its own file among the newest
+        checkpoint = Checkpoint(str(tmp_path), "k")
+        prune_calls = []
+        monkeypatch.setattr(
+            "solver_checkpoint.prune",
+            lambda directory, **kwargs: prune_calls.append(kwargs)
+            or prune(directory, max_files=2, **kwargs),
+        )
+        for _ in range(2):
+            checkpoint.save({}, objective=1, bound=0, seconds=1, status="running")
+        assert len(prune_calls) == 1
+        assert sorted(os.listdir(tmp_path)) == [
+            "0.json",
+            "a.json.7.tmp",
+            "k.json",
+            "notes.txt",
+        ]
@@ -0,0 +1,98 @@
+"""
+Tests for the shared input checks (solver_checks) and `--mode validate`.
+
+Run with:  pytest test_checks.py -v
+"""
+
+import copy
+import json
+import subprocess
+import sys
+
+import pytest
+
+from solver_flight_leg import solve_flight_leg
+from solver_main import _handle_validate, leg_options
+from solver_scenarios import make_scenario
+from solver_vehicle_group import solve_vehicle_groups
+from test_solver import balloon, car, person
+
+
+def leg_error(payload):
+    options = leg_options(payload, {"workers": 8, "seed": 42})
+    with pytest.raises(ValueError) as e:
+        solve_flight_leg(
+            payload["balloons"],
+            copy.deepcopy(payload["cars"]),
+            payload["people"],
+            payload["vehicleGroups"],
+            group_history=None,
+            balloon_history=None,
+            people_meet_history=None,
+            frozen=payload.get("preAssignments"),
+            fixed_groups=None,
+            **options,
+        )
+    return str(e.value)
+
+
+class TestValidate:
+    def test_valid_leg(self):
+        payload = make_scenario(2, seed=3)
+        result = _handle_validate(payload)
+        assert result["valid"] and result["errors"] == []
+        facts = result["facts"]
+        assert facts["people"] == len(payload["people"])
+        assert facts["trailerCars"] >= facts["realBalloons"] == len(payload["balloons"])
+        assert set(facts["groupPassengerSeats"]) == set(payload["vehicleGroups"])
+
+    def test_leg_errors_match_the_solver(self):
+        payload = make_scenario(2, seed=3)
+        vid, vehicle = next((c["id"], c) for c in payload["cars"])
+        outsider = next(
+            p["id"]
+            for p in payload["people"]
+            if p["id"] not in vehicle["allowedOperatorIds"]
+        )
+        payload["preAssignments"] = {vid: {"operatorId": outsider, "passengerIds": []}}
+        result = _handle_validate(payload)
+        assert not result["valid"]
+        assert result["errors"] == [leg_error(payload)]
+
+        payload["options"] = {"weights": {"tiebreakFairness": -1}}
+        assert len(_handle_validate(payload)["errors"]) == 2
+
+    def test_group_errors_match_the_solver(self):
+        people = [
+            person("p1", role="counselor", languages=["de"]),
+            person("p2", role="counselor", languages=["fr"]),
+        ]
+        payload = {
+            "target": "solve_groups",
+            "balloons": [balloon("b1", 2, ["p1"]), balloon("b2", 2, [])],
+            "cars": [car("c1", 3, ["p2"]), car("c2", 3, ["p2"], trailer=False)],
+            "people": people,
+            "vehicleGroups": {"b1": ["c1"]},
+        }
+        result = _handle_validate(payload)
+        with pytest.raises(ValueError) as e:
+            solve_vehicle_groups(
+                payload["balloons"], payload["cars"], people, payload["vehicleGroups"]
+            )
+        assert result["errors"][0] == str(e.value)
+        assert result["errors"] == [
+            "not enough trailer-equipped cars for balloons",
+            "Balloon b2 has no eligible operators",
+            "Vehicle group b1 <- c1 is impossible: "
+            "No language-compatible operator pair exists",
+        ]
+
+    def test_does_not_load_ortools(self):
+        payload = json.dumps(make_scenario(2, seed=3))
+        code = (
+            "import json, sys\n"
+            "from solver_main import _handle_validate\n"
+            f"_handle_validate(json.loads({payload!r}))\n"
+            "assert 'ortools' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,185 @@
+"""
+Tests for cancellation and the global deadline (solver_control).
+
+Run with:  pytest test_control.py -v
+"""
+
+import copy
+import threading
+
+import pytest
+from solver_control import SolveCancelled, SolveControl
+from test_solver import BALLOONS, CARS, GROUPS, PEOPLE, balloon, car, person
+from solver_flight_leg import solve_flight_leg
+from solver_local_search import solve_flight_leg_local
+from solver_main import leg_options
+from solver_scenarios import make_scenario
+
+
+class TestSolveControl:
+    def test_time_limit_is_clamped_to_deadline(self):
+        control = SolveControl(deadline_s=10)
+        assert control.time_limit(600) < 10
+        assert control.time_limit(2) == 2
+
+    def test_no_deadline_keeps_time_limit(self):
+        assert SolveControl().time_limit(600) == 600
+
+    def test_check_raises_after_cancel(self):
+        control = SolveControl()
+        control.cancel()
+        with pytest.raises(SolveCancelled):
+            control.check()
+
+
+class TestCancelledSolve:
+    def test_cancel_before_search_raises(self):
+        control = SolveControl()
+        control.cancel()
+        with pytest.raises(SolveCancelled):
+            solve_flight_leg(
+                balloons=BALLOONS,
+                cars=[dict(c) for c in CARS],
+                people=PEOPLE,
+                vehicle_groups=GROUPS,
+                group_history=None,
+                balloon_history=None,
+                people_meet_history=None,
+                frozen={},
+                fixed_groups=None,
+                planning_horizon_legs=0,
+                c_common_language_passengers=False,
+                c_common_language_operators=False,
+                w_pilot_fairness=0,
+                w_passenger_fairness=0,
+                w_tiebreak_fairness=0,
+                w_no_solo_participant=0,
+                w_divers_nationalities=0,
+                w_new_meetings=0,
+                w_group_passenger_balance=0,
+                w_group_rotation=0,
+                w_balloon_rotation=0,
+                w_low_flights_lookahead=0,
+                counselor_flight_discount=0.9,
+                default_person_weight=80,
+                time_limit_s=10,
+                control=control,
+            )
+
+    def test_deadline_is_checked_during_the_build(self):
+        class LateControl(SolveControl):
+            # out of time right after the check before the build
+            checks = 0
+
+            def check(self):
+                self.checks += 1
+                if self.checks > 1:
+                    self.cancel()
+                super().check()
+
+        payload = make_scenario(2, seed=7)
+        options = leg_options(payload, {"workers": 1, "seed": 7})
+        control = LateControl()
+        with pytest.raises(SolveCancelled):
+            solve_flight_leg(
+                payload["balloons"],
+                copy.deepcopy(payload["cars"]),
+                payload["people"],
+                payload["vehicleGroups"],
+                group_history=None,
+                balloon_history=None,
+                people_meet_history=None,
+                frozen={},
+                fixed_groups=None,
+                control=control,
+                **{**options, "time_limit_s": 10},
+            )
+        assert control.checks == 2
+
+    def test_cancel_during_search_returns_best_solution(self):
+        # Large enough that the search does not finish before the cancel lands.
+        n = 12
+        balloons = [balloon(f"b{i}", 4, [f"o{i}", f"o{(i + 1) % n}"]) for i in range(n)]
+        cars = [car(f"c{i}", 8, [f"d{i}"]) for i in range(n)]
+        people = (
+            [person(f"o{i}", role="counselor", flights=i % 3) for i in range(n)]
+            + [person(f"d{i}", role="counselor") for i in range(n)]
+            + [
+                person(f"x{i}", flights=i % 5, nationality="abc"[i % 3])
+                for i in range(60)
+            ]
+        )
+        groups = {f"b{i}": [f"c{i}"] for i in range(n)}
+        control = SolveControl()
+        threading.Timer(1.0, control.cancel).start()
+
+        result = solve_flight_leg(
+            balloons=balloons,
+            cars=cars,
+            people=people,
+            vehicle_groups=groups,
+            group_history=None,
+            balloon_history=None,
+            people_meet_history=None,
+            frozen={},
+            fixed_groups=None,
+            planning_horizon_legs=1,
+            c_common_language_passengers=False,
+            c_common_language_operators=False,
+            w_pilot_fairness=5,
+            w_passenger_fairness=30,
+            w_tiebreak_fairness=1,
+            w_no_solo_participant=100,
+            w_divers_nationalities=3,
+            w_new_meetings=0,
+            w_group_passenger_balance=7,
+            w_group_rotation=0,
+            w_balloon_rotation=0,
+            w_low_flights_lookahead=30,
+            counselor_flight_discount=0.9,
+            default_person_weight=80,
+            time_limit_s=120,
+            num_search_workers=2,
+            random_seed=1,
+            control=control,
+        )
+        assert result["status"] == "cancelled"
+        seated = sum(
+            len(a["passengerIds"]) + (1 if a["operatorId"] else 0)
+            for a in result["assignments"].values()
+        )
+        assert seated == len(people)
+
+
+class TestDeterministicSolve:
+    def _solve(self, solve, **kwargs):
+        payload = make_scenario(2, seed=7)
+        options = leg_options(payload, {"workers": 4, "seed": 7})
+        options["time_limit_s"] = 0.2
+        control = SolveControl(deterministic=True)
+        result = solve(
+            payload["balloons"],
+            copy.deepcopy(payload["cars"]),
+            payload["people"],
+            payload["vehicleGroups"],
+            group_history=payload["groupHistory"],
+            balloon_history=payload["balloonHistory"],
+            people_meet_history=payload["peopleMeetHistory"],
+            frozen={},
+            fixed_groups=payload["fixedGroups"],
+            control=control,
+            **{**options, **kwargs},
+        )
+        assert control.deterministic_seconds > 0
+        return result
+
+    def test_same_plan_twice(self):
+        first, second = self._solve(solve_flight_leg), self._solve(solve_flight_leg)
+        assert first["assignments"] == second["assignments"]
+        assert first["objective"] == second["objective"]
+
+    def test_local_search_counts_moves(self):
+        first = self._solve(solve_flight_leg_local)
+        second = self._solve(solve_flight_leg_local)
+        assert first["iterations"] == second["iterations"]
+        assert first["assignments"] == second["assignments"]
@@ -0,0 +1,119 @@
+"""
+Tests for the model-size and solve-time estimate (solver_estimate) and
+`--mode estimate`.
+
+Run with:  pytest test_estimate.py -v
+"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+from solver_estimate import (
+    MAX_TIME_LIMIT_S,
+    MIN_TIME_LIMIT_S,
+    auto_engine,
+    estimate_leg_model,
+    fit_solve_times,
+    suggest_time_limit,
+)
+from solver_flight_leg import build_flight_leg_model, model_size
+from solver_main import _auto_time_limit, _history_kwargs, leg_options
+from solver_scenarios import SCENARIOS, make_scenario
+
+
+def with_frozen(payload):
+    # a full balloon with its pilot, and two passengers in a car
+    participants = [p["id"] for p in payload["people"] if p["role"] == "participant"]
+    b, c = payload["balloons"][0], payload["cars"][1]
+    payload["preAssignments"] = {
+        b["id"]: {
+            "operatorId": b["allowedOperatorIds"][0],
+            "passengerIds": participants[: b["maxCapacity"] - 1],
+        },
+        c["id"]: {"operatorId": None, "passengerIds": participants[10:12]},
+    }
+    return payload
+
+
+class TestEstimate:
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            make_scenario(**SCENARIOS["small"]),
+            make_scenario(**SCENARIOS["medium"]),
+            make_scenario(**SCENARIOS["large_leg2"]),
+            with_frozen(make_scenario(**SCENARIOS["medium"])),
+        ],
+        ids=["small", "medium", "large_leg2", "frozen"],
+    )
+    def test_counts_match_the_built_model(self, payload, leg_kwargs):
+        kwargs = leg_kwargs(payload, frozen=payload.get("preAssignments"))
+        del kwargs["time_limit_s"], kwargs["num_search_workers"]
+        # the build reserves the group car seats in the cars it is given
+        estimate = estimate_leg_model(**kwargs)
+        built = build_flight_leg_model(**kwargs)
+        actual, total = model_size(built.model), estimate["total"]
+        assert total["variables"] == actual["variables"]
+        assert total["constraints"] == actual["constraints"]
+        # terms whose coefficients cancel out are dropped by CP-SAT
+        for key in ("nonzeros", "objectiveTerms"):
+            assert total[key] == pytest.approx(actual[key], rel=0.01)
+        for key, section in built.sections.items():
+            counted = estimate["sections"].get(key, {}).get("objectiveTerms", 0)
+            assert counted == len(section.vars), key
+
+    def test_fit_recovers_a_power_law(self):
+        runs = [
+            {
+                "nonzeros": n,
+                "secondLeg": second,
+                "goodSeconds": 2e-4 * n**1.1 * (0.05 if second else 1),
+            }
+            for n in (1000, 5000, 20000, 80000)
+            for second in (False, True)
+        ]
+        fit = fit_solve_times(runs)
+        assert fit["exponent"] == pytest.approx(1.1)
+        assert fit["scale"] == pytest.approx(2e-4)
+        assert fit["secondLegFactor"] == pytest.approx(0.05)
+        assert fit["spread"] == pytest.approx(1.0)
+
+    def test_presets(self):
+        fit = {"coefficients": {"spread": 1.5}}
+        assert suggest_time_limit(10.0, fit) == 15
+        assert suggest_time_limit(0.1, fit) == MIN_TIME_LIMIT_S
+        assert suggest_time_limit(None, None) == MAX_TIME_LIMIT_S
+        groups = {"b1": ["c1"], "b2": ["c2"]}
+        assert auto_engine(100, groups, None, expected=10.0) == "flat"
+        slow = 2 * MAX_TIME_LIMIT_S
+        assert auto_engine(100, groups, None, expected=slow) == "hierarchical"
+        assert auto_engine(400, groups, None) == "hierarchical"
+        assert auto_engine(400, groups, {"p1": "b1"}) == "flat"
+
+    def test_auto_time_limit(self):
+        payload = make_scenario(**SCENARIOS["small"])
+        payload["options"]["timeLimit"] = "auto"
+        options = leg_options(payload, {})
+        estimate = _auto_time_limit(payload, _history_kwargs(payload, {}), options)
+        limit = options["time_limit_s"]
+        assert limit == estimate["preset"]["timeLimit"]
+        assert MIN_TIME_LIMIT_S <= limit <= MAX_TIME_LIMIT_S
+        assert limit >= estimate["expectedSeconds"]
+
+        payload["options"]["timeLimit"] = 7
+        options = leg_options(payload, {})
+        assert _auto_time_limit(payload, {}, options) is None
+        assert options["time_limit_s"] == 7
+
+    def test_does_not_load_ortools(self):
+        payload = json.dumps(make_scenario(2, seed=3))
+        code = (
+            "import json, sys\n"
+            "from solver_main import _handle_estimate\n"
+            f"r = _handle_estimate(json.loads({payload!r}), {{}})\n"
+            "assert r['expectedSeconds'] > 0 and r['total']['variables'] > 0\n"
+            "assert 'ortools' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,96 @@
+"""
+Tests for the combinatorial vehicle-group engine (solver_group_search).
+
+Run with:  pytest test_group_search.py -v
+"""
+
+import random
+
+import pytest
+
+import solver_group_search
+from solver_vehicle_group import solve_vehicle_groups
+from solver_verify import unused_car_seats, verify_vehicle_groups
+from test_solver import balloon, car, person
+
+
+def random_instance(rng, balloons, cars):
+    languages = [None, ["de"], ["fr"], ["de", "en"], ["en"]]
+    people = [
+        person(f"o{i}", role="counselor", languages=rng.choice(languages))
+        for i in range(balloons + cars)
+    ]
+    people += [person(f"p{i}") for i in range(rng.randint(0, 30))]
+    ops = [p["id"] for p in people if p["role"] == "counselor"]
+    b = [
+        balloon(f"b{i}", rng.choice([0, 2, 4, 5, 6, 8]), rng.sample(ops, 2))
+        for i in range(balloons)
+    ]
+    c = [
+        car(
+            f"c{i}",
+            rng.choice([1, 3, 5, 7, 9]),
+            rng.sample(ops, 2),
+            trailer=rng.random() < 0.5,
+        )
+        for i in range(cars)
+    ]
+    return b, c, people
+
+
+def solve(*args, **kwargs):
+    try:
+        return solve_vehicle_groups(*args, num_search_workers=8, **kwargs)
+    except (RuntimeError, ValueError) as e:
+        return type(e)
+
+
+class TestGroupSearch:
+    @pytest.mark.parametrize("seed", range(40))
+    def test_same_optimum_as_cp_sat(self, seed):
+        rng = random.Random(seed)
+        b, c, people = random_instance(rng, rng.randint(1, 12), rng.randint(5, 30))
+        frozen = {"b0": ["c0"]} if seed % 4 == 0 else {}
+        found = solve(b, c, people, frozen)
+        expected = solve(b, c, people, frozen, engine="cp-sat")
+        if not isinstance(expected, dict):
+            assert found is expected
+            return
+        assert found["engine"] == "search"
+        assert verify_vehicle_groups(found["vehicleGroups"], b, c, people, frozen) == []
+        assert unused_car_seats(found["vehicleGroups"], c) == unused_car_seats(
+            expected["vehicleGroups"], c
+        )
+
+    def test_needs_distinct_trailers(self):
+        b = [balloon("b1", 2, ["p1"]), balloon("b2", 2, ["p1"])]
+        c = [
+            car("c1", 9, ["p2"]),
+            car("c2", 9, ["p2"], trailer=False),
+            car("c3", 3, ["p2"]),
+        ]
+        people = [person("p1", role="counselor"), person("p2", role="counselor")]
+        result = solve_vehicle_groups(b, c, people)
+        assert result["engine"] == "search"
+        groups = result["vehicleGroups"]
+        assert {"c1", "c3"} & set(groups["b1"]) and {"c1", "c3"} & set(groups["b2"])
+        assert unused_car_seats(groups, c) == 0
+
+    def test_infeasible_cover(self):
+        # 4 + 4 + 2 passenger seats cover 5 + 5 in total, but no split does
+        b = [balloon("b1", 5, ["p1"]), balloon("b2", 5, ["p1"])]
+        c = [
+            car("c1", 5, ["p2"]),
+            car("c2", 5, ["p2"]),
+            car("c3", 3, ["p2"], trailer=False),
+        ]
+        people = [person("p1", role="counselor"), person("p2", role="counselor")]
+        with pytest.raises(RuntimeError, match="No feasible"):
+            solve_vehicle_groups(b, c, people)
+
+    def test_large_instances_go_to_cp_sat(self, monkeypatch):
+        monkeypatch.setattr(solver_group_search, "MAX_CARS", 2)
+        b = [balloon("b1", 2, ["p1"])]
+        c = [car("c1", 3, ["p2"]), car("c2", 3, ["p2"]), car("c3", 3, ["p2"])]
+        people = [person("p1", role="counselor"), person("p2", role="counselor")]
+        assert solve_vehicle_groups(b, c, people)["engine"] == "cp-sat"
@@ -0,0 +1,98 @@
+"""
+Tests for the group-first engine (solver_hierarchical).
+
+Run with:  pytest test_hierarchical.py -v
+"""
+
+import pytest
+
+from solver_history import occupants, vehicle_to_group
+from solver_hierarchical import (
+    choose_engine,
+    combine_breakdowns,
+    solve_flight_leg_hierarchical,
+)
+from solver_main import leg_options
+from solver_scenarios import make_scenario
+
+
+class TestChooseEngine:
+    def test_auto_depends_on_size_and_leg(self):
+        groups = {"b1": ["c1"], "b2": ["c2"]}
+        few = [{"id": str(i)} for i in range(10)]
+        many = [{"id": str(i)} for i in range(400)]
+        assert choose_engine("auto", few, groups, {}) == "flat"
+        assert choose_engine("auto", many, groups, {}) == "hierarchical"
+        # later legs keep their groups, nothing to decompose
+        assert choose_engine("auto", many, groups, {"0": "b1"}) == "flat"
+        assert choose_engine("hierarchical", few, groups, None) == "hierarchical"
+        assert choose_engine("local", many, groups, {"0": "b1"}) == "local"
+        assert choose_engine("staged", few, groups, None) == "staged"
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            choose_engine("greedy", [], {}, None)
+
+
+class TestHierarchicalLeg:
+    def test_every_person_seated_within_one_group(self):
+        payload = make_scenario(4, seed=7)
+        options = leg_options(payload, {"workers": 4, "seed": 42})
+        options["time_limit_s"] = 5
+        result = solve_flight_leg_hierarchical(
+            balloons=payload["balloons"],
+            cars=payload["cars"],
+            people=payload["people"],
+            vehicle_groups=payload["vehicleGroups"],
+            group_history=payload["groupHistory"],
+            balloon_history=payload["balloonHistory"],
+            people_meet_history=payload["peopleMeetHistory"],
+            frozen={},
+            fixed_groups={},
+            **options,
+        )
+        assert result["engine"] == "hierarchical"
+        assert {"top", "groups"} <= set(result["timings"])
+
+        seated = [p for a in result["assignments"].values() for p in occupants(a)]
+        assert sorted(seated) == sorted(p["id"] for p in payload["people"])
+        group_of = vehicle_to_group(payload["vehicleGroups"])
+        assert set(group_of) == set(result["assignments"])
+
+    @pytest.mark.parametrize(
+        "assignment, message",
+        [
+            ({"operatorId": "part0", "passengerIds": []}, "not an eligible operator"),
+            ({"operatorId": None, "passengerIds": ["ghost"]}, "unknown people: ghost"),
+        ],
+    )
+    def test_bad_frozen_seats_are_reported(self, assignment, message):
+        payload = make_scenario(4, seed=7)
+        options = leg_options(payload, {"workers": 4, "seed": 42})
+        bid = next(iter(payload["vehicleGroups"]))
+        with pytest.raises(ValueError, match=message):
+            solve_flight_leg_hierarchical(
+                balloons=payload["balloons"],
+                cars=payload["cars"],
+                people=payload["people"],
+                vehicle_groups=payload["vehicleGroups"],
+                group_history=None,
+                balloon_history=None,
+                people_meet_history=None,
+                frozen={bid: assignment},
+                fixed_groups={},
+                **options,
+            )
+
+    def test_combine_breakdowns_sums_sections(self):
+        part = {
+            "value": -3.0,
+            "bound": -4.0,
+            "terms": {"3.1": {"weight": "pilotFairness", "raw": -1.0, "value": -3.0}},
+            "stats": {"soloParticipantCars": 1},
+        }
+        combined = combine_breakdowns([part, part])
+        assert combined["value"] == -6.0
+        assert combined["bound"] is None
+        assert combined["terms"]["3.1"]["raw"] == -2.0
+        assert combined["stats"]["soloParticipantCars"] == 2
@@ -0,0 +1,74 @@
+"""
+Tests for the SQLite history store (solver_history_store).
+
+Run with:  pytest test_history_store.py -v
+"""
+
+import pytest
+
+from solver_history import CampHistory
+from solver_history_store import HistoryStore, HistoryVersionError
+
+GROUPS = {"b1": ["c1"], "b2": ["c2"]}
+BALLOONS = ["b1", "b2"]
+LEG_1 = {
+    "b1": {"operatorId": "p1", "passengerIds": ["a"]},
+    "c1": {"operatorId": "p3", "passengerIds": ["b"]},
+    "b2": {"operatorId": "p2", "passengerIds": ["c"]},
+    "c2": {"operatorId": "p4", "passengerIds": []},
+}
+LEG_2 = {
+    "b1": {"operatorId": "p1", "passengerIds": ["b"]},
+    "c1": {"operatorId": "p3", "passengerIds": ["a"]},
+    "b2": {"operatorId": "p2", "passengerIds": ["c"]},
+    "c2": {"operatorId": "p4", "passengerIds": []},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = HistoryStore(str(tmp_path / "history.db"))
+    yield s
+    s.close()
+
+
+def ingest_day(store, day_id):
+    store.ingest_leg("camp", day_id, "am", LEG_1, GROUPS, BALLOONS, first_leg=True)
+    return store.ingest_leg(
+        "camp", day_id, "pm", LEG_2, GROUPS, BALLOONS, first_leg=False
+    )
+
+
+class TestHistoryStore:
+    def test_matches_in_memory_history(self, store):
+        ingest_day(store, "mon")
+        expected = CampHistory()
+        for leg in (LEG_1, LEG_2):
+            expected.record_leg(leg, BALLOONS)
+        expected.record_day([LEG_1, LEG_2], GROUPS, BALLOONS)
+
+        loaded = store.load("camp")
+        assert dict(loaded.flights_so_far) == dict(expected.flights_so_far)
+        assert loaded.group_history == expected.group_history
+        assert loaded.balloon_history == expected.balloon_history
+        assert loaded.people_meet_history == expected.people_meet_history
+
+    def test_current_day_only_counts_flights(self, store):
+        ingest_day(store, "mon")
+        store.ingest_leg("camp", "tue", "am", LEG_1, GROUPS, BALLOONS, first_leg=True)
+
+        loaded = store.load("camp", current_day="tue")
+        assert loaded.flights_so_far["a"] == 2
+        assert loaded.balloon_history["a"] == {"b1": 1}
+        assert loaded.group_history["a"] == {"b1": 1}
+
+    def test_reingesting_a_leg_is_ignored(self, store):
+        assert ingest_day(store, "mon") == 2
+        assert ingest_day(store, "mon") == 2
+        assert store.load("camp").flights_so_far["p1"] == 2
+
+    def test_version_mismatch_is_rejected(self, store):
+        ingest_day(store, "mon")
+        store.load("camp", version=2)
+        with pytest.raises(HistoryVersionError):
+            store.load("camp", version=1)
@@ -0,0 +1,131 @@
+"""
+Tests for the local-search engine (solver_local_search).
+
+Run with:  pytest test_local_search.py -v
+"""
+
+import numpy as np
+import pytest
+
+from solver_control import SolveControl
+from solver_history import occupants
+from solver_local_search import (
+    LegInstance,
+    LocalSearch,
+    evaluate_manifest,
+    solve_flight_leg_local,
+)
+from solver_main import leg_options
+from solver_scenarios import make_scenario
+from test_solver import balloon, car, person
+
+
+@pytest.fixture
+def solve(leg_kwargs):
+    def run(payload, seed=1, frozen=None):
+        kwargs = leg_kwargs(
+            payload, seed=seed, workers=1, time_limit_s=2, frozen=frozen
+        )
+        result = solve_flight_leg_local(**kwargs)
+        kwargs.pop("time_limit_s")
+        return result, evaluate_manifest(result["assignments"], **kwargs)
+
+    return run
+
+
+class TestLocalSearch:
+    def test_feasible_and_everyone_seated(self, solve):
+        payload = make_scenario(4, seed=7)
+        result, score = solve(payload)
+        assert result["engine"] == "local"
+        assert result["status"] == "feasible"
+        assert result["objective"]["bound"] is None
+        assert score["violations"] == 0
+        assert score["value"] == result["objective"]["value"]
+        seated = [p for a in result["assignments"].values() for p in occupants(a)]
+        assert sorted(seated) == sorted(p["id"] for p in payload["people"])
+
+    def test_frozen_vehicle_is_kept(self, solve):
+        payload = make_scenario(4, seed=7)
+        first, _ = solve(payload)
+        bid = next(iter(payload["vehicleGroups"]))
+        frozen = {bid: first["assignments"][bid]}
+        result, score = solve(payload, seed=2, frozen=frozen)
+        assert score["violations"] == 0
+        assert result["assignments"][bid]["operatorId"] == frozen[bid]["operatorId"]
+        assert sorted(result["assignments"][bid]["passengerIds"]) == sorted(
+            frozen[bid]["passengerIds"]
+        )
+
+    def test_later_leg_keeps_fixed_groups(self, solve):
+        payload = make_scenario(4, seed=7, second_leg=True)
+        result, score = solve(payload)
+        assert score["violations"] == 0
+        group_of = {b: b for b in payload["vehicleGroups"]}
+        group_of.update(
+            {c: b for b, cars in payload["vehicleGroups"].items() for c in cars}
+        )
+        for vid, a in result["assignments"].items():
+            for p in occupants(a):
+                assert payload["fixedGroups"][p] == group_of[vid]
+
+    @pytest.mark.parametrize("second_leg", [False, True])
+    def test_counters_match_a_full_evaluation(self, leg_kwargs, second_leg):
+        payload = make_scenario(4, seed=7, second_leg=second_leg)
+        inst = LegInstance(**leg_kwargs(payload))
+        # contacts (first leg only) and low flyers are counted
+        assert inst.weights[9] and (second_leg or inst.weights[5])
+        search = LocalSearch(inst, seed=3)
+        for _ in range(3000):
+            search.step(temperature=1e9)  # accept nearly every move
+        seat, operator = np.array(search.seat), np.array(search.operator)
+        costs = [
+            inst.vehicle_terms(v, np.flatnonzero(seat == v), int(operator[v]))
+            for v in range(len(inst.vehicle_ids))
+        ]
+        costs += [inst.group_terms(g, seat, operator) for g in range(len(inst.groups))]
+        assert search.total == pytest.approx(sum(inst.cost(*c) for c in costs))
+        assert search.violations == sum(viol for viol, _ in costs)
+
+    def test_feasible_within_a_short_budget(self, leg_kwargs):
+        # 44 people in 4 groups; counted in moves, so machine speed does not matter
+        payload = make_scenario(4, seed=7)
+        kwargs = leg_kwargs(payload, seed=1, workers=1, time_limit_s=0.1)
+        control = SolveControl(deterministic=True)
+        result = solve_flight_leg_local(**kwargs, control=control)
+        assert result["iterations"] == 5000
+        assert result["status"] == "feasible"
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_frozen_passenger_never_operates(self, seed):
+        # p0 may operate b1 but is frozen as its passenger, so p2 must operate
+        balloons = [balloon("b1", 3, ["p0", "p2"])]
+        cars = [car("c1", 4, ["d1"])]
+        people = [
+            person("p0", role="counselor"),
+            person("p2", role="counselor", flights=5),
+            person("d1", role="counselor"),
+            person("x1"),
+        ]
+        kwargs = dict(
+            group_history=None,
+            balloon_history=None,
+            people_meet_history=None,
+            frozen={"b1": {"operatorId": None, "passengerIds": ["p0"]}},
+            fixed_groups=None,
+            **leg_options({}, {"workers": 1, "seed": seed}),
+        )
+        kwargs["time_limit_s"] = 1
+        result = solve_flight_leg_local(
+            balloons, cars, people, {"b1": ["c1"]}, **kwargs
+        )
+        assert result["assignments"]["b1"]["operatorId"] == "p2"
+        assert "p0" in result["assignments"]["b1"]["passengerIds"]
+
+        # both operators of b1 frozen as passengers: no plan, as with CP-SAT
+        kwargs["frozen"] = {
+            "b1": {"operatorId": None, "passengerIds": ["p0"]},
+            "c1": {"operatorId": None, "passengerIds": ["p2"]},
+        }
+        with pytest.raises(RuntimeError):
+            solve_flight_leg_local(balloons, cars, people, {"b1": ["c1"]}, **kwargs)
@@ -0,0 +1,95 @@
+"""
+Tests for the on-disk model cache (solver_model_cache).
+
+Run with:  pytest test_model_cache.py -v
+"""
+
+import pytest
+
+from solver_model_cache import ModelCache
+from solver_scenarios import make_scenario
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = ModelCache(str(tmp_path / "models.db"))
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def solve(solve_leg):
+    def run(payload, cache, *, seed=42, frozen=None, aggregate_classes=False):
+        return solve_leg(
+            payload,
+            seed=seed,
+            frozen=frozen,
+            model_cache=cache,
+            aggregate_classes=aggregate_classes,
+        )
+
+    return run
+
+
+class TestModelCache:
+    def test_hit_gives_the_same_optimum(self, cache, solve):
+        payload = make_scenario(2, participants_per_group=4, seed=3)
+        first = solve(payload, cache)
+        second = solve(payload, cache)
+        uncached = solve(payload, None)
+        assert first["modelCache"]["hit"] is False
+        assert second["modelCache"]["hit"] is True
+        assert "modelCache" not in uncached
+        assert second["status"] == uncached["status"] == "optimal"
+        assert second["objective"]["value"] == uncached["objective"]["value"]
+        assert cache.stats()["hitRate"] == 0.5
+
+    def test_other_seed_misses(self, cache, solve):
+        # the seed's shuffles are the variable order of the stored model
+        payload = make_scenario(2, participants_per_group=4, seed=3)
+        solve(payload, cache)
+        assert solve(payload, cache, seed=7)["modelCache"]["hit"] is False
+        assert solve(payload, cache, seed=7)["modelCache"]["hit"] is True
+
+    def test_frozen_seats_and_weights_reuse_the_structure(self, cache, solve):
+        payload = make_scenario(2, participants_per_group=4, seed=3)
+        first = solve(payload, cache)
+        bid = next(iter(payload["vehicleGroups"]))
+        frozen = {bid: first["assignments"][bid]}
+        payload["options"]["weights"] = {"pilotFairness": 0}
+        second = solve(payload, cache, frozen=frozen)
+        assert second["modelCache"]["hit"] is True
+        assert second["assignments"][bid] == frozen[bid]
+
+    def test_frozen_seats_stay_constraints_with_a_cache(self, cache, solve):
+        # without a cache frozen people leave the model; same optimum
+        payload = make_scenario(2, participants_per_group=4, seed=3)
+        first = solve(payload, None)
+        frozen = {
+            vid: {"operatorId": a["operatorId"], "passengerIds": a["passengerIds"][::2]}
+            for vid, a in first["assignments"].items()
+        }
+        cached = solve(payload, cache, frozen=frozen)
+        eliminated = solve(payload, None, frozen=frozen)
+        assert cached["status"] == eliminated["status"] == "optimal"
+        assert eliminated["objective"]["value"] == pytest.approx(
+            cached["objective"]["value"]
+        )
+        assert set(eliminated["objective"]["terms"]) == set(
+            cached["objective"]["terms"]
+        )
+
+    def test_changed_structure_misses(self, cache, solve):
+        payload = make_scenario(2, participants_per_group=4, seed=3)
+        solve(payload, cache)
+        payload["cars"][0] = {**payload["cars"][0], "maxCapacity": 9}
+        assert solve(payload, cache)["modelCache"]["hit"] is False
+        assert cache.stats()["entries"] == 2
+
+    def test_classes(self, cache, solve):
+        payload = make_scenario(2, participants_per_group=6, seed=3, with_history=False)
+        solve(payload, cache, aggregate_classes=True)
+        second = solve(payload, cache, aggregate_classes=True)
+        uncached = solve(payload, None, aggregate_classes=True)
+        assert second["modelCache"]["hit"] is True
+        assert second["objective"]["value"] == uncached["objective"]["value"]
@@ -0,0 +1,105 @@
+"""
+Model-size regression budgets for solve_flight_leg.
+
+Builds (never solves) the leg model for the fixed scenarios in
+solver_scenarios.SCENARIOS and compares variable / constraint / non-zero /
+objective-term counts and build time against model_size_baselines.json.
+
+Run with:  pytest test_model_size.py -v -s   (prints the diff table)
+Refresh :  UPDATE_MODEL_BASELINES=1 pytest test_model_size.py
+           (only after an intended model change; commit the new file)
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+from solver_flight_leg import build_flight_leg_model, model_size
+from solver_main import leg_options
+from solver_scenarios import SCENARIOS, make_scenario
+
+BASELINE_FILE = Path(__file__).with_name("model_size_baselines.json")
+UPDATE = os.environ.get("UPDATE_MODEL_BASELINES") == "1"
+
+# counts may grow by 10% before the test fails; build time is noisy, so it
+# gets 3x the baseline plus one second
+COUNT_TOLERANCE = 0.10
+TIME_FACTOR = 3.0
+TIME_SLACK_S = 1.0
+
+
+def build(payload):
+    kwargs = leg_options(payload, {"seed": 42})
+    kwargs.pop("time_limit_s")
+    kwargs.pop("num_search_workers")
+    started = time.perf_counter()
+    built = build_flight_leg_model(
+        payload["balloons"],
+        [dict(c) for c in payload["cars"]],
+        payload["people"],
+        payload["vehicleGroups"],
+        group_history=payload.get("groupHistory"),
+        balloon_history=payload.get("balloonHistory"),
+        people_meet_history=payload.get("peopleMeetHistory"),
+        frozen=payload.get("preAssignments"),
+        fixed_groups=payload.get("fixedGroups"),
+        **kwargs,
+    )
+    return {**model_size(built.model), "buildSeconds": time.perf_counter() - started}
+
+
+def load_baselines():
+    if not BASELINE_FILE.exists():
+        return {}
+    return json.loads(BASELINE_FILE.read_text())
+
+
+BASELINES = load_baselines()
+MEASURED = {}
+
+
+def diff_table(name, measured, baseline):
+    rows = [f"model size [{name}]"]
+    for key, value in measured.items():
+        old = baseline.get(key)
+        if old is None:
+            rows.append(f"  {key:<15} {value!s:>10}  (no baseline)")
+        elif key == "buildSeconds":
+            rows.append(f"  {key:<15} {value:>10.3f}  baseline {old:.3f}")
+        else:
+            change = (value - old) / old * 100 if old else 0.0
+            rows.append(f"  {key:<15} {value:>10}  baseline {old:>10}  {change:+6.1f}%")
+    return "\n".join(rows)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def write_baselines():
+    yield
+    if UPDATE and MEASURED:
+        rounded = {
+            name: {**m, "buildSeconds": round(m["buildSeconds"], 3)}
+            for name, m in MEASURED.items()
+        }
+        BASELINE_FILE.write_text(json.dumps(rounded, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_model_size_within_budget(name):
+    measured = build(make_scenario(**SCENARIOS[name]))
+    MEASURED[name] = measured
+    baseline = BASELINES.get(name, {})
+    table = diff_table(name, measured, baseline)
+    print(table)
+
+    if UPDATE:
+        return
+    assert baseline, f"no baseline for {name}; run with UPDATE_MODEL_BASELINES=1"
+
+    for key in ("variables", "constraints", "nonzeros", "objectiveTerms"):
+        budget = baseline[key] * (1 + COUNT_TOLERANCE)
+        assert measured[key] <= budget, f"{key} over budget\n{table}"
+
+    time_budget = baseline["buildSeconds"] * TIME_FACTOR + TIME_SLACK_S
+    assert measured["buildSeconds"] <= time_budget, f"build time over budget\n{table}"
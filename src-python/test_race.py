@@ -0,0 +1,137 @@
+"""
+Tests for multi-seed races of one leg (solver_race, `solve_leg --race`) and
+the incumbent stream they are built on.
+
+Run with:  pytest test_race.py -v
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import time
+
+import pytest
+
+from solver_control import SolveControl
+from solver_flight_leg import score_flight_leg, solve_flight_leg
+from solver_main import _handle_race_leg
+from solver_race import _Runner
+from solver_scenarios import SCENARIOS, make_scenario
+from solver_verify import verify_leg
+
+
+class TestRace:
+    def test_tiebreak_seed_keeps_the_objective(self, leg_kwargs):
+        payload = make_scenario(2, seed=3)
+        kwargs = leg_kwargs(payload, seed=7, workers=2, time_limit_s=5)
+        manifest = solve_flight_leg(**kwargs)["assignments"]
+
+        def score(seed, tiebreak_seed):
+            kwargs = leg_kwargs(payload, seed=seed, workers=2, time_limit_s=5)
+            kwargs["tiebreak_seed"] = tiebreak_seed
+            return score_flight_leg(manifest, **kwargs)["terms"]["3.8"]
+
+        assert score(8, 7)["raw"] == score(7, None)["raw"]
+        assert score(8, None)["raw"] != score(7, None)["raw"]
+
+    def test_reports_incumbents(self, run_main):
+        payload = make_scenario(2, seed=3)
+        payload["options"]["timeLimit"] = 5
+        *progress, result = run_main(
+            "solve_leg", payload, "--report-incumbents", "--workers", "2", stream=True
+        )
+        incumbents = [p for p in progress if p["type"] == "incumbent"]
+        assert incumbents and {p["type"] for p in progress} <= {"incumbent", "bound"}
+        objectives = [p["objective"] for p in incumbents]
+        assert objectives == sorted(objectives, reverse=True)
+        assert objectives[-1] == pytest.approx(result["objective"]["value"])
+        assert "type" not in result
+
+    def test_returns_the_best_seed(self, run_main):
+        payload = make_scenario(2, seed=3)
+        payload["options"].update(timeLimit=5, raceGap=0)
+        result = run_main(
+            "solve_leg", payload, "--race", 2, "--workers", 2, "--seed", 5
+        )
+        race = result["race"]
+        assert [s["seed"] for s in race["seeds"]] == [5, 6]
+        objectives = {s["seed"]: s["objective"] for s in race["seeds"]}
+        assert result["objective"]["value"] == min(objectives.values())
+        assert objectives[race["seed"]] == result["objective"]["value"]
+        assert result["status"] in ("optimal", "feasible")
+        assert not verify_leg(
+            result["assignments"],
+            payload["balloons"],
+            payload["cars"],
+            payload["people"],
+            payload["vehicleGroups"],
+        )
+
+    def test_stops_once_the_gap_closes(self, run_main):
+        payload = make_scenario(2, seed=3)
+        payload["options"].update(timeLimit=60, raceGap=1e9)
+        result = run_main("solve_leg", payload, "--race", 2, "--workers", 2)
+        assert result["status"] == "feasible"
+        assert result["timings"]["race"] < 30
+
+    def test_cancel_reaches_every_seed(self):
+        payload = make_scenario(**SCENARIOS["medium"])
+        payload["options"].update(timeLimit=120, raceGap=0)
+        proc = subprocess.Popen(
+            [
+                sys.executable,
+                "solver_main.py",
+                "--mode",
+                "solve_leg",
+                "--race",
+                "2",
+                "--workers",
+                "2",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        proc.stdin.write(json.dumps(payload) + "\n")
+        proc.stdin.flush()
+        time.sleep(10)
+        proc.stdin.write(json.dumps({"type": "cancel"}) + "\n")
+        proc.stdin.flush()
+        result = json.loads(proc.communicate(timeout=30)[0].splitlines()[-1])
+        assert result["status"] == "cancelled"
+        assert all(s["status"] == "cancelled" for s in result["race"]["seeds"])
+
+    def test_chatty_stderr_does_not_block_a_seed(self):
+        # far more than a pipe buffer of log lines before the structured error
+        child = (
+            "import json, sys\n"
+            "sys.stdin.readline()\n"
+            "for i in range(20000): print('log line', i, file=sys.stderr)\n"
+            "print(json.dumps({'type': 'bound', 'bound': 1}))\n"
+            "print(json.dumps({'message': 'boom'}), file=sys.stderr)\n"
+            "sys.exit(1)\n"
+        )
+        events = queue.Queue()
+        runner = _Runner(0, [sys.executable, "-c", child], "{}\n", events)
+        assert events.get(timeout=30)[1] == {"type": "bound", "bound": 1}
+        assert events.get(timeout=30) == (runner, None)
+        assert runner.error == "boom"
+
+    @pytest.mark.parametrize(
+        "options, args",
+        [
+            ({"engine": "local"}, {}),
+            ({"deterministicTime": 5}, {}),
+            ({}, {"checkpoint_dir": "checkpoints"}),
+            ({}, {"model_cache": "models.db"}),
+        ],
+    )
+    def test_rejects(self, options, args):
+        payload = make_scenario(2, seed=3)
+        payload["options"].update(options)
+        control = SolveControl(deterministic="deterministicTime" in options)
+        with pytest.raises(ValueError):
+            _handle_race_leg(payload, {"race": 2, **args}, control)
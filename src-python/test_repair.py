@@ -0,0 +1,128 @@
+"""
+Tests for minimal-change repairs (solver_repair).
+
+Run with:  pytest test_repair.py -v
+"""
+
+import pytest
+
+import solver_repair
+from solver_control import SolveControl
+from solver_flight_leg import score_flight_leg
+from solver_repair import repair_flight_leg
+from test_season import LEG_OPTIONS
+from test_solver import balloon, car, person
+
+# two groups; p1/p5 can fly b1, p2 b2, p3/p4 drive
+BALLOONS = [balloon("b1", 2, ["p1", "p5"]), balloon("b2", 2, ["p2"])]
+CARS = [car("c1", 9, ["p3", "p5"]), car("c2", 5, ["p4"])]
+GROUPS = {"b1": ["c1"], "b2": ["c2"]}
+PEOPLE = [
+    person("p1", role="counselor"),
+    person("p2", role="counselor"),
+    person("p3", role="counselor"),
+    person("p4", role="counselor"),
+    person("p5", role="counselor"),
+    person("a"),
+    person("b"),
+    person("c"),
+    person("d"),
+]
+MANIFEST = {
+    "b1": {"operatorId": "p1", "passengerIds": ["a"]},
+    "c1": {"operatorId": "p3", "passengerIds": ["p5", "b"]},
+    "b2": {"operatorId": "p2", "passengerIds": ["c"]},
+    "c2": {"operatorId": "p4", "passengerIds": ["d"]},
+}
+
+
+def repair(changes, people=PEOPLE, control=None):
+    return repair_flight_leg(
+        BALLOONS,
+        CARS,
+        people,
+        GROUPS,
+        manifest=MANIFEST,
+        changes=changes,
+        group_history=None,
+        balloon_history=None,
+        people_meet_history=None,
+        fixed_groups={},
+        control=control,
+        **{**LEG_OPTIONS, "time_limit_s": 5},
+    )
+
+
+class TestRepairLeg:
+    def test_sick_pilot_is_replaced_inside_the_group(self):
+        result = repair({"removedPersonIds": ["p1"]})
+        assert result["assignments"]["b1"]["operatorId"] == "p5"
+        # the other group is frozen as it was
+        assert result["assignments"]["b2"] == MANIFEST["b2"]
+        assert result["assignments"]["c2"] == MANIFEST["c2"]
+        assert result["moved"] == ["p5"]
+        assert result["freedVehicles"] == ["b1", "c1"]
+
+    def test_broken_car_grounds_its_balloon(self):
+        # without c2 nobody can retrieve b2; its crew joins group b1
+        result = repair({"unavailableVehicleIds": ["c2"]})
+        assert "b2" not in result["assignments"]
+        assert "c2" not in result["assignments"]
+        assert set(result["moved"]) == {"p2", "p4", "c", "d"}
+        assert result["assignments"]["b1"] == MANIFEST["b1"]
+
+    def test_added_person_gets_a_free_seat_without_moves(self):
+        people = PEOPLE + [person("e")]
+        result = repair({"addedPersonIds": ["e"]}, people=people)
+        seated = [
+            p
+            for a in result["assignments"].values()
+            for p in [a["operatorId"], *a["passengerIds"]]
+        ]
+        assert "e" in seated
+        assert result["moved"] == []
+
+    def test_cancel_after_the_fewest_moves_keeps_the_leg_objective(self, monkeypatch):
+        control = SolveControl()
+        stages = []
+
+        def solve_built_leg(built, **kwargs):
+            stages.append(kwargs["control"])
+            result = solve_built_leg.__wrapped__(built, **kwargs)
+            control.cancel()
+            return result
+
+        solve_built_leg.__wrapped__ = solver_repair.solve_built_leg
+        monkeypatch.setattr(solver_repair, "solve_built_leg", solve_built_leg)
+        people = [p for p in PEOPLE if p["id"] != "p1"]
+        result = repair({"removedPersonIds": ["p1"]}, people, control)
+        # the second stage is skipped; only a score runs on its own control
+        assert len(stages) == 2 and stages[1] is not control
+        assert result["status"] == "cancelled"
+        assert len(result["moved"]) == 1
+        assert_leg_objective(result, people)
+
+    def test_no_second_stage_without_time(self, monkeypatch):
+        monkeypatch.setattr(solver_repair, "STAGE_TWO_MIN_S", 60)
+        people = [p for p in PEOPLE if p["id"] != "p1"]
+        result = repair({"removedPersonIds": ["p1"]}, people)
+        assert result["status"] == "feasible"
+        assert len(result["moved"]) == 1
+        assert_leg_objective(result, people)
+
+
+def assert_leg_objective(result, people):
+    score = score_flight_leg(
+        result["assignments"],
+        BALLOONS,
+        CARS,
+        people,
+        GROUPS,
+        group_history=None,
+        balloon_history=None,
+        people_meet_history=None,
+        fixed_groups={},
+        **{**LEG_OPTIONS, "time_limit_s": 5},
+    )
+    assert result["objective"]["value"] == pytest.approx(score["value"])
+    assert set(result["objective"]["terms"]) == set(score["terms"])
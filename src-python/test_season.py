@@ -0,0 +1,122 @@
+"""
+Tests for the multi-day planner (solver_season) and the history roll-forward.
+
+Run with:  pytest test_season.py -v
+"""
+
+from solver_history import CampHistory, fixed_groups_from_manifest
+from solver_season import plan_season
+from test_solver import balloon, car, person
+
+BALLOONS = [balloon("b1", 2, ["p1"]), balloon("b2", 2, ["p2"])]
+CARS = [car("c1", 5, ["p3"]), car("c2", 5, ["p4"])]
+PEOPLE = [
+    person("p1", role="counselor"),
+    person("p2", role="counselor"),
+    person("p3", role="counselor"),
+    person("p4", role="counselor"),
+    person("a"),
+    person("b"),
+    person("c"),
+    person("d"),
+]
+LEG_OPTIONS = dict(
+    planning_horizon_legs=0,
+    c_common_language_passengers=False,
+    c_common_language_operators=False,
+    w_pilot_fairness=0,
+    w_passenger_fairness=50,
+    w_tiebreak_fairness=0,
+    w_no_solo_participant=0,
+    w_divers_nationalities=0,
+    w_new_meetings=0,
+    w_group_passenger_balance=0,
+    w_group_rotation=0,
+    w_balloon_rotation=0,
+    w_low_flights_lookahead=0,
+    counselor_flight_discount=0.9,
+    default_person_weight=80,
+    time_limit_s=10,
+    random_seed=42,
+)
+
+
+def _plan(days, on_leg=None):
+    return plan_season(
+        BALLOONS, CARS, PEOPLE, days, leg_options=LEG_OPTIONS, on_leg=on_leg
+    )
+
+
+class TestCampHistory:
+    def test_record_leg_counts_balloon_seats_only(self):
+        history = CampHistory()
+        history.record_leg(
+            {
+                "b1": {"operatorId": "p1", "passengerIds": ["a"]},
+                "c1": {"operatorId": "p3", "passengerIds": ["b"]},
+            },
+            ["b1"],
+        )
+        assert history.flights_so_far["p1"] == 1
+        assert history.flights_so_far["a"] == 1
+        assert history.flights_so_far["b"] == 0
+
+    def test_record_day_uses_first_leg_for_groups_and_meetings(self):
+        history = CampHistory()
+        groups = {"b1": ["c1"]}
+        leg1 = {
+            "b1": {"operatorId": "p1", "passengerIds": ["a"]},
+            "c1": {"operatorId": "p3", "passengerIds": ["b"]},
+        }
+        leg2 = {
+            "b1": {"operatorId": "p1", "passengerIds": ["b"]},
+            "c1": {"operatorId": "p3", "passengerIds": ["a"]},
+        }
+        history.record_day([leg1, leg2], groups, ["b1"])
+        assert history.group_history["a"] == {"b1": 1}
+        assert history.people_meet_history["a"]["b"] == 1
+        assert history.people_meet_history["b"]["a"] == 1
+        assert history.balloon_history["a"] == {"b1": 1}
+        assert history.balloon_history["b"] == {"b1": 1}
+        assert history.balloon_history["p1"] == {"b1": 2}
+
+    def test_fixed_groups_from_manifest(self):
+        manifest = {
+            "b1": {"operatorId": "p1", "passengerIds": []},
+            "c1": {"operatorId": "p3", "passengerIds": ["a"]},
+        }
+        assert fixed_groups_from_manifest(manifest, {"b1": ["c1"]}) == {
+            "p1": "b1",
+            "p3": "b1",
+            "a": "b1",
+        }
+
+
+class TestPlanSeason:
+    def test_streams_every_leg_and_rolls_flight_counts(self):
+        streamed = []
+        result = _plan([{"legs": [{}, {}]}, {"legs": [{}, {}]}], on_leg=streamed.append)
+
+        assert [(m["day"], m["leg"]) for m in streamed] == [
+            (0, 0),
+            (0, 1),
+            (1, 0),
+            (1, 1),
+        ]
+        # 4 legs × 2 balloons × 2 seats
+        assert sum(result["flightsSoFar"].values()) == 16
+
+    def test_second_leg_keeps_people_in_their_group(self):
+        result = _plan([{"legs": [{}, {}]}])
+        day = result["days"][0]
+        fixed = fixed_groups_from_manifest(
+            day["legs"][0]["assignments"], day["vehicleGroups"]
+        )
+        second = fixed_groups_from_manifest(
+            day["legs"][1]["assignments"], day["vehicleGroups"]
+        )
+        assert second == fixed
+
+    def test_canceled_balloon_is_skipped(self):
+        result = _plan([{"legs": [{"canceledBalloonIds": ["b2"]}]}])
+        assert "b2" not in result["days"][0]["legs"][0]["assignments"]
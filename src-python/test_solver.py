@@ -9,7 +9,7 @@ seats from the car before the solver runs, so each car needs:
 """
 import copy
 import pytest
-from solver_flight_leg import solve_flight_leg
+from solver_flight_leg import equivalence_classes, solve_flight_leg
 from solver_vehicle_group import solve_vehicle_groups
 
 
@@ -78,6 +78,7 @@ def solve(
     c_common_language_operators=False,
     time_limit_s=30,
     random_seed=42,
+    aggregate_classes=False,
 ):
     # Deep-copy to prevent reserve_group_car_seats from mutating shared fixtures.
     return solve_flight_leg(
@@ -107,6 +108,7 @@ def solve(
         default_person_weight=default_person_weight,
         time_limit_s=time_limit_s,
         random_seed=random_seed,
+        aggregate_classes=aggregate_classes,
     )
 
 
@@ -258,6 +260,38 @@ class TestFrozenAssignments:
         )
         assert "p4" in occupants(result, "c1")
 
+    def test_fully_frozen_vehicle_keeps_its_objective_terms(self):
+        people = [
+            person("pilot", role="counselor", flights=2, nationality="fr"),
+            person("driver", role="counselor", flights=1),
+            person("p3"), person("p4", flights=3),
+            person("p5", flights=1, nationality="fr"),
+        ]
+        b = [balloon("b1", 3, ["pilot"])]
+        c = [car("c1", 6, ["driver"])]
+        weights = dict(w_pilot_fairness=5, w_passenger_fairness=30,
+                       w_no_solo_participant=100, w_divers_nationalities=3)
+        free = solve(b, c, people, {"b1": ["c1"]}, **weights)
+        frozen = solve(b, c, people, {"b1": ["c1"]},
+                       frozen={"b1": free["assignments"]["b1"]}, **weights)
+        assert frozen["objective"]["value"] == pytest.approx(free["objective"]["value"])
+        assert set(frozen["objective"]["terms"]) == set(free["objective"]["terms"])
+
+    def test_frozen_language_mismatch_is_infeasible(self):
+        people = [person("p1", role="counselor", languages=["de"]),
+                  person("p2", role="counselor"), person("p3", languages=["fr"]),
+                  person("p4"), person("p5")]
+        with pytest.raises(RuntimeError, match="No feasible"):
+            solve(BALLOONS, CARS, people, GROUPS,
+                  frozen={"b1": {"operatorId": "p1", "passengerIds": ["p3"]}},
+                  c_common_language_passengers=True)
+
+    def test_person_frozen_twice_is_infeasible(self):
+        with pytest.raises(RuntimeError, match="No feasible"):
+            solve(BALLOONS, CARS, PEOPLE, GROUPS,
+                  frozen={"b1": {"operatorId": "p1", "passengerIds": ["p3"]},
+                          "c1": {"operatorId": "p2", "passengerIds": ["p3"]}})
+
 
 class TestFixedGroups:
     def test_person_stays_in_fixed_group(self):
@@ -342,6 +376,36 @@ class TestLanguageConstraints:
         assert operator(result, "c1") == "driver"
 
 
+    def test_balloon_operator_chosen_to_match_car_operator(self):
+        # two balloon candidates; only the "de" one is compatible with the car
+        people = [
+            person("pilot_en", role="counselor", languages=["en"]),
+            person("pilot_de", role="counselor", languages=["de", "fr"]),
+            person("driver",   role="counselor", languages=["de"]),
+        ]
+        b = [balloon("b1", 2, ["pilot_en", "pilot_de"])]
+        c = [car("c1", 4, ["driver"])]
+        result = solve(b, c, people, {"b1": ["c1"]},
+                       c_common_language_operators=True)
+        assert operator(result, "b1") == "pilot_de"
+
+    def test_passenger_language_matched_by_any_shared_language(self):
+        # "multi" speaks fr + en; the en-only pilot is compatible via en
+        people = [
+            person("pilot",  role="counselor", languages=["en"]),
+            person("driver", role="counselor", languages=["de"]),
+            person("multi",  languages=["fr", "en"]),
+            person("fr_only", languages=["fr"]),
+        ]
+        b = [balloon("b1", 3, ["pilot"])]
+        c = [car("c1", 5, ["driver"])]
+        result = solve(b, c, people, {"b1": ["c1"]},
+                       w_passenger_fairness=50,
+                       c_common_language_passengers=True)
+        assert "multi" in passengers(result, "b1")
+        assert "fr_only" not in passengers(result, "b1")
+
+
 class TestInfeasible:
     def test_not_enough_total_seats_raises(self):
         # 2 seats total, 4 people
@@ -627,6 +691,81 @@ class TestLowFlightsLookahead:
         assert "fr_low_0" not in occupants(result, "b_fr")
 
 
+class TestObjectiveBreakdown:
+    def test_sections_add_up_to_objective(self):
+        people = [
+            person("pilot",  role="counselor", flights=2, nationality="fr"),
+            person("driver", role="counselor", flights=1),
+            person("p3", flights=0), person("p4", flights=3),
+            person("p5", flights=1, nationality="fr"),
+        ]
+        b = [balloon("b1", 3, ["pilot"])]
+        c = [car("c1", 6, ["driver"])]
+        result = solve(b, c, people, {"b1": ["c1"]},
+                       w_pilot_fairness=5, w_passenger_fairness=30,
+                       w_no_solo_participant=100, w_divers_nationalities=3,
+                       w_tiebreak_fairness=1)
+        objective = result["objective"]
+        total = sum(t["value"] for t in objective["terms"].values())
+        assert total == pytest.approx(objective["value"], abs=1e-6)
+        assert set(objective["terms"]) == {"3.1", "3.2", "3.3", "3.5a", "3.8"}
+        assert objective["terms"]["3.2"]["weight"] == "passengerFairness"
+
+    def test_solo_participant_count_reported(self):
+        # one participant must ride in the car alone: reported, not hidden
+        people = [
+            person("pilot",  role="counselor"),
+            person("driver", role="counselor"),
+            person("p3"),
+        ]
+        b = [balloon("b1", 1, ["pilot"])]
+        c = [car("c1", 3, ["driver"])]
+        result = solve(b, c, people, {"b1": ["c1"]}, w_no_solo_participant=10)
+        assert result["objective"]["stats"]["soloParticipantCars"] == 1
+        assert result["objective"]["terms"]["3.3"]["value"] == pytest.approx(10)
+
+
+class TestEquivalenceClasses:
+    def test_only_interchangeable_people_are_grouped(self):
+        people = [
+            person("pilot", role="counselor"),
+            person("a"), person("b"), person("c", weight=82),
+            person("d", flights=1),                # other flight count
+            person("e"),                           # has history
+            person("f"), person("g"),              # frozen
+        ]
+        classes = equivalence_classes(
+            people,
+            [balloon("b1", 3, ["pilot", "f"])],
+            frozen_people={"g"},
+            fixed_groups=None,
+            histories=[{"e": {"b1": 1}}, None, None],
+            default_person_weight=80,
+        )
+        assert list(classes.values()) == [["a", "b", "c"]]
+
+    def test_aggregated_solve_matches_individual_solve(self):
+        people = [
+            person("pilot", role="counselor", flights=3),
+            person("driver", role="counselor", flights=3),
+            *[person(f"x{i}", flights=i % 2) for i in range(8)],
+            *[person(f"y{i}", flights=1, nationality="fr") for i in range(4)],
+        ]
+        b = [balloon("b1", 4, ["pilot"])]
+        c = [car("c1", 14, ["driver"])]
+        weights = dict(w_passenger_fairness=30, w_divers_nationalities=3,
+                       w_no_solo_participant=100)
+        flat = solve(b, c, people, {"b1": ["c1"]}, **weights)
+        agg = solve(b, c, people, {"b1": ["c1"]}, aggregate_classes=True,
+                    **weights)
+
+        assert agg["objective"]["value"] == pytest.approx(flat["objective"]["value"])
+        seated = [p for v in ("b1", "c1") for p in occupants(agg, v)]
+        assert sorted(seated) == sorted(p["id"] for p in people)
+        # three balloon seats go to the 0-flight participants
+        assert passengers(agg, "b1") <= {"x0", "x2", "x4", "x6"}
+
+
 # ===========================================================================
 # solve_vehicle_groups
 # ===========================================================================
@@ -0,0 +1,90 @@
+"""
+Tests for speculative solves of the next leg (solver_speculate,
+`--mode speculate_leg`).
+
+Run with:  pytest test_speculate.py -v
+"""
+
+import pytest
+
+from solver_checkpoint import payload_key
+from solver_history import fixed_groups_from_manifest
+from solver_scenarios import make_scenario
+from solver_speculate import next_leg_payload
+
+
+def app_next_leg(payload, manifest):
+    """The next leg's payload as the app builds it (src/composables/solver.ts)."""
+    flown = [
+        p
+        for vid, a in manifest.items()
+        if vid in {b["id"] for b in payload["balloons"]}
+        for p in [a["operatorId"], *a["passengerIds"]]
+        if p
+    ]
+    return {
+        "balloons": payload["balloons"],
+        "cars": payload["cars"],
+        "people": [
+            {**p, "flightsSoFar": p["flightsSoFar"] + flown.count(p["id"])}
+            for p in payload["people"]
+        ],
+        "vehicleGroups": payload["vehicleGroups"],
+        "preAssignments": {},
+        "groupHistory": payload["groupHistory"],
+        "balloonHistory": payload["balloonHistory"],
+        "peopleMeetHistory": payload["peopleMeetHistory"],
+        "fixedGroups": fixed_groups_from_manifest(manifest, payload["vehicleGroups"]),
+        "options": payload["options"],
+    }
+
+
+class TestSpeculate:
+    def test_predicts_the_payload_the_app_sends(self):
+        payload = make_scenario(2, seed=3)
+        b, c = payload["balloons"][0]["id"], payload["cars"][0]["id"]
+        manifest = {
+            b: {"operatorId": "pilot0", "passengerIds": ["part0", "part1"]},
+            c: {"operatorId": "driver0_0", "passengerIds": ["part2"]},
+        }
+        payload["previous"] = {"assignments": manifest}
+        predicted = next_leg_payload(payload, manifest)
+        assert "previous" not in predicted
+        flights = {p["id"]: p["flightsSoFar"] for p in predicted["people"]}
+        before = {p["id"]: p["flightsSoFar"] for p in payload["people"]}
+        assert flights["part0"] == before["part0"] + 1
+        assert flights["part2"] == before["part2"]
+        assert predicted["fixedGroups"]["part2"] == b
+        real = app_next_leg(payload, manifest)
+        assert payload_key("solve_leg", predicted) == payload_key("solve_leg", real)
+
+    def test_stored_histories_are_not_predicted(self):
+        with pytest.raises(ValueError):
+            next_leg_payload({"history": {"campId": "c"}}, {})
+
+    def test_next_leg_resumes_the_speculative_solve(self, tmp_path, run_main):
+        def run(mode, payload, *args):
+            return run_main(mode, payload, "--checkpoint-dir", tmp_path, *args)
+
+        payload = make_scenario(2, seed=3)
+        payload["options"]["timeLimit"] = 10
+        first = run("solve_leg", payload)
+        speculative = run(
+            "speculate_leg", {"payload": payload, "assignments": first["assignments"]}
+        )
+        assert speculative["status"] == "optimal"
+
+        real = app_next_leg(payload, first["assignments"])
+        resumed = run("solve_leg", real, "--resume")
+        assert resumed["checkpoint"]["path"] == speculative["checkpoint"]["path"]
+        assert resumed["checkpoint"]["resumed"] is True
+        assert resumed["objective"]["value"] == speculative["objective"]["value"]
+
+        # solving the leg again is a normal solve with the whole budget
+        again = run("solve_leg", real, "--resume")
+        assert again["checkpoint"]["resumed"] is False
+        assert again["checkpoint"]["priorSeconds"] == 0
+
+        real["options"] = {**real["options"], "weights": {"pilotFairness": 0}}
+        changed = run("solve_leg", real, "--resume")
+        assert changed["checkpoint"]["resumed"] is False
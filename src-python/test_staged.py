@@ -0,0 +1,38 @@
+"""
+Tests for the two-stage leg solve (solver_staged).
+
+Run with:  pytest test_staged.py -v
+"""
+
+import pytest
+
+from solver_history import occupants
+from solver_scenarios import make_scenario
+from solver_staged import solve_flight_leg_staged
+
+
+@pytest.fixture
+def solve(solve_leg):
+    def run(payload, **kwargs):
+        return solve_leg(payload, solve_flight_leg_staged, time_limit_s=6, **kwargs)
+
+    return run
+
+
+class TestStagedLeg:
+    @pytest.mark.parametrize("fix_balloons", [False, True])
+    def test_both_stages_reported(self, solve, fix_balloons):
+        payload = make_scenario(3, seed=5)
+        result = solve(payload, fix_balloons=fix_balloons)
+        assert result["engine"] == "staged"
+        assert [s["name"] for s in result["stages"]] == ["core", "refine"]
+        assert set(result["timings"]) == {"core", "refine"}
+        # the refined plan is scored with every section, the core plan without 3.7
+        assert "3.7" in result["objective"]["terms"]
+        assert result["objective"]["value"] == result["stages"][-1]["objective"]
+        seated = [p for a in result["assignments"].values() for p in occupants(a)]
+        assert sorted(seated) == sorted(p["id"] for p in payload["people"])
+
+    def test_share_must_leave_time_for_both_stages(self, solve):
+        with pytest.raises(ValueError):
+            solve(make_scenario(2), stage_one_share=1)
@@ -0,0 +1,93 @@
+"""
+Tests for weight sweeps on one built model (solver_sweep).
+
+Run with:  pytest test_sweep.py -v
+"""
+
+import copy
+
+import solver_sweep
+from solver_flight_leg import WEIGHT_KWARGS
+from solver_sweep import sweep_flight_leg
+from test_solver import balloon, car, person
+
+PEOPLE = [
+    person("veteran", role="counselor", flights=10),
+    person("rookie", role="counselor", flights=0),
+    person("driver", role="counselor", flights=5),
+]
+BALLOONS = [balloon("b1", 2, ["veteran", "rookie"])]
+CARS = [car("c1", 3, ["driver"])]
+
+
+def weights(**overrides):
+    w = {name: 0 for name in WEIGHT_KWARGS}
+    w.update(overrides)
+    return w
+
+
+def sweep(weight_sets):
+    return sweep_flight_leg(
+        balloons=copy.deepcopy(BALLOONS),
+        cars=copy.deepcopy(CARS),
+        people=PEOPLE,
+        vehicle_groups={"b1": ["c1"]},
+        group_history=None,
+        balloon_history=None,
+        people_meet_history=None,
+        frozen={},
+        fixed_groups=None,
+        planning_horizon_legs=0,
+        c_common_language_passengers=False,
+        c_common_language_operators=False,
+        counselor_flight_discount=0.9,
+        default_person_weight=80,
+        weight_sets=weight_sets,
+        time_limit_s=10,
+        random_seed=42,
+        **{kwarg: 0 for kwarg in WEIGHT_KWARGS.values()},
+    )
+
+
+class TestSweep:
+    def test_each_weight_set_gets_its_own_objective(self):
+        out = sweep([weights(pilotFairness=50), weights(pilotFairness=-50)])
+        first, second = out["results"]
+        assert first["assignments"]["b1"]["operatorId"] == "rookie"
+        assert second["assignments"]["b1"]["operatorId"] == "veteran"
+        assert first["weights"]["pilotFairness"] == 50
+
+    def test_model_is_built_once(self, monkeypatch):
+        calls = []
+        original = solver_sweep.build_flight_leg_model
+
+        def counting(*args, **kwargs):
+            calls.append(kwargs)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(solver_sweep, "build_flight_leg_model", counting)
+        out = sweep([weights(pilotFairness=5), weights(passengerFairness=3), weights()])
+        assert len(calls) == 1
+        assert len(out["results"]) == 3
+        # the union model carries both sections
+        assert calls[0]["w_pilot_fairness"] != 0
+        assert calls[0]["w_passenger_fairness"] != 0
+        assert calls[0]["w_tiebreak_fairness"] == 0
+
+    def test_sets_with_opposite_signs(self):
+        # each set passes the sign check on its own
+        out = sweep(
+            [
+                weights(passengerFairness=30, tiebreakFairness=0),
+                weights(passengerFairness=0, tiebreakFairness=-1),
+            ]
+        )
+        first, second = out["results"]
+        assert first["weights"]["passengerFairness"] == 30
+        assert second["weights"]["tiebreakFairness"] == -1
+        assert second["objective"]["terms"]["3.2"]["value"] == 0
+
+    def test_unused_section_has_no_contribution(self):
+        out = sweep([weights(pilotFairness=5), weights(passengerFairness=3)])
+        terms = out["results"][1]["objective"]["terms"]
+        assert terms["3.1"]["value"] == 0
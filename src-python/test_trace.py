@@ -0,0 +1,62 @@
+"""
+Tests for the trace-file export (solver_trace).
+
+Run with:  pytest test_trace.py -v
+"""
+
+import json
+
+from solver_control import SolveControl
+from solver_flight_leg import solve_flight_leg
+from solver_trace import Tracer
+from test_solver import BALLOONS, CARS, GROUPS, PEOPLE
+
+
+class TestTracer:
+    def test_disabled_tracer_records_nothing(self, tmp_path):
+        tracer = Tracer()
+        with tracer.span("build"):
+            pass
+        tracer.write()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_solve_writes_spans_and_search_log(self, tmp_path):
+        path = tmp_path / "trace.json"
+        tracer = Tracer(str(path), profile_build=True)
+        control = SolveControl(tracer=tracer)
+        solve_flight_leg(
+            balloons=BALLOONS,
+            cars=[dict(c) for c in CARS],
+            people=PEOPLE,
+            vehicle_groups=GROUPS,
+            group_history=None,
+            balloon_history=None,
+            people_meet_history=None,
+            frozen={},
+            fixed_groups=None,
+            planning_horizon_legs=0,
+            c_common_language_passengers=False,
+            c_common_language_operators=False,
+            w_pilot_fairness=5,
+            w_passenger_fairness=0,
+            w_tiebreak_fairness=0,
+            w_no_solo_participant=0,
+            w_divers_nationalities=0,
+            w_new_meetings=0,
+            w_group_passenger_balance=0,
+            w_group_rotation=0,
+            w_balloon_rotation=0,
+            w_low_flights_lookahead=0,
+            counselor_flight_discount=0.9,
+            default_person_weight=80,
+            time_limit_s=10,
+            control=control,
+        )
+        tracer.write()
+
+        trace = json.loads(path.read_text())
+        spans = [e["name"] for e in trace["traceEvents"] if e["ph"] == "X"]
+        assert spans == ["build", "search"]
+        log = [e["args"]["line"] for e in trace["traceEvents"] if e["ph"] == "i"]
+        assert any("CP-SAT" in line for line in log)
+        assert (tmp_path / "trace.json.prof").exists()
@@ -0,0 +1,276 @@
+"""
+Tests for the plan verifier (solver_verify) and plan scoring.
+
+Run with:  pytest test_verify.py -v
+"""
+
+import copy
+
+import pytest
+
+import solver_flight_leg
+from solver_control import SolveControl
+from solver_flight_leg import score_flight_leg, solve_flight_leg
+from solver_main import (
+    _handle_build_groups,
+    _history_kwargs,
+    _reuse_previous_leg,
+    leg_options,
+)
+from solver_scenarios import make_scenario
+from solver_verify import (
+    REUSE_SCORE_TIME_LIMIT_S,
+    REUSE_SEARCH_TIME_LIMIT_S,
+    unused_car_seats,
+    verify_leg,
+    verify_vehicle_groups,
+    within_tolerance,
+)
+from test_solver import balloon, car, person
+
+
+def leg_kwargs(payload):
+    options = leg_options(payload, {"workers": 8, "seed": 42})
+    options["time_limit_s"] = 6
+    return dict(
+        group_history=payload["groupHistory"],
+        balloon_history=payload["balloonHistory"],
+        people_meet_history=payload["peopleMeetHistory"],
+        frozen={},
+        fixed_groups=payload["fixedGroups"],
+        **options,
+    )
+
+
+def verify(payload, assignments):
+    return verify_leg(
+        assignments,
+        payload["balloons"],
+        payload["cars"],
+        payload["people"],
+        payload["vehicleGroups"],
+        **leg_kwargs(payload),
+    )
+
+
+@pytest.fixture(scope="module")
+def solved():
+    payload = make_scenario(2, seed=3)
+    result = solve_flight_leg(
+        payload["balloons"],
+        copy.deepcopy(payload["cars"]),
+        payload["people"],
+        payload["vehicleGroups"],
+        **leg_kwargs(payload),
+    )
+    return payload, result
+
+
+class TestVerifyLeg:
+    def test_solved_plan_is_valid(self, solved):
+        payload, result = solved
+        assert verify(payload, result["assignments"]) == []
+
+    def test_double_seat(self, solved):
+        payload, result = solved
+        assignments = copy.deepcopy(result["assignments"])
+        vid, a = next((v, a) for v, a in assignments.items() if a["passengerIds"])
+        moved = a["passengerIds"].pop()
+        other = next(v for v in assignments if v != vid)
+        assignments[other]["passengerIds"].append(moved)
+        assignments[other]["passengerIds"].append(a["operatorId"])
+        errors = verify(payload, assignments)
+        assert any("seated in both" in e for e in errors)
+
+    def test_capacity_operator_and_language(self):
+        people = [
+            person("op", role="counselor", languages=["de"]),
+            person("p1", languages=["fr"]),
+            person("p2"),
+            person("driver", role="counselor"),
+        ]
+        balloons = [balloon("b1", 2, ["op"])]
+        cars = [car("c1", 5, ["driver"])]
+        groups = {"b1": ["c1"]}
+        valid = {
+            "b1": {"operatorId": "op", "passengerIds": ["p2"]},
+            "c1": {"operatorId": "driver", "passengerIds": ["p1"]},
+        }
+        assert verify_leg(valid, balloons, cars, people, groups) == []
+
+        crowded = {
+            "b1": {"operatorId": "op", "passengerIds": ["p1", "p2"]},
+            "c1": {"operatorId": "p1", "passengerIds": []},
+        }
+        errors = verify_leg(crowded, balloons, cars, people, groups)
+        assert any("seats 3 but has 2" in e for e in errors)
+        assert any("p1 shares no language with op" in e for e in errors)
+        assert any("p1 may not operate c1" in e for e in errors)
+        assert any("driver has no seat" in e for e in errors)
+
+    def test_frozen_seat_must_be_kept(self, solved):
+        payload, result = solved
+        vid, a = next(
+            (v, a) for v, a in result["assignments"].items() if a["passengerIds"]
+        )
+        frozen = {vid: {"operatorId": None, "passengerIds": a["passengerIds"][:1]}}
+        assignments = copy.deepcopy(result["assignments"])
+        pid = assignments[vid]["passengerIds"].pop(0)
+        other = next(v for v in assignments if v != vid)
+        assignments[other]["passengerIds"].append(pid)
+        kwargs = {**leg_kwargs(payload), "frozen": frozen}
+        errors = verify_leg(
+            assignments,
+            payload["balloons"],
+            payload["cars"],
+            payload["people"],
+            payload["vehicleGroups"],
+            **kwargs,
+        )
+        assert f"{pid} is fixed as passenger of {vid}" in errors
+
+
+class TestScoreFlightLeg:
+    def test_score_matches_solve(self, solved):
+        payload, result = solved
+        kwargs = leg_kwargs(payload)
+        kwargs.pop("frozen")
+        objective = score_flight_leg(
+            result["assignments"],
+            payload["balloons"],
+            copy.deepcopy(payload["cars"]),
+            payload["people"],
+            payload["vehicleGroups"],
+            **kwargs,
+        )
+        assert objective["value"] == result["objective"]["value"]
+
+
+class TestReusePreviousLeg:
+    def reuse(self, payload, previous):
+        payload = {**payload, "previous": previous}
+        options = leg_options(payload, {"workers": 8, "seed": 42})
+        history = _history_kwargs(payload, {})
+        return _reuse_previous_leg(payload, history, options, SolveControl())
+
+    def test_tolerance_needs_a_reference(self):
+        assert within_tolerance(104, 100, 0.05)
+        assert not within_tolerance(106, 100, 0.05)
+        assert not within_tolerance(0, None, 0.05)
+
+    def small_leg(self):
+        # the pilot flies alone or with one of a (never flown) and b
+        payload = {
+            "balloons": [balloon("b1", 2, ["pilot"])],
+            "cars": [car("c1", 4, ["driver"])],
+            "people": [
+                person("pilot", role="counselor"),
+                person("driver", role="counselor"),
+                person("a"),
+                person("b", flights=5),
+            ],
+            "vehicleGroups": {"b1": ["c1"]},
+            "groupHistory": None,
+            "balloonHistory": None,
+            "peopleMeetHistory": None,
+            "fixedGroups": None,
+            "options": {"timeLimit": 10},
+        }
+        result = solve_flight_leg(
+            payload["balloons"],
+            copy.deepcopy(payload["cars"]),
+            payload["people"],
+            payload["vehicleGroups"],
+            **leg_kwargs(payload),
+        )
+        assert result["assignments"]["b1"]["passengerIds"] == ["a"]
+        return payload, result
+
+    def test_changed_weight_is_compared_under_the_new_weights(self):
+        payload, result = self.small_leg()
+        # still the best plan, though it scores far worse than its recorded
+        # objective, which was summed under the old weights
+        payload["options"]["weights"] = {"pilotFairness": 0, "passengerFairness": 5}
+        reused, rejected = self.reuse(payload, result)
+        assert not rejected
+        assert not within_tolerance(
+            reused["objective"]["value"], result["objective"]["value"], 0.05
+        )
+
+    def test_worse_plan_is_not_reused(self):
+        payload, result = self.small_leg()
+        worse = {
+            "b1": {"operatorId": "pilot", "passengerIds": ["b"]},
+            "c1": {"operatorId": "driver", "passengerIds": ["a"]},
+        }
+        reused, rejected = self.reuse(payload, {**result, "assignments": worse})
+        assert reused is None
+        assert "found by a short search" in rejected[0]
+
+    def test_time_is_capped(self, solved, monkeypatch):
+        payload, result = solved
+        limits = []
+
+        def score(*args, time_limit_s, **kwargs):
+            limits.append(time_limit_s)
+            return result["objective"]
+
+        def solve(*args, time_limit_s, **kwargs):
+            limits.append(time_limit_s)
+            return result
+
+        monkeypatch.setattr(solver_flight_leg, "score_flight_leg", score)
+        monkeypatch.setattr(solver_flight_leg, "solve_flight_leg", solve)
+        payload = {**payload, "options": {**payload["options"], "timeLimit": 600}}
+        reused, rejected = self.reuse(payload, result)
+        assert reused["reused"] is True and not rejected
+        assert limits == [REUSE_SCORE_TIME_LIMIT_S, REUSE_SEARCH_TIME_LIMIT_S]
+
+
+class TestVerifyVehicleGroups:
+    def _data(self):
+        people = [
+            person("p1", role="counselor"),
+            person("p2", role="counselor"),
+            person("p3"),
+            person("p4"),
+            person("p5"),
+        ]
+        balloons = [balloon("b1", 2, ["p1"])]
+        cars = [car("c1", 3, ["p2"]), car("c2", 2, ["p1"], trailer=False)]
+        return balloons, cars, people
+
+    def test_valid_grouping(self):
+        balloons, cars, people = self._data()
+        groups = {"b1": ["c1"]}
+        assert verify_vehicle_groups(groups, balloons, cars, people) == []
+        assert unused_car_seats(groups, cars) == 1
+
+    def test_violations(self):
+        balloons, cars, people = self._data()
+        errors = verify_vehicle_groups(
+            {"b1": ["c2", "c2"]},
+            balloons,
+            cars,
+            people,
+            frozen={"b1": ["c1"]},
+        )
+        assert any("c2 is in both" in e for e in errors)
+        assert "c1 is fixed to group b1" in errors
+        assert "Group b1 has no car with a trailer clutch" in errors
+
+    def test_reuse_runs_the_solver_pre_checks(self):
+        balloons, cars, people = self._data()
+        payload = {
+            "balloons": balloons,
+            "cars": cars,
+            "people": people,
+            "previous": {"vehicleGroups": {"b1": ["c1"]}, "unusedSeats": 1},
+        }
+        reused = _handle_build_groups(payload, SolveControl())
+        assert reused["reused"] is True
+
+        # the grouping is still valid, but a solve refuses the fleet
+        cars[1]["allowedOperatorIds"] = []
+        with pytest.raises(ValueError, match="Car c2 has no eligible operators"):
+            _handle_build_groups(payload, SolveControl())